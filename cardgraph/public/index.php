@@ -160,6 +160,9 @@ $router->get('/api/transcription/sessions/{id}/records',          ['Transcriptio
 $router->put('/api/transcription/records/{id}',                   ['TranscriptionController', 'updateRecord']);
 $router->delete('/api/transcription/records/{id}',                ['TranscriptionController', 'deleteRecord']);
 $router->get('/api/transcription/sessions/{id}/transcript-text',  ['TranscriptionController', 'getTranscriptText']);
+$router->get('/api/transcription/sessions/{id}/peaks',            ['TranscriptionController', 'getSessionPeaks']);
+$router->get('/api/transcription/sessions/{id}/clip',             ['TranscriptionController', 'getSessionClip']);
+$router->get('/api/transcription/records/{id}/clip',              ['TranscriptionController', 'getRecordClip']);
 $router->get('/api/transcription/sessions/{id}/parse-runs',       ['TranscriptionController', 'listParseRuns']);
 $router->post('/api/transcription/sessions/{id}/transcribe',     ['TranscriptionController', 'transcribeSession']);
 
@@ -151,6 +151,10 @@ var TranscriptionAdmin = {
         // A. Recording
         html.push('<div class="tx-settings-card"><h4>A. Recording</h4>');
         html.push(this.settingField('Segment Length', 'number', 'tx-seg-len', s.segment_length_minutes, '5–60 min', 5, 60));
+        html.push(this.settingSelect('Segment Boundaries', 'tx-seg-mode', s.segment_mode, [
+            ['fixed', 'Fixed — cut on the clock'],
+            ['pause', 'At pauses — first break after the length']
+        ]));
         html.push(this.settingSelect('Sample Rate', 'tx-sample-rate', s.sample_rate, [
             ['8000', '8 kHz'], ['16000', '16 kHz'], ['22050', '22 kHz']
         ]));
@@ -158,7 +162,7 @@ var TranscriptionAdmin = {
             ['mono', 'Mono'], ['stereo', 'Stereo']
         ]));
         html.push(this.settingSelect('Format', 'tx-format', s.audio_format, [
-            ['wav', 'WAV'], ['flac', 'FLAC']
+            ['wav', 'WAV'], ['flac', 'FLAC'], ['opus', 'Opus (compact)']
         ]));
         html.push('</div>');
 
@@ -183,9 +187,17 @@ var TranscriptionAdmin = {
             ['medium', 'Medium — 769M (slower)'],
             ['large', 'Large — 1.5B (slowest)']
         ]));
+        html.push(this.settingSelect('Engine', 'tx-inference-backend', s.inference_backend, [
+            ['whisper', 'Whisper (PyTorch, default)'],
+            ['faster-whisper', 'Faster-Whisper int8 (~3x faster on CPU)']
+        ]));
         html.push(this.settingSelect('Priority', 'tx-priority', s.priority_mode, [
             ['low', 'Low'], ['normal', 'Normal']
         ]));
+        html.push(this.settingSelect('Session Runner', 'tx-session-runner', s.session_runner, [
+            ['process', 'Process per session (default)'],
+            ['supervisor', 'Shared supervisor (concurrent auctions)']
+        ]));
         html.push('</div>');
 
         // E. Storage
@@ -199,6 +211,11 @@ var TranscriptionAdmin = {
         ]));
         html.push(this.settingField('Min Free Disk (GB)', 'number', 'tx-min-disk', s.min_free_disk_gb, '1–50 GB', 1, 50));
         html.push(this.settingField('Auto-Delete After (days)', 'number', 'tx-retention-days', s.audio_retention_days, '7–365 days', 7, 365));
+        html.push(this.settingSelect('Compact After Transcription', 'tx-archive-codec', s.archive_codec, [
+            ['none', 'Off — keep recorded audio'],
+            ['flac', 'FLAC (lossless, ~half size)'],
+            ['opus', 'Opus (speech, ~1/10 size)']
+        ]));
         html.push('</div>');
 
         // F. Acquisition
@@ -249,6 +266,7 @@ var TranscriptionAdmin = {
     saveSettings: function() {
         var data = {
             segment_length_minutes:  parseInt(document.getElementById('tx-seg-len').value) || 15,
+            segment_mode:            document.getElementById('tx-seg-mode').value,
             sample_rate:             document.getElementById('tx-sample-rate').value,
             audio_channels:          document.getElementById('tx-channels').value,
             audio_format:            document.getElementById('tx-format').value,
@@ -257,11 +275,14 @@ var TranscriptionAdmin = {
             max_session_hours:       parseInt(document.getElementById('tx-max-hours').value) || 10,
             max_cpu_cores:           parseInt(document.getElementById('tx-cpu-cores').value) || 2,
             whisper_model:           document.getElementById('tx-whisper-model').value,
+            inference_backend:       document.getElementById('tx-inference-backend').value,
             priority_mode:           document.getElementById('tx-priority').value,
+            session_runner:          document.getElementById('tx-session-runner').value,
             base_archive_dir:        document.getElementById('tx-archive-dir').value.trim(),
             folder_structure:        document.getElementById('tx-folder-struct').value,
             min_free_disk_gb:        parseInt(document.getElementById('tx-min-disk').value) || 5,
             audio_retention_days:    parseInt(document.getElementById('tx-retention-days').value) || 30,
+            archive_codec:           document.getElementById('tx-archive-codec').value,
             acquisition_mode:        document.getElementById('tx-acq-mode').value
         };
 
@@ -809,6 +830,13 @@ var TranscriptionAdmin = {
             parts.push('<option value="browser_automation"' + (ex.override_acquisition_mode === 'browser_automation' ? ' selected' : '') + '>Browser Automation</option>');
             parts.push('</select></div>');
 
+            parts.push('<div class="form-group"><label>Transcription Engine</label>');
+            parts.push('<select id="tx-sess-backend">');
+            parts.push('<option value="">Use Global Default</option>');
+            parts.push('<option value="whisper"' + (ex.override_inference_backend === 'whisper' ? ' selected' : '') + '>Whisper (PyTorch)</option>');
+            parts.push('<option value="faster-whisper"' + (ex.override_inference_backend === 'faster-whisper' ? ' selected' : '') + '>Faster-Whisper int8</option>');
+            parts.push('</select></div>');
+
             parts.push('</div>');
             parts.push('<div class="modal-footer">');
             parts.push('<button class="btn btn-secondary" onclick="App.closeModal()">Cancel</button>');
@@ -853,12 +881,14 @@ var TranscriptionAdmin = {
         var maxDur = document.getElementById('tx-sess-max-dur').value;
         var cpu = document.getElementById('tx-sess-cpu').value;
         var acq = document.getElementById('tx-sess-acq').value;
+        var backend = document.getElementById('tx-sess-backend').value;
 
         if (segLen) data.override_segment_length = parseInt(segLen);
         if (silence) data.override_silence_timeout = parseInt(silence);
         if (maxDur) data.override_max_duration = parseInt(maxDur);
         if (cpu) data.override_cpu_limit = parseInt(cpu);
         if (acq) data.override_acquisition_mode = acq;
+        if (backend) data.override_inference_backend = backend;
 
         var self = this;
         var promise = sessionId
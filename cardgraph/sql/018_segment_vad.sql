@@ -0,0 +1,7 @@
+-- Migration 018: Voice-activity pre-pass results per segment
+-- silence_ranges: JSON array of [start_sec, end_sec] spans trimmed before Whisper ran
+-- speech_seconds: voiced audio remaining after trimming, to 0.1 s (NULL = not analysed)
+
+ALTER TABLE CG_TranscriptionSegments
+    ADD COLUMN silence_ranges TEXT DEFAULT NULL AFTER transcription_progress,
+    ADD COLUMN speech_seconds DECIMAL(8,1) UNSIGNED DEFAULT NULL AFTER silence_ranges;
@@ -0,0 +1,9 @@
+-- Migration 019: Selectable inference engine for transcription
+-- whisper        = openai-whisper (PyTorch fp32), the original engine
+-- faster-whisper = CTranslate2 with int8 weights, ~3-4x faster on CPU
+
+ALTER TABLE CG_TranscriptionSettings
+    ADD COLUMN inference_backend ENUM('whisper','faster-whisper') NOT NULL DEFAULT 'whisper' AFTER whisper_model;
+
+ALTER TABLE CG_TranscriptionSessions
+    ADD COLUMN override_inference_backend ENUM('whisper','faster-whisper') DEFAULT NULL AFTER override_acquisition_mode;
@@ -0,0 +1,20 @@
+-- Migration 020: Content-addressed transcript cache
+-- One row per (audio content, model, decode options). Any worker that meets
+-- the same audio again reuses the stored result instead of re-running Whisper.
+-- result_json holds the full worker result (text, VAD ranges, flags).
+
+CREATE TABLE IF NOT EXISTS CG_TranscriptCache (
+    audio_sha256    CHAR(64)     NOT NULL,
+    model_spec      VARCHAR(40)  NOT NULL,
+    options_hash    CHAR(40)     NOT NULL,
+    text            MEDIUMTEXT   NOT NULL,
+    result_json     MEDIUMTEXT   NOT NULL,
+    audio_bytes     BIGINT UNSIGNED DEFAULT NULL,
+    elapsed_seconds DECIMAL(8,2) DEFAULT NULL,
+    hit_count       INT UNSIGNED NOT NULL DEFAULT 0,
+    created_at      DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_hit_at     DATETIME     DEFAULT NULL,
+
+    PRIMARY KEY (audio_sha256, model_spec, options_hash),
+    INDEX idx_tc_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,20 @@
+-- Migration 021: Capture/gap ledger per recording session
+-- One 'capture' row per continuous run of the recorder's ffmpeg and one 'gap'
+-- row per outage between runs, with millisecond wall-clock bounds. Segment
+-- audio offsets map to auction time through the capture row that contains
+-- the segment, without assuming segments are back to back.
+
+CREATE TABLE IF NOT EXISTS CG_TranscriptionCaptureSpans (
+    span_id             INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    session_id          INT UNSIGNED NOT NULL,
+    span_type           ENUM('capture','gap') NOT NULL,
+    started_at          DATETIME(3) NOT NULL,
+    ended_at            DATETIME(3) DEFAULT NULL,
+    duration_seconds    DECIMAL(10,3) DEFAULT NULL,
+    first_segment       SMALLINT UNSIGNED DEFAULT NULL,
+    last_segment        SMALLINT UNSIGNED DEFAULT NULL,
+    reason              VARCHAR(100) DEFAULT NULL,
+    created_at          DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    INDEX idx_span_session (session_id, started_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,7 @@
+-- Migration 022: Opus capture format
+-- 'opus' segments are speech-bitrate Opus in Ogg (.opus), about a tenth the
+-- size of 16 kHz WAV. Workers decode them to PCM in memory with ffmpeg;
+-- mid-segment streaming transcription stays WAV-only.
+
+ALTER TABLE CG_TranscriptionSettings
+    MODIFY COLUMN audio_format ENUM('wav','flac','opus') NOT NULL DEFAULT 'wav';
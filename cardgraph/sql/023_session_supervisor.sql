@@ -0,0 +1,7 @@
+-- Migration 023: Multi-session supervisor
+-- 'supervisor' runs every active session in one transcription_supervisor.py
+-- process (shared DB connection and Whisper queue) instead of a manager,
+-- recorder and worker process per session.
+
+ALTER TABLE CG_TranscriptionSettings
+    ADD COLUMN session_runner ENUM('process','supervisor') NOT NULL DEFAULT 'process' AFTER priority_mode;
@@ -0,0 +1,14 @@
+-- Migration 024: Post-transcription archive compaction
+-- transcription_compactor.py re-encodes transcribed segments to
+-- archive_codec and deletes the original. archive_format stays NULL until
+-- a segment has been through the compactor (kept as-is or re-encoded);
+-- archive_sha256 is the checksum of the file left on disk. compacted_at
+-- marks a segment as done, including one whose audio was already gone.
+
+ALTER TABLE CG_TranscriptionSettings
+    ADD COLUMN archive_codec ENUM('none','flac','opus') NOT NULL DEFAULT 'none' AFTER audio_retention_days;
+
+ALTER TABLE CG_TranscriptionSegments
+    ADD COLUMN archive_format ENUM('wav','flac','opus') DEFAULT NULL AFTER file_size_bytes,
+    ADD COLUMN archive_sha256 CHAR(64) DEFAULT NULL AFTER archive_format,
+    ADD COLUMN compacted_at   DATETIME DEFAULT NULL AFTER archive_sha256;
@@ -0,0 +1,8 @@
+-- Migration 025: Pause-aligned segment boundaries
+-- segment_mode 'fixed' cuts every segment_length_minutes on the clock (the
+-- ffmpeg segment muxer). 'pause' lets each segment run to that length and
+-- then ends it at the next natural pause (capped at 1.5x the length), so
+-- words and sentences are not split across segment files.
+
+ALTER TABLE CG_TranscriptionSettings
+    ADD COLUMN segment_mode ENUM('fixed','pause') NOT NULL DEFAULT 'fixed' AFTER segment_length_minutes;
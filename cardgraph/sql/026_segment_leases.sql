@@ -0,0 +1,12 @@
+-- Migration 026: Segment claim leases
+-- PC workers claim a batch of pending segments with one UPDATE that stamps
+-- them with a random claim_token and reads them back by that token. A lease
+-- that runs out (worker crashed or was closed mid-batch) makes its segments
+-- claimable again. Rows the NAS worker marks transcribing have no lease.
+
+ALTER TABLE CG_TranscriptionSegments
+    ADD COLUMN claim_token CHAR(32) DEFAULT NULL AFTER transcription_progress,
+    ADD COLUMN claimed_by VARCHAR(64) DEFAULT NULL AFTER claim_token,
+    ADD COLUMN lease_expires_at DATETIME DEFAULT NULL AFTER claimed_by,
+    ADD INDEX idx_seg_claim_token (claim_token),
+    ADD INDEX idx_seg_claimable (transcription_status, recording_status, session_id, segment_number);
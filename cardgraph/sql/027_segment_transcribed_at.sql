@@ -0,0 +1,8 @@
+-- Migration 027: When a segment's transcription finished
+-- completed_at is set by the recorder when the segment's audio is closed;
+-- transcribed_at is set by whichever worker commits the transcript. The
+-- archive compactor waits on it, so a segment transcribed hours after it
+-- was recorded still keeps its WAV for a while after the transcript lands.
+
+ALTER TABLE CG_TranscriptionSegments
+    ADD COLUMN transcribed_at DATETIME DEFAULT NULL AFTER completed_at;
@@ -82,11 +82,15 @@ class TranscriptionController
 
         // Validate ENUMs
         $enums = [
+            'segment_mode'     => ['fixed', 'pause'],
             'sample_rate'      => ['8000', '16000', '22050'],
             'audio_channels'   => ['mono', 'stereo'],
-            'audio_format'     => ['wav', 'flac'],
+            'audio_format'     => ['wav', 'flac', 'opus'],
             'whisper_model'    => ['tiny', 'base', 'small', 'medium', 'large'],
+            'inference_backend' => ['whisper', 'faster-whisper'],
             'priority_mode'    => ['low', 'normal'],
+            'session_runner'   => ['process', 'supervisor'],
+            'archive_codec'    => ['none', 'flac', 'opus'],
             'folder_structure' => ['year-based', 'flat'],
             'acquisition_mode' => ['direct_stream', 'browser_automation'],
         ];
@@ -100,6 +104,7 @@ class TranscriptionController
         $stmt = $pdo->prepare(
             "UPDATE CG_TranscriptionSettings SET
                 segment_length_minutes  = :segment_length,
+                segment_mode            = :segment_mode,
                 sample_rate             = :sample_rate,
                 audio_channels          = :audio_channels,
                 audio_format            = :audio_format,
@@ -108,18 +113,22 @@ class TranscriptionController
                 max_session_hours       = :max_hours,
                 max_cpu_cores           = :max_cpu,
                 whisper_model           = :whisper_model,
+                inference_backend       = :inference_backend,
                 priority_mode           = :priority_mode,
+                session_runner          = :session_runner,
                 base_archive_dir        = :archive_dir,
                 folder_structure        = :folder_structure,
                 min_free_disk_gb        = :min_disk,
                 acquisition_mode        = :acquisition_mode,
                 audio_retention_days    = :retention_days,
+                archive_codec           = :archive_codec,
                 updated_by              = :updated_by
              WHERE setting_id = 1"
         );
 
         $stmt->execute([
             ':segment_length'    => (int) ($body['segment_length_minutes'] ?? 15),
+            ':segment_mode'      => $body['segment_mode'] ?? 'fixed',
             ':sample_rate'       => $body['sample_rate'] ?? '16000',
             ':audio_channels'    => $body['audio_channels'] ?? 'mono',
             ':audio_format'      => $body['audio_format'] ?? 'wav',
@@ -128,12 +137,15 @@ class TranscriptionController
             ':max_hours'         => (int) ($body['max_session_hours'] ?? 10),
             ':max_cpu'           => (int) ($body['max_cpu_cores'] ?? 2),
             ':whisper_model'     => $body['whisper_model'] ?? 'base',
+            ':inference_backend' => $body['inference_backend'] ?? 'whisper',
             ':priority_mode'     => $body['priority_mode'] ?? 'low',
+            ':session_runner'    => $body['session_runner'] ?? 'process',
             ':archive_dir'       => trim($body['base_archive_dir'] ?? '/volume1/auction_archive/'),
             ':folder_structure'  => $body['folder_structure'] ?? 'year-based',
             ':min_disk'          => (int) ($body['min_free_disk_gb'] ?? 5),
             ':acquisition_mode'  => $body['acquisition_mode'] ?? 'direct_stream',
             ':retention_days'    => (int) ($body['audio_retention_days'] ?? 30),
+            ':archive_codec'     => $body['archive_codec'] ?? 'none',
             ':updated_by'        => $userId,
         ]);
 
@@ -239,16 +251,21 @@ class TranscriptionController
             jsonError('Invalid scheduled_start datetime', 400);
         }
 
+        if (!empty($body['override_inference_backend'])
+            && !in_array($body['override_inference_backend'], ['whisper', 'faster-whisper'], true)) {
+            jsonError('override_inference_backend must be one of: whisper, faster-whisper', 400);
+        }
+
         $stmt = $pdo->prepare(
             "INSERT INTO CG_TranscriptionSessions (
                 auction_name, auction_url, scheduled_start,
                 override_segment_length, override_silence_timeout,
                 override_max_duration, override_cpu_limit, override_acquisition_mode,
-                created_by
+                override_inference_backend, created_by
             ) VALUES (
                 :name, :url, :start,
                 :seg_len, :silence_to, :max_dur, :cpu_limit, :acq_mode,
-                :created_by
+                :backend, :created_by
             )"
         );
 
@@ -261,6 +278,7 @@ class TranscriptionController
             ':max_dur'    => isset($body['override_max_duration'])     ? (int) $body['override_max_duration']     : null,
             ':cpu_limit'  => isset($body['override_cpu_limit'])        ? (int) $body['override_cpu_limit']        : null,
             ':acq_mode'   => !empty($body['override_acquisition_mode']) ? $body['override_acquisition_mode']      : null,
+            ':backend'    => !empty($body['override_inference_backend']) ? $body['override_inference_backend']    : null,
             ':created_by' => $userId,
         ]);
 
@@ -340,6 +358,10 @@ class TranscriptionController
         if (!in_array($session['status'], ['scheduled', 'error', 'complete', 'stopped'], true)) {
             jsonError('Cannot edit a session that is currently recording or processing', 400);
         }
+        if (!empty($body['override_inference_backend'])
+            && !in_array($body['override_inference_backend'], ['whisper', 'faster-whisper'], true)) {
+            jsonError('override_inference_backend must be one of: whisper, faster-whisper', 400);
+        }
 
         $scheduledStart = !empty($body['scheduled_start']) ? parseDatetime($body['scheduled_start']) : null;
 
@@ -360,6 +382,7 @@ class TranscriptionController
                 override_max_duration     = :max_dur,
                 override_cpu_limit        = :cpu_limit,
                 override_acquisition_mode = :acq_mode,
+                override_inference_backend = :backend,
                 status = COALESCE(:reset_status, status),
                 stop_reason = CASE WHEN :reset_status2 IS NOT NULL THEN NULL ELSE stop_reason END,
                 actual_start_time = CASE WHEN :reset_status3 IS NOT NULL THEN NULL ELSE actual_start_time END,
@@ -377,6 +400,7 @@ class TranscriptionController
             ':max_dur'    => isset($body['override_max_duration'])     ? (int) $body['override_max_duration']     : null,
             ':cpu_limit'  => isset($body['override_cpu_limit'])        ? (int) $body['override_cpu_limit']        : null,
             ':acq_mode'   => !empty($body['override_acquisition_mode']) ? $body['override_acquisition_mode']      : null,
+            ':backend'    => !empty($body['override_inference_backend']) ? $body['override_inference_backend']    : null,
             ':reset_status'  => $resetStatus,
             ':reset_status2' => $resetStatus,
             ':reset_status3' => $resetStatus,
@@ -425,6 +449,7 @@ class TranscriptionController
         // Delete DB records (segments, logs, session)
         $pdo->prepare("DELETE FROM CG_TranscriptionSegments WHERE session_id = :id")->execute([':id' => $id]);
         $pdo->prepare("DELETE FROM CG_TranscriptionLogs WHERE session_id = :id")->execute([':id' => $id]);
+        $pdo->prepare("DELETE FROM CG_TranscriptionCaptureSpans WHERE session_id = :id")->execute([':id' => $id]);
         $pdo->prepare("DELETE FROM CG_TranscriptionSessions WHERE session_id = :id")->execute([':id' => $id]);
 
         // Clean up any leftover signal/lock files
@@ -1092,6 +1117,7 @@ class TranscriptionController
             // Delete DB records
             $pdo->prepare("DELETE FROM CG_TranscriptionSegments WHERE session_id = :id")->execute([':id' => $id]);
             $pdo->prepare("DELETE FROM CG_TranscriptionLogs WHERE session_id = :id")->execute([':id' => $id]);
+            $pdo->prepare("DELETE FROM CG_TranscriptionCaptureSpans WHERE session_id = :id")->execute([':id' => $id]);
             $pdo->prepare("DELETE FROM CG_TranscriptionSessions WHERE session_id = :id")->execute([':id' => $id]);
 
             // Clean up signal/lock files
@@ -1213,32 +1239,38 @@ class TranscriptionController
         $fullText = '';
         $segmentBoundaries = []; // [char_offset => segment_id, segment_number, timing]
         $sessionDir = rtrim($session['session_dir'], '/');
+        $texts = $this->loadSegmentTexts($sessionDir, $segments);
 
         foreach ($segments as $seg) {
-            $filePath = $sessionDir . '/transcripts/' . $seg['filename_transcript'];
-            if (!file_exists($filePath)) {
-                continue;
-            }
-            $text = file_get_contents($filePath);
-            if ($text === false || trim($text) === '') {
+            $text = $texts[(int) $seg['segment_number']] ?? null;
+            if ($text === null) {
                 continue;
             }
+            $filePath = $sessionDir . '/transcripts/' . $seg['filename_transcript'];
 
-            $offset = strlen($fullText);
-            $textLen = strlen($text) + 1; // +1 for the space we prepend
+            // Segments are joined with one space; offset is where this segment's own
+            // text (byte 0 of its .txt / .words offsets) starts in $fullText
+            $separator = $fullText === '' ? '' : ' ';
+            $offset = strlen($fullText) + strlen($separator);
             $segmentBoundaries[] = [
                 'offset'           => $offset,
-                'text_length'      => $textLen,
+                'text_length'      => strlen($text),
                 'segment_id'       => (int) $seg['segment_id'],
                 'segment_number'   => (int) $seg['segment_number'],
                 'started_at'       => $seg['started_at'],
                 'duration_seconds' => (int) ($seg['duration_seconds'] ?? 0),
+                'words_path'       => preg_replace('/\.txt$/', '.words', $filePath),
             ];
 
-            $fullText .= ' ' . $text;
+            $fullText .= $separator . $text;
         }
 
+        // Trimming the front moves every position; keep the boundaries in step
+        $lead = strlen($fullText) - strlen(ltrim($fullText));
         $fullText = trim($fullText);
+        foreach ($segmentBoundaries as $i => $boundary) {
+            $segmentBoundaries[$i]['offset'] -= $lead;
+        }
         if (strlen($fullText) < 50) {
             jsonError('Transcript text too short to parse', 400);
         }
@@ -1289,6 +1321,7 @@ class TranscriptionController
             $seq = 0;
             $highConf = 0;
             $lowConf = 0;
+            $wordTimings = []; // segment_id => sidecar columns (or null when absent)
             foreach ($records as $rec) {
                 $seq++;
                 $conf = (float) $rec['confidence'];
@@ -1303,8 +1336,20 @@ class TranscriptionController
                         $segId = $boundary['segment_id'];
                         $segNum = $boundary['segment_number'];
 
-                        // Interpolate timestamp within segment
-                        if ($boundary['started_at'] && $boundary['duration_seconds'] > 0 && $boundary['text_length'] > 0) {
+                        // Exact time from the word timing sidecar when the worker wrote one
+                        if (!array_key_exists($segId, $wordTimings)) {
+                            $wordTimings[$segId] = $this->loadWordTimings($boundary['words_path']);
+                        }
+                        $wordMs = $wordTimings[$segId]
+                            ? $this->wordStartAt($wordTimings[$segId], $rec['text_position'] - $boundary['offset'])
+                            : null;
+
+                        if ($boundary['started_at'] && $wordMs !== null) {
+                            $ts = new \DateTime($boundary['started_at']);
+                            $ts->modify('+' . (int) round($wordMs / 1000) . ' seconds');
+                            $estimatedAt = $ts->format('Y-m-d H:i:s');
+                        } elseif ($boundary['started_at'] && $boundary['duration_seconds'] > 0 && $boundary['text_length'] > 0) {
+                            // Interpolate timestamp within segment
                             $posInSegment = $rec['text_position'] - $boundary['offset'];
                             $fraction = $posInSegment / $boundary['text_length'];
                             $fraction = max(0, min(1, $fraction)); // clamp 0-1
@@ -1526,11 +1571,15 @@ class TranscriptionController
 
     /**
      * GET /api/transcription/sessions/{id}/transcript-text — Full concatenated transcript.
+     *
+     * Query: from / to (segment numbers) to load only part of a session.
      */
     public function getTranscriptText(array $params = []): void
     {
         Auth::getUserId();
         $sessionId = (int) ($params['id'] ?? 0);
+        $from = (int) ($_GET['from'] ?? 1);
+        $to = (int) ($_GET['to'] ?? PHP_INT_MAX);
         $pdo = cg_db();
 
         $stmt = $pdo->prepare("SELECT session_dir FROM CG_TranscriptionSessions WHERE session_id = :id");
@@ -1544,20 +1593,17 @@ class TranscriptionController
             "SELECT segment_number, filename_transcript
              FROM CG_TranscriptionSegments
              WHERE session_id = :id AND transcription_status = 'complete'
+               AND segment_number BETWEEN :from AND :to
              ORDER BY segment_number ASC"
         );
-        $segStmt->execute([':id' => $sessionId]);
+        $segStmt->execute([':id' => $sessionId, ':from' => $from, ':to' => $to]);
         $segments = $segStmt->fetchAll(PDO::FETCH_ASSOC);
 
         $sessionDir = rtrim($session['session_dir'], '/');
         $parts = [];
-        foreach ($segments as $seg) {
-            $filePath = $sessionDir . '/transcripts/' . $seg['filename_transcript'];
-            if (!file_exists($filePath)) continue;
-            $text = file_get_contents($filePath);
-            if ($text === false || trim($text) === '') continue;
+        foreach ($this->loadSegmentTexts($sessionDir, $segments) as $number => $text) {
             $parts[] = [
-                'segment_number' => (int) $seg['segment_number'],
+                'segment_number' => $number,
                 'text' => trim($text),
             ];
         }
@@ -1569,6 +1615,221 @@ class TranscriptionController
         ]);
     }
 
+    /**
+     * Transcript text per segment number, for segments in segment order.
+     *
+     * Reads through the master transcript's index (tools/cg_master.py): one
+     * open of <session>_FULL.txt and a seek per segment. Segments the index
+     * does not cover yet, or whose indexed range fails its checksum, are read
+     * from their own .txt file.
+     */
+    private function loadSegmentTexts(string $sessionDir, array $segments): array
+    {
+        $txDir = $sessionDir . '/transcripts';
+        $master = $txDir . '/' . basename($sessionDir) . '_FULL.txt';
+        $index = [];
+        $indexPath = substr($master, 0, -4) . '.idx';
+        if (is_readable($indexPath)) {
+            foreach (file($indexPath, FILE_IGNORE_NEW_LINES | FILE_SKIP_EMPTY_LINES) as $line) {
+                $entry = json_decode($line, true);
+                if (is_array($entry) && isset($entry['segment'])) {
+                    $index[(int) $entry['segment']] = $entry; // last line per segment wins
+                }
+            }
+        }
+        $fh = ($index && is_readable($master)) ? fopen($master, 'rb') : false;
+
+        $texts = [];
+        foreach ($segments as $seg) {
+            $number = (int) $seg['segment_number'];
+            $entry = $index[$number] ?? null;
+            $text = null;
+            if ($fh && $entry && $entry['file'] === $seg['filename_transcript']) {
+                fseek($fh, (int) $entry['offset']);
+                $slice = $entry['length'] > 0 ? fread($fh, (int) $entry['length']) : '';
+                if ($slice !== false && strlen($slice) === (int) $entry['length']
+                    && (!isset($entry['crc32']) || crc32($slice) === (int) $entry['crc32'])) {
+                    $text = $slice;
+                }
+            }
+            if ($text === null) {
+                $filePath = $txDir . '/' . $seg['filename_transcript'];
+                if (!file_exists($filePath)) continue;
+                $text = file_get_contents($filePath);
+            }
+            if ($text === false || trim($text) === '') continue;
+            $texts[$number] = $text;
+        }
+        if ($fh) {
+            fclose($fh);
+        }
+        return $texts;
+    }
+
+    /**
+     * GET /api/transcription/sessions/{id}/peaks — Waveform peaks for a range of segments.
+     *
+     * Query: block_ms (50, 400 or 3200; default 400), from / to (segment numbers).
+     * Each segment's peaks are base64 int8 [min, max] pairs, read from the
+     * peaks/*.peaks files the recorder writes (see tools/cg_peaks.py).
+     */
+    public function getSessionPeaks(array $params = []): void
+    {
+        Auth::getUserId();
+        $sessionId = (int) ($params['id'] ?? 0);
+        $blockMs = (int) ($_GET['block_ms'] ?? 400);
+        $from = (int) ($_GET['from'] ?? 1);
+        $to = (int) ($_GET['to'] ?? PHP_INT_MAX);
+        $pdo = cg_db();
+
+        $stmt = $pdo->prepare("SELECT session_dir FROM CG_TranscriptionSessions WHERE session_id = :id");
+        $stmt->execute([':id' => $sessionId]);
+        $session = $stmt->fetch(PDO::FETCH_ASSOC);
+        if (!$session) {
+            jsonError('Session not found', 404);
+        }
+
+        $segStmt = $pdo->prepare(
+            "SELECT segment_number, filename_audio, started_at, duration_seconds
+             FROM CG_TranscriptionSegments
+             WHERE session_id = :id AND recording_status = 'complete'
+               AND segment_number BETWEEN :from AND :to
+             ORDER BY segment_number ASC"
+        );
+        $segStmt->execute([':id' => $sessionId, ':from' => $from, ':to' => $to]);
+        $segments = $segStmt->fetchAll(PDO::FETCH_ASSOC);
+
+        $sessionDir = rtrim($session['session_dir'] ?? '', '/');
+        $out = [];
+        foreach ($segments as $seg) {
+            $stem = pathinfo((string) $seg['filename_audio'], PATHINFO_FILENAME);
+            $out[] = [
+                'segment_number'   => (int) $seg['segment_number'],
+                'started_at'       => $seg['started_at'],
+                'duration_seconds' => (int) $seg['duration_seconds'],
+                'peaks'            => $this->readPeaksLevel($sessionDir . '/peaks/' . $stem . '.peaks', $blockMs),
+            ];
+        }
+
+        jsonResponse([
+            'session_id' => $sessionId,
+            'block_ms'   => $blockMs,
+            'segments'   => $out,
+        ]);
+    }
+
+    /**
+     * One level of a CGP1 peaks file as base64, or null if the file or level is missing.
+     */
+    private function readPeaksLevel(string $path, int $blockMs): ?string
+    {
+        if (!is_file($path)) {
+            return null;
+        }
+        $data = file_get_contents($path);
+        if ($data === false || strlen($data) < 5 || substr($data, 0, 4) !== 'CGP1') {
+            return null;
+        }
+        $count = ord($data[4]);
+        $pos = 5;
+        $dataPos = 5 + 6 * $count;
+        for ($i = 0; $i < $count; $i++) {
+            $level = unpack('vblock_ms/Vblocks', $data, $pos);
+            $pos += 6;
+            if ($level['block_ms'] === $blockMs) {
+                return base64_encode(substr($data, $dataPos, $level['blocks'] * 2));
+            }
+            $dataPos += $level['blocks'] * 2;
+        }
+        return null;
+    }
+
+    /**
+     * GET /api/transcription/sessions/{id}/clip?start=&end= — WAV clip for a window (Unix seconds).
+     */
+    public function getSessionClip(array $params = []): void
+    {
+        Auth::getUserId();
+        $this->streamClip((int) ($params['id'] ?? 0), (float) ($_GET['start'] ?? 0), (float) ($_GET['end'] ?? 0));
+    }
+
+    /**
+     * GET /api/transcription/records/{id}/clip — WAV clip around a record's estimated_at.
+     *
+     * Query: before / after (seconds either side, defaults 5 / 20).
+     */
+    public function getRecordClip(array $params = []): void
+    {
+        Auth::getUserId();
+        $recordId = (int) ($params['id'] ?? 0);
+        $pdo = cg_db();
+
+        // Epoch from the DB so it matches how segment start times are stored
+        $stmt = $pdo->prepare(
+            "SELECT session_id, UNIX_TIMESTAMP(estimated_at) AS at_epoch
+             FROM CG_TranscriptionRecords WHERE record_id = :id"
+        );
+        $stmt->execute([':id' => $recordId]);
+        $record = $stmt->fetch(PDO::FETCH_ASSOC);
+        if (!$record) {
+            jsonError('Record not found', 404);
+        }
+        if ($record['at_epoch'] === null) {
+            jsonError('Record has no estimated time', 404);
+        }
+
+        $before = max(0, min(60, (float) ($_GET['before'] ?? 5)));
+        $after = max(1, min(60, (float) ($_GET['after'] ?? 20)));
+        $at = (float) $record['at_epoch'];
+        $this->streamClip((int) $record['session_id'], $at - $before, $at + $after);
+    }
+
+    /**
+     * Fetch a clip from tools/clip_service.py over its Unix socket and send it as audio/wav.
+     */
+    private function streamClip(int $sessionId, float $start, float $end): void
+    {
+        $socketPath = realpath(__DIR__ . '/../../tools') . '/clip_service.sock';
+        $sock = @stream_socket_client('unix://' . $socketPath, $errno, $errstr, 2);
+        if (!$sock) {
+            jsonError('Clip service is not running', 503);
+        }
+        stream_set_timeout($sock, 30);
+
+        fwrite($sock, json_encode([
+            'op' => 'clip', 'session_id' => $sessionId, 'start' => $start, 'end' => $end,
+        ]) . "\n");
+        $response = json_decode((string) fgets($sock), true);
+        if (!is_array($response)) {
+            fclose($sock);
+            jsonError('Clip service gave no answer', 502);
+        }
+        if (empty($response['ok'])) {
+            fclose($sock);
+            jsonError($response['error'] ?? 'Clip failed', !empty($response['not_found']) ? 404 : 400);
+        }
+
+        $length = (int) $response['bytes'];
+        $data = '';
+        while (strlen($data) < $length && !feof($sock)) {
+            $chunk = fread($sock, $length - strlen($data));
+            if ($chunk === false || $chunk === '') {
+                break;
+            }
+            $data .= $chunk;
+        }
+        fclose($sock);
+        if (strlen($data) !== $length) {
+            jsonError('Clip transfer was cut short', 502);
+        }
+
+        header('Content-Type: audio/wav');
+        header('Content-Length: ' . $length);
+        header('Cache-Control: private, max-age=3600');
+        echo $data;
+        exit;
+    }
+
     /**
      * GET /api/transcription/sessions/{id}/parse-runs — List all parse runs for a session.
      */
@@ -1657,18 +1918,29 @@ class TranscriptionController
 
         // Pick Whisper model: request body > settings > 'base'
         $body = getJsonBody();
-        $preferredModel = !empty($body['model']) ? $body['model'] : null;
-        if (!$preferredModel) {
-            $settings = $pdo->query(
-                "SELECT whisper_model FROM CG_TranscriptionSettings WHERE setting_id = 1"
-            )->fetch(PDO::FETCH_ASSOC);
-            $preferredModel = $settings['whisper_model'] ?? 'base';
+        $settings = $pdo->query(
+            "SELECT whisper_model, inference_backend FROM CG_TranscriptionSettings WHERE setting_id = 1"
+        )->fetch(PDO::FETCH_ASSOC);
+        $preferredModel = !empty($body['model']) ? $body['model'] : ($settings['whisper_model'] ?? 'base');
+
+        // Engine: request body > session override > settings
+        $stmt = $pdo->prepare(
+            "SELECT override_inference_backend FROM CG_TranscriptionSessions WHERE session_id = :id"
+        );
+        $stmt->execute([':id' => $sessionId]);
+        $backend = $body['backend'] ?? null;
+        if (!$backend) {
+            $backend = $stmt->fetchColumn() ?: ($settings['inference_backend'] ?? 'whisper');
+        }
+        if (!in_array($backend, ['whisper', 'faster-whisper'], true)) {
+            jsonError('backend must be one of: whisper, faster-whisper', 400);
         }
         $modelCache = $toolsDir . '/whisper_models';
 
         // Check if preferred model is available, otherwise use what we have
+        // (faster-whisper downloads its converted weights on first use)
         $model = $preferredModel;
-        if (is_dir($modelCache) && !file_exists($modelCache . '/' . $preferredModel . '.pt')) {
+        if ($backend === 'whisper' && is_dir($modelCache) && !file_exists($modelCache . '/' . $preferredModel . '.pt')) {
             // Find any available model, prefer larger ones
             $available = [];
             foreach (['large', 'medium', 'small', 'base', 'tiny'] as $m) {
@@ -1691,6 +1963,7 @@ class TranscriptionController
              . ' --session-id ' . $sessionId
              . ' --session-dir ' . escapeshellarg($session['session_dir'])
              . ' --model ' . escapeshellarg($model)
+             . ' --backend ' . escapeshellarg($backend)
              . ' > ' . escapeshellarg($outputFile) . ' 2>&1'
              . '; rm -f ' . escapeshellarg($lockFile);
 
@@ -1698,7 +1971,7 @@ class TranscriptionController
         shell_exec('nohup sh -c ' . escapeshellarg($cmd) . ' > /dev/null 2>&1 &');
 
         $this->insertLog($pdo, $sessionId, 'info', 'transcribe_triggered',
-            "Manual transcription triggered ($pendingCount pending segments, model: $model)");
+            "Manual transcription triggered ($pendingCount pending segments, model: $model, engine: $backend)");
 
         jsonResponse([
             'ok'             => true,
@@ -2169,6 +2442,45 @@ class TranscriptionController
 
     // ─── Private Helpers ──────────────────────────────────────────
 
+    /**
+     * Read a .words sidecar (see tools/cg_timing.py) into offset/start columns.
+     * Returns null when the file is missing or malformed.
+     */
+    private function loadWordTimings(string $path): ?array
+    {
+        $data = @file_get_contents($path);
+        if ($data === false || strlen($data) < 8 || substr($data, 0, 4) !== 'CGW1') {
+            return null;
+        }
+        $count = unpack('V', $data, 4)[1];
+        if ($count === 0 || strlen($data) < 8 + $count * 12) {
+            return null;
+        }
+        return [
+            'offsets' => array_values(unpack("V{$count}", $data, 8)),
+            'starts'  => array_values(unpack("V{$count}", $data, 8 + $count * 4)),
+        ];
+    }
+
+    /**
+     * Start time (ms into the segment) of the word at or before a byte position.
+     */
+    private function wordStartAt(array $timings, int $bytePos): int
+    {
+        $offsets = $timings['offsets'];
+        $lo = 0;
+        $hi = count($offsets) - 1;
+        while ($lo < $hi) {
+            $mid = intdiv($lo + $hi + 1, 2);
+            if ($offsets[$mid] <= $bytePos) {
+                $lo = $mid;
+            } else {
+                $hi = $mid - 1;
+            }
+        }
+        return $timings['starts'][$lo];
+    }
+
     /**
      * Insert a log entry for a session.
      */
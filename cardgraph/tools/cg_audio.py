@@ -0,0 +1,240 @@
+"""
+Card Graph — Shared Audio Helpers
+
+PCM decoding and cheap energy-based voice-activity detection used by the
+transcription workers and the Whisper daemon. Everything works on mono
+float32 samples in [-1, 1] at Whisper's 16 kHz input rate.
+"""
+import struct
+import subprocess
+
+import numpy as np
+
+SAMPLE_RATE = 16000         # Whisper's native input rate
+BLOCK_SEC = 0.1             # energy is measured per 100 ms block
+MIN_SILENCE_SEC = 2.0       # shorter pauses are normal speech rhythm, keep them
+PAD_SEC = 0.25              # speech kept on each side of a trimmed silence
+MIN_SPEECH_SEC = 1.0        # less voiced audio than this counts as a silent segment
+MIN_CHUNK_SEC = 30.0        # one Whisper window; smaller chunks lose context for no gain
+CUT_SEARCH_SEC = 5.0        # how far from the ideal cut to look for a quiet point
+
+
+def load_pcm(path, sample_rate=SAMPLE_RATE):
+    """Decode any ffmpeg-readable file to mono float32 samples in memory."""
+    cmd = [
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-i', path,
+        '-f', 's16le', '-ac', '1', '-ar', str(sample_rate),
+        '-',
+    ]
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {proc.stderr.decode('utf-8', 'replace')[-300:]}")
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_bytes(data, sample_rate=SAMPLE_RATE):
+    """Like load_pcm, for a file already read into memory (fed to ffmpeg on stdin).
+
+    Lets a worker read a segment over the network once, hash it for the
+    transcript cache and decode it without touching the share again.
+    """
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-i', 'pipe:0',
+        '-f', 's16le', '-ac', '1', '-ar', str(sample_rate),
+        '-',
+    ]
+    proc = subprocess.run(cmd, input=data, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {proc.stderr.decode('utf-8', 'replace')[-300:]}")
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def wav_header(data_bytes, rate, channels):
+    """Canonical 44-byte header for 16-bit PCM WAV."""
+    block_align = channels * 2
+    return struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_bytes, b'WAVE', b'fmt ', 16, 1,
+                       channels, rate, rate * block_align, block_align, 16, b'data', data_bytes)
+
+
+def wav_layout(f, path=''):
+    """(channels, rate, block_align, data_offset, total_frames) of an open 16-bit PCM WAV.
+
+    The RIFF/data sizes of a file ffmpeg is still writing are placeholders,
+    so the data length is taken from the current file size instead.
+    """
+    f.seek(0)
+    header = f.read(4096)
+    if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        raise ValueError(f"Not a WAV file: {path}")
+
+    # Walk the chunks up to 'data' (ffmpeg may insert a LIST chunk first)
+    pos, fmt, data_offset = 12, None, None
+    while pos + 8 <= len(header):
+        chunk_id, chunk_size = header[pos:pos + 4], struct.unpack_from('<I', header, pos + 4)[0]
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack_from('<HHIIHH', header, pos + 8)
+        elif chunk_id == b'data':
+            data_offset = pos + 8
+            break
+        pos += 8 + chunk_size + (chunk_size & 1)
+    if fmt is None or data_offset is None:
+        raise ValueError(f"WAV header incomplete: {path}")
+
+    _, channels, rate, _, block_align, bits = fmt
+    if bits != 16:
+        raise ValueError(f"Only 16-bit PCM WAV is supported, got {bits}-bit")
+
+    f.seek(0, 2)
+    return channels, rate, block_align, data_offset, (f.tell() - data_offset) // block_align
+
+
+def read_wav_range(path, start_sec=0.0, end_sec=None, sample_rate=SAMPLE_RATE):
+    """Read part of a 16-bit PCM WAV that may still be growing.
+
+    Returns (samples, available_sec) where available_sec is the total audio
+    written so far. Stereo is downmixed and other rates resampled linearly.
+    """
+    with open(path, 'rb') as f:
+        channels, rate, block_align, data_offset, total_frames = wav_layout(f, path)
+        first = min(total_frames, int(start_sec * rate))
+        last = total_frames if end_sec is None else min(total_frames, int(end_sec * rate))
+        f.seek(data_offset + first * block_align)
+        raw = f.read(max(0, last - first) * block_align)
+
+    pcm = np.frombuffer(raw[:len(raw) - len(raw) % block_align], np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate and len(pcm):
+        target_len = int(len(pcm) * sample_rate / rate)
+        pcm = np.interp(np.linspace(0, len(pcm) - 1, target_len), np.arange(len(pcm)), pcm).astype(np.float32)
+    return pcm, total_frames / rate
+
+
+def wav_available_sec(path):
+    """Seconds of audio written so far to a (possibly growing) WAV."""
+    return read_wav_range(path, 0.0, 0.0)[1]
+
+
+def block_dbfs(samples, sample_rate=SAMPLE_RATE, block_sec=BLOCK_SEC):
+    """RMS level of each fixed-size block, in dBFS."""
+    block = max(1, int(sample_rate * block_sec))
+    usable = len(samples) - len(samples) % block
+    if usable == 0:
+        return np.zeros(0, dtype=np.float32)
+    blocks = samples[:usable].reshape(-1, block)
+    rms = np.sqrt(np.mean(np.square(blocks, dtype=np.float64), axis=1))
+    return (20.0 * np.log10(np.maximum(rms, 1e-10))).astype(np.float32)
+
+
+def find_silent_ranges(samples, threshold_dbfs, sample_rate=SAMPLE_RATE,
+                       min_silence_sec=MIN_SILENCE_SEC, pad_sec=PAD_SEC):
+    """Return [(start_sec, end_sec)] spans quieter than threshold_dbfs.
+
+    Only pauses of at least min_silence_sec are reported, and each range is
+    shrunk by pad_sec on both sides so word onsets/tails are never clipped.
+    """
+    levels = block_dbfs(samples, sample_rate)
+    if len(levels) == 0:
+        return []
+
+    quiet = np.concatenate(([0], (levels <= threshold_dbfs).astype(np.int8), [0]))
+    edges = np.diff(quiet)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    total_sec = len(samples) / sample_rate
+    min_blocks = int(round(min_silence_sec / BLOCK_SEC))
+    ranges = []
+    for s, e in zip(starts, ends):
+        if e - s < min_blocks:
+            continue
+        start = int(s) * BLOCK_SEC
+        end = min(int(e) * BLOCK_SEC, total_sec)
+        # Silence touching the file edges needs no padding on that side
+        if start > 0:
+            start += pad_sec
+        if end < total_sec:
+            end -= pad_sec
+        if end > start:
+            ranges.append((round(start, 2), round(end, 2)))
+    return ranges
+
+
+def speech_spans(silent_ranges, total_sec):
+    """Complement of silent_ranges over [0, total_sec]."""
+    spans = []
+    cursor = 0.0
+    for start, end in silent_ranges:
+        if start > cursor:
+            spans.append((round(cursor, 2), start))
+        cursor = end
+    if cursor < total_sec:
+        spans.append((round(cursor, 2), round(total_sec, 2)))
+    return spans
+
+
+def concat_spans(samples, spans, sample_rate=SAMPLE_RATE):
+    """Join the given [(start_sec, end_sec)] spans into one sample array."""
+    if not spans:
+        return samples[:0]
+    parts = [samples[int(s * sample_rate):int(e * sample_rate)] for s, e in spans]
+    return np.concatenate(parts)
+
+
+def vad_trim(samples, threshold_dbfs, sample_rate=SAMPLE_RATE):
+    """Drop silent stretches before inference.
+
+    Returns (trimmed_samples, silent_ranges, speech_seconds). trimmed_samples
+    is None when the audio holds less than MIN_SPEECH_SEC of voiced signal,
+    meaning Whisper should not be run at all.
+    """
+    total_sec = len(samples) / sample_rate
+    silent = find_silent_ranges(samples, threshold_dbfs, sample_rate)
+    spans = speech_spans(silent, total_sec)
+    speech_sec = sum(e - s for s, e in spans)
+    if speech_sec < MIN_SPEECH_SEC:
+        return None, silent, speech_sec
+    if not silent:
+        return samples, silent, speech_sec
+    return concat_spans(samples, spans, sample_rate), silent, speech_sec
+
+
+def quietest_point(samples, lo_sec, hi_sec, sample_rate=SAMPLE_RATE):
+    """Time of the lowest-energy block between lo_sec and hi_sec."""
+    lo_sec = max(lo_sec, 0.0)
+    levels = block_dbfs(samples[int(lo_sec * sample_rate):int(hi_sec * sample_rate)], sample_rate)
+    if len(levels) == 0:
+        return round((lo_sec + hi_sec) / 2, 2)
+    return round(lo_sec + (int(np.argmin(levels)) + 0.5) * BLOCK_SEC, 2)
+
+
+def plan_chunks(samples, spans, n_chunks, sample_rate=SAMPLE_RATE, min_chunk_sec=MIN_CHUNK_SEC):
+    """Group speech spans into up to n_chunks independently decodable chunks.
+
+    Chunks hold roughly equal amounts of voiced audio and are cut at the
+    silences between spans. A span too long to fit is cut at the quietest
+    point near the ideal boundary, so words are not split.
+    Returns a list of chunks, each a list of (start_sec, end_sec) spans.
+    """
+    voiced = sum(e - s for s, e in spans)
+    target = max(min_chunk_sec, voiced / max(1, n_chunks))
+
+    pieces = []
+    for start, end in spans:
+        while end - start > target * 1.2:
+            ideal = start + target
+            cut = quietest_point(samples, ideal - CUT_SEARCH_SEC, ideal + CUT_SEARCH_SEC, sample_rate)
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+
+    # Each piece goes to the chunk its midpoint falls in, by cumulative voiced time
+    chunks = [[] for _ in range(max(1, n_chunks))]
+    elapsed = 0.0
+    for start, end in pieces:
+        index = min(len(chunks) - 1, int((elapsed + (end - start) / 2) // target))
+        chunks[index].append((start, end))
+        elapsed += end - start
+    return [chunk for chunk in chunks if chunk]
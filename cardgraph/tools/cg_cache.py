@@ -0,0 +1,82 @@
+"""
+Card Graph — Transcript Cache
+
+Content-addressed store of transcription results in MariaDB
+(CG_TranscriptCache), shared by the NAS and PC workers. Entries are keyed by
+the SHA-256 of the audio bytes, the model spec (see cg_inference) and a hash
+of the decode options that change the output, so a segment that is retried
+after a crash or a skipped/error reset finishes without running Whisper again.
+
+Cache failures never fail a segment: lookups fall back to a miss and stores
+are dropped.
+"""
+import hashlib
+import json
+
+READ_BLOCK = 1024 * 1024
+
+
+def audio_digest(path):
+    """SHA-256 of a file's contents (hex)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def bytes_digest(data):
+    """SHA-256 of file contents already in memory (hex); same value as audio_digest."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def options_hash(options):
+    """Stable hash of the decode options that affect the transcript."""
+    canonical = json.dumps(options or {}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def lookup(db, digest, model_spec, options=None):
+    """Return the cached result dict, or None on a miss."""
+    key = (digest, model_spec, options_hash(options))
+    try:
+        with db.cursor() as cur:
+            cur.execute(
+                "SELECT result_json FROM CG_TranscriptCache "
+                "WHERE audio_sha256 = %s AND model_spec = %s AND options_hash = %s",
+                key
+            )
+            row = cur.fetchone()
+            if not row:
+                return None
+            cur.execute(
+                "UPDATE CG_TranscriptCache SET hit_count = hit_count + 1, last_hit_at = NOW() "
+                "WHERE audio_sha256 = %s AND model_spec = %s AND options_hash = %s",
+                key
+            )
+        result = json.loads(row['result_json'])
+    except Exception as e:
+        print(f"Transcript cache lookup failed: {e}", flush=True)
+        return None
+    result['cached'] = True
+    return result
+
+
+def store(db, digest, model_spec, options, result, audio_bytes=None):
+    """Save a worker result. Returns True if it was written."""
+    keep = {k: v for k, v in result.items() if k not in ('ok', 'pid', 'elapsed', 'cached')}
+    try:
+        with db.cursor() as cur:
+            cur.execute(
+                "INSERT INTO CG_TranscriptCache "
+                "(audio_sha256, model_spec, options_hash, text, result_json, audio_bytes, elapsed_seconds) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE text = VALUES(text), result_json = VALUES(result_json), "
+                "elapsed_seconds = VALUES(elapsed_seconds)",
+                (digest, model_spec, options_hash(options), keep.get('text', ''),
+                 json.dumps(keep), audio_bytes, result.get('elapsed'))
+            )
+        return True
+    except Exception as e:
+        print(f"Transcript cache store failed: {e}", flush=True)
+        return False
@@ -0,0 +1,150 @@
+"""
+Card Graph — Segment Leases
+
+PC workers used to claim one segment in three round trips (SELECT a
+candidate, conditional UPDATE, SELECT *); two workers picking the same
+candidate meant the loser got nothing back although plenty was pending.
+A Lease claims up to N segments with a single UPDATE ... ORDER BY ... LIMIT
+that stamps them with a fresh claim token, then reads them back by that
+token. The UPDATE is atomic, so every worker gets disjoint rows and none
+comes back empty while claimable segments remain.
+
+    lease = cg_claim.Lease(db, batch=3)
+    for segment in lease.segments(session_id):   # claims a new batch when empty
+        with lease.heartbeat(segment):           # renewed while the decode runs
+            ...
+        ...                                      # complete / error / skip by segment_id,
+                                                 # clearing claim_token and lease_expires_at
+    lease.release()                              # hand back anything not started
+
+A lease lasts LEASE_SEC_PER_SEGMENT for each segment still held and is
+renewed as each segment starts, and every RENEW_SEC during its decode
+(however long a large model takes). Segments whose lease ran out (a worker
+that crashed or was closed) are claimable again; rows the NAS worker marks
+transcribing carry no lease and are never taken.
+"""
+import socket
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import cg_db
+
+DEFAULT_BATCH = 3
+LEASE_SEC_PER_SEGMENT = 1800
+RENEW_SEC = LEASE_SEC_PER_SEGMENT // 3     # heartbeat interval during a decode
+
+_CLAIMABLE = (
+    "recording_status = 'complete' AND (transcription_status = 'pending' OR "
+    "(transcription_status = 'transcribing' AND lease_expires_at < NOW()))"
+)
+
+
+def worker_name():
+    return socket.gethostname()[:64]
+
+
+def claim_segments(db, token, limit, session_id=None, owner=None):
+    """Lease up to limit claimable segments to token; returns their rows in order."""
+    sql = ("UPDATE CG_TranscriptionSegments SET transcription_status = 'transcribing', "
+           "claim_token = %s, claimed_by = %s, "
+           "lease_expires_at = NOW() + INTERVAL %s SECOND "
+           f"WHERE {_CLAIMABLE}")
+    params = [token, owner or worker_name(), LEASE_SEC_PER_SEGMENT * limit]
+    if session_id:
+        sql += " AND session_id = %s"
+        params.append(session_id)
+    sql += " ORDER BY session_id ASC, segment_number ASC LIMIT %s"
+    params.append(limit)
+    if not db.execute(sql, params):
+        return []
+    return db.query(
+        "SELECT * FROM CG_TranscriptionSegments WHERE claim_token = %s "
+        "AND transcription_status = 'transcribing' "
+        "ORDER BY session_id ASC, segment_number ASC",
+        (token,)
+    )
+
+
+class Lease:
+    """A worker's current batch of leased segments."""
+
+    def __init__(self, db, batch=DEFAULT_BATCH, owner=None):
+        self.db = db
+        self.batch = max(1, batch)
+        self.owner = owner or worker_name()
+        self.token = None
+        self.held = deque()
+
+    def next(self, session_id=None):
+        """The next leased segment, claiming a new batch when none are held; None when drained."""
+        if self.held:
+            self.renew()
+        else:
+            self.token = uuid.uuid4().hex
+            self.held.extend(claim_segments(self.db, self.token, self.batch, session_id, self.owner))
+        return self.held.popleft() if self.held else None
+
+    def segments(self, session_id=None):
+        while True:
+            segment = self.next(session_id)
+            if segment is None:
+                return
+            yield segment
+
+    def renew(self):
+        """Push the lease out again for the segment starting now and those still held."""
+        self.db.execute(
+            "UPDATE CG_TranscriptionSegments "
+            "SET lease_expires_at = NOW() + INTERVAL %s SECOND "
+            "WHERE claim_token = %s AND transcription_status = 'transcribing'",
+            (LEASE_SEC_PER_SEGMENT * len(self.held), self.token)
+        )
+
+    @contextmanager
+    def heartbeat(self, segment):
+        """Keep segment's lease from running out while the body (a decode) runs.
+
+        The renewals come from a thread on a connection of its own, opened only
+        once a decode outlasts RENEW_SEC, since the caller's is not shared.
+        """
+        stop = threading.Event()
+
+        def beat():
+            db = None
+            while not stop.wait(RENEW_SEC):
+                try:
+                    db = db or cg_db.get_db()
+                    db.execute(
+                        "UPDATE CG_TranscriptionSegments "
+                        "SET lease_expires_at = NOW() + INTERVAL %s SECOND "
+                        "WHERE segment_id = %s AND claim_token = %s "
+                        "AND transcription_status = 'transcribing'",
+                        (LEASE_SEC_PER_SEGMENT, segment['segment_id'], self.token)
+                    )
+                except Exception as e:
+                    print(f"[WARNING] Lease renewal for segment {segment['segment_id']} failed: {e}", flush=True)
+            if db is not None:
+                db.close()
+
+        thread = threading.Thread(target=beat, name='cg-lease-heartbeat', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+
+    def release(self):
+        """Return held (not yet started) segments to pending for other workers."""
+        if not self.held:
+            return 0
+        ids = [segment['segment_id'] for segment in self.held]
+        self.held.clear()
+        return self.db.execute(
+            "UPDATE CG_TranscriptionSegments SET transcription_status = 'pending', "
+            "claim_token = NULL, claimed_by = NULL, lease_expires_at = NULL "
+            "WHERE claim_token = %s AND transcription_status = 'transcribing' "
+            f"AND segment_id IN ({', '.join(['%s'] * len(ids))})",
+            [self.token, *ids]
+        )
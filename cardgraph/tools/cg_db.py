@@ -0,0 +1,361 @@
+"""
+Card Graph — Shared DB Access
+
+Every tool used to open a bare pymysql connection and hold it for hours, so
+a MariaDB restart mid-auction killed whatever was using it. get_db() still
+returns something that works like that connection, but:
+
+    a statement that fails because the connection dropped reconnects (with
+    backoff, for up to RECONNECT_GIVE_UP_SEC) and runs again, unless it may
+    already have been applied or it was part of an open transaction
+    idle connections are pinged every KEEPALIVE_SEC (and have TCP keepalive
+    on), so the server's wait_timeout never closes one under a session
+    every statement is timed into the module-level stats
+
+    db = cg_db.get_db()
+    row = db.query_one("SELECT ... WHERE session_id = %s", (sid,))
+    rows = db.query("SELECT ...", params)
+    count = db.execute("UPDATE ...", params)     # rowcount
+    with db.cursor() as cur: ...                 # plain pymysql style, still retried
+    print(cg_db.stats.summary())                 # "412 queries, avg 3.1 ms, ..."
+
+Threaded services share a Pool instead of one connection per thread:
+
+    pool = cg_db.Pool(size=4)
+    with pool.connection() as db:
+        db.query(...)
+
+pymysql has no server-side prepared statements; parameters are still bound
+client-side. config defaults to cg_config.DB_CONFIG; the Docker recorder
+passes its own.
+"""
+import re
+import socket
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+
+import pymysql
+
+CONNECT_TIMEOUT = 10
+KEEPALIVE_SEC = 120         # ping connections idle this long
+RETRY_MAX_SEC = 30          # backoff ceiling between reconnect attempts
+RECONNECT_GIVE_UP_SEC = 600 # a DB down longer than this is an error again
+MAX_ATTEMPTS = 3            # runs of one statement across reconnects
+SLOW_SEC = 1.0
+
+# Client errors for a connection that is gone; 2013 (lost during query) may
+# have been applied, so only reads are repeated after it
+_CONNECT_ERRORS = {2003, 2006, 2013, 2055}
+_LOST_DURING_QUERY = 2013
+_READ = re.compile(r'^\s*(SELECT|SHOW|DESCRIBE|EXPLAIN)\b', re.IGNORECASE)
+
+
+class QueryStats:
+    """Process-wide statement counters (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.queries = 0
+            self.total_sec = 0.0
+            self.max_sec = 0.0
+            self.slow = 0
+            self.errors = 0
+            self.reconnects = 0
+
+    def record(self, elapsed):
+        with self._lock:
+            self.queries += 1
+            self.total_sec += elapsed
+            self.max_sec = max(self.max_sec, elapsed)
+            if elapsed >= SLOW_SEC:
+                self.slow += 1
+
+    def count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'queries': self.queries,
+                'avg_ms': round(self.total_sec * 1000 / self.queries, 2) if self.queries else 0.0,
+                'max_ms': round(self.max_sec * 1000, 1),
+                'slow': self.slow,
+                'errors': self.errors,
+                'reconnects': self.reconnects,
+            }
+
+    def summary(self):
+        s = self.snapshot()
+        return (f"{s['queries']} queries, avg {s['avg_ms']} ms, max {s['max_ms']} ms, "
+                f"{s['slow']} slow, {s['errors']} failed, {s['reconnects']} reconnects")
+
+
+stats = QueryStats()
+
+
+def _default_config():
+    from cg_config import DB_CONFIG
+    return DB_CONFIG
+
+
+def _error_code(e):
+    return e.args[0] if e.args and isinstance(e.args[0], int) else 0
+
+
+class _Cursor:
+    """pymysql cursor whose execute() is timed and survives a dropped connection."""
+
+    def __init__(self, db):
+        self._db = db
+        self._cur = db._raw().cursor()
+
+    def execute(self, sql, params=None):
+        db = self._db
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            start = time.perf_counter()
+            try:
+                with db._lock:
+                    result = self._cur.execute(sql, params)
+            except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+                if attempt == MAX_ATTEMPTS or not db._may_retry(e, sql):
+                    stats.count('errors')
+                    raise
+                print(f"[WARNING] DB connection lost ({e}) — reconnecting", flush=True)
+                db._reconnect()
+                self._cur = db._raw().cursor()
+                continue
+            stats.record(time.perf_counter() - start)
+            db._used(sql)
+            return result
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cur.close()
+
+
+class Connection:
+    """A reconnecting pymysql connection; anything not defined here is passed through."""
+
+    def __init__(self, config=None, dict_rows=True, autocommit=True):
+        self._config = config or _default_config()
+        self._cursorclass = pymysql.cursors.DictCursor if dict_rows else pymysql.cursors.Cursor
+        self._autocommit = autocommit
+        self._conn = None
+        self._lock = threading.RLock()
+        self._in_tx = False         # explicit begin() ... commit()/rollback()
+        self._dirty = False         # statements since the last commit (autocommit off)
+        self.last_used = time.time()
+        self._open(RECONNECT_GIVE_UP_SEC)
+        _keepalive.add(self)
+
+    # ── Connection handling ──
+
+    def _open(self, give_up_sec):
+        deadline = time.time() + give_up_sec
+        delay = 1
+        while True:
+            try:
+                conn = pymysql.connect(**self._config, cursorclass=self._cursorclass,
+                                       autocommit=self._autocommit, connect_timeout=CONNECT_TIMEOUT)
+                break
+            except pymysql.err.OperationalError as e:
+                if time.time() + delay > deadline:
+                    raise
+                print(f"[WARNING] DB connect failed ({e}) — retrying in {delay}s", flush=True)
+                time.sleep(delay)
+                delay = min(RETRY_MAX_SEC, delay * 2)
+        try:
+            conn._sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        except (AttributeError, OSError):
+            pass
+        self._conn = conn
+        self.last_used = time.time()
+
+    def _raw(self):
+        with self._lock:
+            if self._conn is None:
+                self._open(RECONNECT_GIVE_UP_SEC)
+            return self._conn
+
+    def _reconnect(self):
+        stats.count('reconnects')
+        with self._lock:
+            self._discard()
+            self._open(RECONNECT_GIVE_UP_SEC)
+
+    def _discard(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _may_retry(self, e, sql):
+        if self._in_tx or self._dirty:
+            return False  # the rest of the transaction is gone with the connection
+        if isinstance(e, pymysql.err.InterfaceError):
+            return True
+        code = _error_code(e)
+        if code == _LOST_DURING_QUERY:
+            return bool(_READ.match(sql))
+        return code in _CONNECT_ERRORS
+
+    def _used(self, sql):
+        self.last_used = time.time()
+        if not self._autocommit and not _READ.match(sql):
+            self._dirty = True
+
+    def keepalive(self):
+        """Ping if idle and not busy; a dead connection is reopened on next use."""
+        if self._in_tx or time.time() - self.last_used < KEEPALIVE_SEC:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._conn is not None:
+                try:
+                    self._conn.ping(reconnect=False)
+                    self.last_used = time.time()
+                except pymysql.err.Error:
+                    self._discard()
+        finally:
+            self._lock.release()
+
+    # ── pymysql surface ──
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def begin(self):
+        self._raw().begin()
+        self._in_tx = True
+
+    def commit(self):
+        try:
+            self._raw().commit()
+        finally:
+            self._in_tx = self._dirty = False
+
+    def rollback(self):
+        try:
+            if self._conn is not None:
+                self._conn.rollback()
+        finally:
+            self._in_tx = self._dirty = False
+
+    def close(self):
+        _keepalive.discard(self)
+        with self._lock:
+            self._discard()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._raw(), name)
+
+    # ── Statement helpers ──
+
+    def query(self, sql, params=None):
+        with self.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+    def query_one(self, sql, params=None):
+        with self.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchone()
+
+    def execute(self, sql, params=None):
+        with self.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.rowcount
+
+
+class _Keepalive:
+    """One daemon thread pinging every live Connection that has gone idle."""
+
+    def __init__(self):
+        self._conns = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, conn):
+        with self._lock:
+            self._conns.add(conn)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cg-db-keepalive', daemon=True)
+                self._thread.start()
+
+    def discard(self, conn):
+        with self._lock:
+            self._conns.discard(conn)
+
+    def _run(self):
+        while True:
+            time.sleep(KEEPALIVE_SEC / 2)
+            with self._lock:
+                conns = list(self._conns)
+            for conn in conns:
+                try:
+                    conn.keepalive()
+                except Exception:
+                    pass
+
+
+_keepalive = _Keepalive()
+
+
+def get_db(config=None, dict_rows=True, autocommit=True):
+    """A reconnecting connection (DictCursor rows and autocommit, as every tool used)."""
+    return Connection(config, dict_rows, autocommit)
+
+
+class Pool:
+    """Up to size Connections shared by threads; idle ones are reused most-recent first."""
+
+    def __init__(self, size=4, config=None, dict_rows=True):
+        self._config = config
+        self._dict_rows = dict_rows
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                db = self._idle.get_nowait()
+            except Empty:
+                db = Connection(self._config, self._dict_rows)
+            try:
+                yield db
+            finally:
+                if db._in_tx:
+                    db.rollback()
+                self._idle.put(db)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
@@ -0,0 +1,206 @@
+"""
+Card Graph — Background DB Writer
+
+Capture and transcription loops should never wait on MariaDB for writes
+nobody reads back immediately (log lines, segment bookkeeping, progress).
+DBWriter queues them and a background thread applies them on its own
+connection:
+
+    writer = cg_dbwriter.DBWriter(get_db)
+    writer.log(session_id, 'info', 'segment_started', 'Recording segment 3')
+    writer.execute("UPDATE CG_TranscriptionSegments SET ... WHERE ...", params,
+                   after=lambda: cg_notify.notify(session_id, 'segment_complete'))
+    writer.close()      # flushes whatever is still queued
+
+Writes are applied strictly in submission order, so per-session order is
+kept. Each flush is one transaction, and consecutive INSERTs with the same
+SQL (typically log lines) are folded into one multi-row INSERT. A flush
+happens every FLUSH_SEC, or sooner once MAX_BATCH writes are waiting.
+after= callbacks run once their write is committed, for anything that must
+not happen before the row exists. If the DB is unreachable the batch is
+retried with backoff while the caller keeps queueing.
+"""
+import re
+import threading
+import time
+from collections import deque
+
+import pymysql
+
+FLUSH_SEC = 0.5
+MAX_BATCH = 500
+RETRY_MAX_SEC = 30
+CLOSE_TIMEOUT_SEC = 15
+
+LOG_SQL = ("INSERT INTO CG_TranscriptionLogs (session_id, log_level, event_type, message) "
+           "VALUES (%s, %s, %s, %s)")
+
+# Single-row INSERT ... VALUES (...) that can be folded into a multi-row one
+_INSERT_VALUES = re.compile(r'^(INSERT\s+INTO\s+.+?\s+VALUES\s*)(\(.*\))\s*$', re.IGNORECASE | re.DOTALL)
+
+
+class DBWriter:
+    """Ordered, batched, fire-and-forget writes on a background thread."""
+
+    def __init__(self, connect, flush_sec=FLUSH_SEC):
+        self._connect = connect
+        self._flush_sec = flush_sec
+        self._db = None
+        self._queue = deque()       # (sql, params, after)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name='cg-dbwriter', daemon=True)
+        self._thread.start()
+
+    def execute(self, sql, params=(), after=None):
+        """Queue one statement; returns immediately."""
+        with self._cond:
+            self._queue.append((sql, tuple(params), after))
+            if len(self._queue) >= MAX_BATCH:
+                self._cond.notify_all()
+
+    def log(self, session_id, level, event_type, message):
+        """Queue a CG_TranscriptionLogs row."""
+        self.execute(LOG_SQL, (session_id, level, event_type, message))
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is committed. Returns False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=CLOSE_TIMEOUT_SEC):
+        """Flush and stop the writer thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._queue:
+            print(f"[WARNING] DB writer closed with {len(self._queue)} writes not applied", flush=True)
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closing and len(self._queue) < MAX_BATCH:
+                    self._cond.wait(self._flush_sec)
+                if not self._queue:
+                    if self._closing:
+                        return
+                    continue
+                batch = [self._queue.popleft() for _ in range(min(MAX_BATCH, len(self._queue)))]
+                self._in_flight = len(batch)
+
+            for _, _, after in self._apply_with_retry(batch):
+                if after:
+                    try:
+                        after()
+                    except Exception as e:
+                        print(f"[WARNING] DB writer callback failed: {e}", flush=True)
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _apply_with_retry(self, batch):
+        """Apply batch; returns the entries that were committed, in order."""
+        applied = []
+        delay = 1
+        while batch:
+            try:
+                if self._db is None:
+                    self._db = self._connect()
+                self._apply(batch)
+                return applied + batch
+            except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+                # Connection trouble: reconnect and retry the whole (rolled back) batch
+                print(f"[WARNING] DB writer: {e} — retrying in {delay}s", flush=True)
+                self._drop_connection()
+            except Exception as e:
+                # A bad statement must not take the rest of the batch with it
+                print(f"[WARNING] DB writer batch failed ({e}); applying one by one", flush=True)
+                done, batch = self._apply_singly(batch)
+                applied += done
+                if not batch:
+                    break
+                # The connection went mid-way: what did not run is retried from here
+            if self._closing and delay >= RETRY_MAX_SEC:
+                print(f"[ERROR] DB writer gave up on {len(batch)} writes at shutdown", flush=True)
+                break
+            time.sleep(delay)
+            delay = min(RETRY_MAX_SEC, delay * 2)
+        return applied
+
+    def _apply(self, batch):
+        self._db.begin()
+        try:
+            with self._db.cursor() as cur:
+                for sql, params in _fold_inserts(batch):
+                    cur.execute(sql, params)
+            self._db.commit()
+        except Exception:
+            try:
+                self._db.rollback()
+            except Exception:
+                pass
+            raise
+
+    def _apply_singly(self, batch):
+        """Apply statements one at a time, dropping bad ones. Returns (applied, not yet run)."""
+        applied = []
+        for i, entry in enumerate(batch):
+            sql, params, _ = entry
+            try:
+                with self._db.cursor() as cur:
+                    cur.execute(sql, params)
+                self._db.commit()
+            except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+                print(f"[WARNING] DB writer: {e} — {len(batch) - i} writes left to retry", flush=True)
+                self._drop_connection()
+                return applied, batch[i:]
+            except Exception as e:
+                print(f"[ERROR] DB writer dropped statement: {e}: {sql[:120]}", flush=True)
+                continue
+            applied.append(entry)
+        return applied, []
+
+    def _drop_connection(self):
+        try:
+            if self._db is not None:
+                self._db.close()
+        except Exception:
+            pass
+        self._db = None
+
+
+def _fold_inserts(batch):
+    """Merge runs of identical single-row INSERTs into multi-row statements."""
+    out = []
+    run_sql, run_rows, run_params = None, [], []
+    for sql, params, _ in batch:
+        match = None if 'ON DUPLICATE' in sql.upper() else _INSERT_VALUES.match(sql)
+        if match and sql == run_sql:
+            run_rows.append(match.group(2))
+            run_params.extend(params)
+            continue
+        if run_sql is not None:
+            out.append((_INSERT_VALUES.match(run_sql).group(1) + ', '.join(run_rows), run_params))
+            run_sql = None
+        if match:
+            run_sql, run_rows, run_params = sql, [match.group(2)], list(params)
+        else:
+            out.append((sql, params))
+    if run_sql is not None:
+        out.append((_INSERT_VALUES.match(run_sql).group(1) + ', '.join(run_rows), run_params))
+    return out
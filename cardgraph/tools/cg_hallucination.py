@@ -0,0 +1,138 @@
+"""
+Card Graph — Whisper Hallucination Detection
+
+Two detectors:
+
+    window_reason()   per-window check on the signals Whisper reports for each
+                      decoded segment (no_speech_prob, avg_logprob,
+                      compression_ratio). Used while decoding: bad windows are
+                      dropped and the rest of the segment is kept.
+    text_reason()     the original whole-transcript text heuristic (word and
+                      phrase repetition, known filler phrases). Only used when
+                      no per-window signals are available, e.g. results
+                      cached before this detector existed.
+
+hallucination_bench.py measures both against a labelled corpus. The filler
+thresholds below are hand-picked, not tuned on real decodes (see there).
+"""
+import re
+from collections import Counter
+
+# Whisper's own decode-fallback thresholds (whisper/transcribe.py defaults)
+NO_SPEECH_PROB = 0.6        # with a low logprob: the window was really silence
+NO_SPEECH_LOGPROB = -1.0
+COMPRESSION_RATIO = 2.4     # gzip ratio above this = text stuck in a loop
+MIN_AVG_LOGPROB = -1.5      # decoder had no idea what it was hearing
+
+# Filler Whisper invents over silence; only trusted with a weak logprob
+FILLER_PATTERN = re.compile(
+    r"^\s*(?:(?:thanks?|thank you)(?: (?:so much|very much))?(?: for watching)?[.!]?\s*|"
+    r"(?:please )?(?:like and )?subscribe[^.]*[.!]?\s*|you[.!]?\s*|bye[.!]?\s*)+$",
+    re.IGNORECASE,
+)
+FILLER_LOGPROB = -0.7
+
+
+def window_reason(segment):
+    """Why one decoded window looks hallucinated, or '' if it looks real."""
+    text = (segment.get('text') or '').strip()
+    if not text:
+        return ''
+    no_speech = segment.get('no_speech_prob', 0.0)
+    logprob = segment.get('avg_logprob', 0.0)
+    ratio = segment.get('compression_ratio', 0.0)
+
+    if no_speech > NO_SPEECH_PROB and logprob < NO_SPEECH_LOGPROB:
+        return f'no_speech:{no_speech:.2f}'
+    if ratio > COMPRESSION_RATIO:
+        return f'repetition:{ratio:.1f}'
+    if logprob < MIN_AVG_LOGPROB:
+        return f'low_logprob:{logprob:.2f}'
+    if logprob < FILLER_LOGPROB and FILLER_PATTERN.match(text):
+        return 'filler_phrase'
+    return ''
+
+
+def filter_result(result):
+    """Drop hallucinated windows from a Whisper result, in place.
+
+    result['segments'] keeps only good windows and result['text'] is rebuilt
+    from them. Returns [(start, end, reason)] for the dropped windows.
+    No-op (returns None) when the result carries no per-window signals.
+    """
+    segments = result.get('segments')
+    if not segments or 'avg_logprob' not in segments[0]:
+        return None
+    kept, dropped = [], []
+    for seg in segments:
+        reason = window_reason(seg)
+        if reason:
+            dropped.append((seg['start'], seg['end'], reason))
+        else:
+            kept.append(seg)
+    if dropped:
+        result['segments'] = kept
+        result['text'] = ''.join(seg['text'] for seg in kept)
+    return dropped
+
+
+def text_reason(text):
+    """Detect Whisper hallucination patterns caused by silence or near-silence.
+
+    Whisper generates repetitive garbage when processing silent audio:
+    - "you you you you you you you"
+    - "Thank you. Thank you. Thank you."
+    - "Thanks for watching! Subscribe!"
+    - Single words repeated endlessly
+
+    Returns the reason string, or '' if the text looks real.
+    """
+    if not text or not text.strip():
+        return 'empty_transcript'
+
+    cleaned = text.strip()
+    words = cleaned.lower().split()
+    word_count = len(words)
+
+    # Very short transcripts from a full segment are suspicious but not garbage
+    if word_count < 3:
+        return 'too_short'
+
+    # --- Single word repetition ---
+    # If any one word makes up 50%+ of the transcript, it's hallucination
+    counts = Counter(words)
+    most_common_word, most_common_count = counts.most_common(1)[0]
+    if word_count >= 6 and most_common_count / word_count >= 0.50:
+        return f'word_repetition:{most_common_word}({most_common_count}/{word_count})'
+
+    # --- Low vocabulary ratio ---
+    # Real speech has variety; hallucinations repeat the same few words
+    unique_ratio = len(counts) / word_count
+    if word_count >= 10 and unique_ratio < 0.15:
+        return f'low_vocabulary:{len(counts)}_unique/{word_count}_total'
+
+    # --- Phrase repetition ---
+    # Check for repeated 2-3 word phrases (e.g., "thank you" x20)
+    if word_count >= 8:
+        for phrase_len in (2, 3):
+            phrases = [' '.join(words[i:i+phrase_len]) for i in range(len(words) - phrase_len + 1)]
+            if phrases:
+                phrase_counts = Counter(phrases)
+                top_phrase, top_count = phrase_counts.most_common(1)[0]
+                # If a phrase appears in 40%+ of possible positions, it's repetitive
+                if top_count >= max(4, len(phrases) * 0.40):
+                    return f'phrase_repetition:"{top_phrase}"x{top_count}'
+
+    # --- Known hallucination phrases (common Whisper silence artifacts) ---
+    hallucination_patterns = [
+        r'(?:thanks?\s+(?:for\s+)?watching)',
+        r'(?:subscribe\s+(?:to\s+)?(?:my\s+)?channel)',
+        r'(?:please\s+like\s+and\s+subscribe)',
+        r'(?:see\s+you\s+(?:in\s+)?(?:the\s+)?next\s+(?:video|one))',
+    ]
+    lower_text = cleaned.lower()
+    for pattern in hallucination_patterns:
+        if re.search(pattern, lower_text) and word_count < 20:
+            return 'known_hallucination_phrase'
+
+    return ''
@@ -0,0 +1,112 @@
+"""
+Card Graph — Inference Backends
+
+One interface over the Whisper engines the transcription workers can use:
+
+    whisper         openai-whisper on PyTorch (fp32 on CPU, the original path)
+    faster-whisper  CTranslate2 with int8 weights — roughly 3-4x faster on the
+                    NAS CPU, so a larger model runs at the same real-time factor
+
+Models are addressed by a spec string, "<backend>:<model>" or a bare model
+name for the default backend, so the daemon protocol and CLI flags carry a
+single value. Every backend returns the openai-whisper result shape —
+{'text', 'segments': [{'start', 'end', 'text', 'avg_logprob',
+'no_speech_prob', 'compression_ratio'}]} — so transcript writing and the
+hallucination checks do not care which engine ran.
+"""
+import os
+
+BACKENDS = ('whisper', 'faster-whisper')
+DEFAULT_BACKEND = 'whisper'
+MODELS = ('tiny', 'base', 'small', 'medium', 'large')
+
+# faster-whisper names the current large checkpoint explicitly
+FASTER_WHISPER_NAMES = {'large': 'large-v3'}
+
+# Options both engines understand; anything else is engine-specific
+SHARED_OPTIONS = ('language', 'task', 'beam_size', 'temperature', 'initial_prompt',
+                  'condition_on_previous_text', 'word_timestamps')
+
+
+def model_spec(model_name, backend=None):
+    """Build the spec string for a model on a backend."""
+    backend = backend or DEFAULT_BACKEND
+    return model_name if backend == DEFAULT_BACKEND else f"{backend}:{model_name}"
+
+
+def parse_spec(spec):
+    """Split a spec into (backend, model_name), validating both."""
+    backend, _, model_name = spec.rpartition(':')
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    if model_name not in MODELS:
+        raise ValueError(f"Unknown Whisper model: {model_name}")
+    return backend, model_name
+
+
+class WhisperModel:
+    """openai-whisper (PyTorch) backend."""
+
+    backend = 'whisper'
+
+    def __init__(self, model_name, download_root=None):
+        import whisper
+        self.name = model_name
+        self.spec = model_spec(model_name, self.backend)
+        self.model = whisper.load_model(model_name, download_root=download_root)
+
+    def transcribe(self, audio, **options):
+        options.setdefault('fp16', False)  # no half precision on CPU
+        return self.model.transcribe(audio, **options)
+
+
+class FasterWhisperModel:
+    """CTranslate2 backend with int8-quantized weights (faster-whisper)."""
+
+    backend = 'faster-whisper'
+
+    def __init__(self, model_name, download_root=None, threads=0):
+        from faster_whisper import WhisperModel as CT2Model
+        self.name = model_name
+        self.spec = model_spec(model_name, self.backend)
+        self.model = CT2Model(FASTER_WHISPER_NAMES.get(model_name, model_name),
+                              device='cpu', compute_type='int8',
+                              cpu_threads=threads or 0, download_root=download_root)
+
+    def transcribe(self, audio, **options):
+        kwargs = {k: v for k, v in options.items() if k in SHARED_OPTIONS}
+        if isinstance(kwargs.get('temperature'), list):
+            kwargs['temperature'] = tuple(kwargs['temperature'])
+        segments, _ = self.model.transcribe(audio, **kwargs)
+
+        # The generator decodes lazily; drain it into the openai-whisper shape
+        result_segments = []
+        for seg in segments:
+            entry = {
+                'start': seg.start,
+                'end': seg.end,
+                'text': seg.text,
+                'avg_logprob': seg.avg_logprob,
+                'no_speech_prob': seg.no_speech_prob,
+                'compression_ratio': seg.compression_ratio,
+            }
+            if seg.words:
+                entry['words'] = [{'word': w.word, 'start': w.start, 'end': w.end,
+                                   'probability': w.probability} for w in seg.words]
+            result_segments.append(entry)
+        return {
+            'text': ''.join(s['text'] for s in result_segments),
+            'segments': result_segments,
+        }
+
+
+def load_model(spec, download_root=None, threads=0):
+    """Load the model a spec names on its backend."""
+    backend, model_name = parse_spec(spec)
+    if download_root:
+        os.makedirs(download_root, exist_ok=True)
+    if backend == 'faster-whisper':
+        root = os.path.join(download_root, 'ct2') if download_root else None
+        return FasterWhisperModel(model_name, root, threads)
+    return WhisperModel(model_name, download_root)
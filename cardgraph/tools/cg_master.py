@@ -0,0 +1,197 @@
+"""
+Card Graph — Master Transcript
+
+A session's transcripts/<session>_FULL.txt grows as segments are committed
+instead of being assembled once the session is over. Beside it,
+<session>_FULL.idx holds one JSON line per segment appended:
+
+    {"segment": 3, "file": "..._SEG003.txt", "offset": 10412, "length": 5230,
+     "crc32": 2849106547, "start": 1760000000.0, "duration": 900.0}
+
+offset/length are the byte range of that segment's text in the master file
+(a single seek) and crc32 its checksum, start is the segment's Unix start
+time and duration its length in seconds (null when unknown). A segment
+transcribed again is appended again; the last line for a segment wins.
+
+Appends are serialized by an flock on the index. Where there is no flock
+(the Windows PC worker, writing over SMB) nothing is appended; the segment's
+own .txt is picked up by finalize() and by readers. A range whose checksum
+does not match is treated the same way, as if it had never been indexed.
+
+Segments finish roughly, not strictly, in order, so finalize() at the end of
+the session rewrites both files in segment order, from the master's own
+bytes plus any transcript that never made it into the index.
+"""
+import json
+import os
+import re
+import zlib
+
+try:
+    import fcntl
+except ImportError:     # Windows PC worker: no appends, see above
+    fcntl = None
+
+SUFFIX = '_FULL.txt'
+INDEX_SUFFIX = '_FULL.idx'
+
+_SEGMENT_FILE = re.compile(r'_SEG(\d+)\.txt$')
+
+
+def master_path(tx_dir):
+    """<session dir name>_FULL.txt in the session's transcripts directory."""
+    tx_dir = tx_dir.rstrip('/\\')
+    parent, name = os.path.split(tx_dir)
+    if name == 'transcripts':
+        name = os.path.basename(parent)
+    return os.path.join(tx_dir, name + SUFFIX)
+
+
+def index_path(path):
+    return path[:-len(SUFFIX)] + INDEX_SUFFIX
+
+
+def segment_times(segment):
+    """(Unix start, duration in seconds) of a CG_TranscriptionSegments row, for the index."""
+    started = segment.get('started_at')
+    duration = segment.get('duration_seconds')
+    return (started.timestamp() if started else None,
+            float(duration) if duration is not None else None)
+
+
+def _separator(filename):
+    return f"\n--- {filename} ---\n\n".encode('utf-8')
+
+
+def _header(tx_dir):
+    """Title lines from the session's session.json, when there is one."""
+    meta_path = os.path.join(os.path.dirname(tx_dir.rstrip('/\\')), 'session.json')
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return b''
+    return (f"# Transcription: {meta.get('auction_name', '')}\n"
+            f"# Date: {str(meta.get('created_at', ''))[:10].replace('-', '')}\n"
+            f"# Session ID: {meta.get('session_id', '')}\n\n").encode('utf-8')
+
+
+class _Locked:
+    """Exclusive flock on the index for the duration of an append or rewrite."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.f = open(self.path, 'a', encoding='utf-8')
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self.f
+
+    def __exit__(self, *exc):
+        self.f.close()  # releases the lock
+
+
+def append(tx_dir, segment_number, filename, text, start=None, duration=None):
+    """Add one committed segment's text to the master and the index.
+
+    Returns False, having written nothing, where the index cannot be locked.
+    """
+    if fcntl is None:
+        return False
+    path = master_path(tx_dir)
+    with _Locked(index_path(path)) as index:
+        with open(path, 'ab') as master:
+            if master.tell() == 0:
+                master.write(_header(tx_dir))
+            master.write(_separator(filename))
+            offset = master.tell()
+            data = text.encode('utf-8')
+            master.write(data + b'\n')
+        index.write(json.dumps({
+            'segment': int(segment_number), 'file': filename, 'offset': offset, 'length': len(data),
+            'crc32': zlib.crc32(data), 'start': start, 'duration': duration,
+        }) + '\n')
+    return True
+
+
+def read_index(path):
+    """{segment number: entry} from a master's index; the last line per segment wins."""
+    entries = {}
+    try:
+        with open(index_path(path), encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                entries[entry['segment']] = entry
+    except OSError:
+        pass
+    return entries
+
+
+def _intact(entry, data):
+    """Whether data is what the entry indexed (entries from before crc32 are trusted)."""
+    return len(data) == entry['length'] and entry.get('crc32', zlib.crc32(data)) == zlib.crc32(data)
+
+
+def read_segment(path, entry):
+    """The segment's text from the master, or None when the range does not check out."""
+    with open(path, 'rb') as f:
+        f.seek(entry['offset'])
+        data = f.read(entry['length'])
+    return data.decode('utf-8', errors='replace') if _intact(entry, data) else None
+
+
+def finalize(tx_dir):
+    """Rewrite the master and its index in segment order. Returns the master path, or None."""
+    if not os.path.isdir(tx_dir) or fcntl is None:
+        return None
+    path = master_path(tx_dir)
+    with _Locked(index_path(path)) as index:
+        entries = read_index(path)
+        try:
+            with open(path, 'rb') as f:
+                old = f.read()
+        except OSError:
+            old = b''
+
+        texts = {}
+        for number, entry in entries.items():
+            data = old[entry['offset']:entry['offset'] + entry['length']]
+            if _intact(entry, data):
+                texts[number] = (entry, data)
+        # Transcripts written without an append (PC worker, older workers, crashes
+        # between the two writes) or whose indexed range is damaged
+        indexed = {texts[number][0]['file'] for number in texts}
+        for name in os.listdir(tx_dir):
+            match = _SEGMENT_FILE.search(name)
+            if not match or name in indexed or name.endswith(SUFFIX):
+                continue
+            number = int(match.group(1))
+            if number in texts:
+                continue
+            with open(os.path.join(tx_dir, name), 'rb') as f:
+                data = f.read().rstrip(b'\n')
+            entry = entries.get(number) or {'start': None, 'duration': None}
+            texts[number] = ({'segment': number, 'file': name,
+                              'start': entry.get('start'), 'duration': entry.get('duration')}, data)
+
+        parts = [_header(tx_dir)]
+        lines = []
+        pos = len(parts[0])
+        for number in sorted(texts):
+            entry, data = texts[number]
+            sep = _separator(entry['file'])
+            parts += [sep, data, b'\n']
+            lines.append(json.dumps({**entry, 'offset': pos + len(sep), 'length': len(data),
+                                     'crc32': zlib.crc32(data)}) + '\n')
+            pos += len(sep) + len(data) + 1
+
+        with open(path + '.tmp', 'wb') as f:
+            f.write(b''.join(parts))
+        os.replace(path + '.tmp', path)
+        # In place: appenders waiting on this lock must find the same file afterwards
+        index.truncate(0)
+        index.writelines(lines)
+    return path
@@ -0,0 +1,68 @@
+"""
+Card Graph — Segment Notifications
+
+Lets the recorder tell the transcription worker the moment a segment starts
+or finishes, so the worker does not have to poll MariaDB every few seconds.
+Each session gets a Unix datagram socket in the tools directory; the worker
+binds it and the recorder fires small JSON messages at it. Delivery is best
+effort — a missed message only delays the worker until its slow DB poll.
+"""
+import json
+import os
+import select
+import socket
+
+NOTIFY_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def socket_path(session_id, notify_dir=NOTIFY_DIR):
+    return os.path.join(notify_dir, f"transcription_notify_{session_id}.sock")
+
+
+def notify(session_id, event, notify_dir=NOTIFY_DIR, **fields):
+    """Send one event to the session's worker. Never raises."""
+    if not hasattr(socket, 'AF_UNIX'):
+        return False
+    message = json.dumps({'event': event, **fields}).encode('utf-8')
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(message, socket_path(session_id, notify_dir))
+        return True
+    except OSError:
+        return False  # no worker listening yet — it will find the row by polling
+
+
+class Listener:
+    """Receiving end of a session's notification socket."""
+
+    def __init__(self, session_id, notify_dir=NOTIFY_DIR):
+        self.path = socket_path(session_id, notify_dir)
+        if os.path.exists(self.path):
+            os.remove(self.path)  # stale socket from a crashed worker
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        os.chmod(self.path, 0o666)  # Docker recorder runs as another user
+        self.sock.setblocking(False)
+
+    def wait(self, timeout):
+        """Block until a message arrives or timeout expires.
+
+        Returns every message queued so far (possibly an empty list).
+        """
+        ready, _, _ = select.select([self.sock], [], [], max(0.0, timeout))
+        messages = []
+        while ready:
+            try:
+                data = self.sock.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                break
+            try:
+                messages.append(json.loads(data.decode('utf-8')))
+            except ValueError:
+                continue
+        return messages
+
+    def close(self):
+        self.sock.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,128 @@
+"""
+Card Graph — Child Output Drain
+
+The manager starts the recorder and the worker (and the supervisor the
+Docker recorder) with stdout=PIPE. Nobody reading that pipe means a child
+blocks mid-session once it holds 64 KB of prints and Whisper warnings.
+ChildOutput is fed the pipe from an asyncio reader as data arrives and
+keeps only:
+
+    a rolling tail of the last TAIL_LINES lines, for crash diagnostics
+    warnings, errors and tracebacks, queued to CG_TranscriptionLogs through
+    a DBWriter (so they are batched), tagged with the source
+
+Lines a child prints as "[LEVEL] ..." mirror a log row it already wrote
+itself, so they only go to the tail. At most MAX_LOGGED lines per source
+are logged; a chatty child cannot flood the log table.
+"""
+import asyncio
+import os
+import re
+from collections import deque
+
+TAIL_LINES = 100
+MAX_LINE = 1000             # characters kept per line
+MAX_LOGGED = 200            # warning/error rows per source
+READ_BYTES = 64 * 1024
+
+_OWN_LOG = re.compile(r'^\[(DEBUG|INFO|WARNING|ERROR)\] ')
+_ERROR = re.compile(r'\bERROR\b|\w+(Error|Exception):|^Fatal|^FATAL', re.IGNORECASE)
+_WARNING = re.compile(r'\bwarn(ing)?\b|\w+Warning:', re.IGNORECASE)
+TRACEBACK = 'Traceback (most recent call last):'
+
+
+class ChildOutput:
+    """Line splitter, rolling tail and log filter for one child's stdout."""
+
+    def __init__(self, writer, session_id, source):
+        self.writer = writer
+        self.session_id = session_id
+        self.source = source
+        self.lines = deque(maxlen=TAIL_LINES)
+        self.logged = 0
+        self.suppressed = 0
+        self._partial = b''
+        self._traceback = None
+
+    def feed(self, data):
+        data = self._partial + data
+        *complete, self._partial = data.split(b'\n')
+        if len(self._partial) > MAX_LINE * 4:
+            # No newline in sight: keep the line bounded
+            complete.append(self._partial)
+            self._partial = b''
+        for raw in complete:
+            self._line(raw.decode('utf-8', errors='replace').rstrip('\r')[:MAX_LINE])
+
+    def close(self):
+        """EOF: flush the unterminated last line and any open traceback."""
+        if self._partial:
+            self._line(self._partial.decode('utf-8', errors='replace')[:MAX_LINE])
+            self._partial = b''
+        if self._traceback:
+            self._log('error', '\n'.join(self._traceback[-10:]))
+            self._traceback = None
+        if self.suppressed:
+            self.writer.log(self.session_id, 'warning', f"{self.source}_output",
+                            f"{self.suppressed} more {self.source} warning/error lines not logged")
+            self.suppressed = 0
+
+    def tail(self, max_chars=2000):
+        return '\n'.join(self.lines)[-max_chars:]
+
+    def _line(self, line):
+        if not line.strip():
+            return
+        self.lines.append(line)
+        if self._traceback is not None:
+            self._traceback.append(line)
+            if not line.startswith((' ', '\t')):
+                # The unindented line after the frames is the exception itself
+                self._log('error', '\n'.join(self._traceback[-10:]))
+                self._traceback = None
+        elif line.startswith(TRACEBACK):
+            self._traceback = [line]
+        elif _OWN_LOG.match(line):
+            pass
+        elif _ERROR.search(line):
+            self._log('error', line)
+        elif _WARNING.search(line):
+            self._log('warning', line)
+
+    def _log(self, level, message):
+        if self.logged >= MAX_LOGGED:
+            self.suppressed += 1
+            return
+        self.logged += 1
+        self.writer.log(self.session_id, level, f"{self.source}_output", message)
+
+
+def drain(proc, output):
+    """Read proc.stdout into output from the running event loop as data arrives.
+
+    Returns a future that resolves once the pipe hits EOF and output is closed.
+    """
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    pipe = proc.stdout
+    fd = pipe.fileno()
+    os.set_blocking(fd, False)
+
+    def readable():
+        try:
+            data = os.read(fd, READ_BYTES)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if data:
+            output.feed(data)
+            return
+        loop.remove_reader(fd)
+        pipe.close()
+        output.close()
+        if not done.done():
+            done.set_result(None)
+
+    loop.add_reader(fd, readable)
+    return done
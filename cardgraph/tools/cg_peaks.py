@@ -0,0 +1,138 @@
+"""
+Card Graph — Waveform Peak Files
+
+Each segment's audio can have a peaks/SEGxxx.peaks file: the min and max
+sample of every block at a few zoom levels, so a waveform view loads a few
+KB instead of the whole recording. Layout (little-endian):
+
+    b'CGP1'                 magic / version
+    uint8   count           number of levels
+    count x (uint16 block_ms, uint32 blocks)
+    then for each level in order: int8 [min, max] x blocks
+
+Samples are scaled to -127..127. Time 0 is the start of the segment audio
+(CG_TranscriptionSegments.started_at). For a 15-minute segment the finest
+level is ~36 KB, the next ~4.5 KB and the coarsest under 1 KB.
+"""
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'CGP1'
+SUFFIX = '.peaks'
+PEAK_RATE = 8000                # peaks are measured on 8 kHz mono
+LEVEL_MS = (50, 400, 3200)      # each level is 8x coarser than the one before
+
+_HEADER = struct.Struct('<4sB')
+_LEVEL = struct.Struct('<HI')
+_BLOCK = PEAK_RATE * LEVEL_MS[0] // 1000
+
+
+def peaks_path(session_dir, filename_audio):
+    stem = os.path.splitext(os.path.basename(filename_audio))[0]
+    return os.path.join(session_dir, 'peaks', stem + SUFFIX)
+
+
+def _scale(values):
+    return np.clip(np.round(values * 127), -127, 127).astype(np.int8)
+
+
+def block_peaks(samples):
+    """Finest-level (min, max) per block of PEAK_RATE float samples; a short last block counts."""
+    n = len(samples)
+    if n == 0:
+        return np.zeros(0, np.int8), np.zeros(0, np.int8)
+    pad = -n % _BLOCK
+    if pad:
+        samples = np.concatenate([samples, np.full(pad, samples[-1], samples.dtype)])
+    blocks = samples.reshape(-1, _BLOCK)
+    return _scale(blocks.min(axis=1)), _scale(blocks.max(axis=1))
+
+
+def build_levels(mins, maxs):
+    """Every level in LEVEL_MS from the finest one."""
+    levels = [(LEVEL_MS[0], mins, maxs)]
+    for block_ms in LEVEL_MS[1:]:
+        factor = block_ms // LEVEL_MS[0]
+        pad = -len(mins) % factor
+        lo = np.concatenate([mins, np.full(pad, 127, np.int8)]) if pad else mins
+        hi = np.concatenate([maxs, np.full(pad, -127, np.int8)]) if pad else maxs
+        levels.append((block_ms, lo.reshape(-1, factor).min(axis=1), hi.reshape(-1, factor).max(axis=1)))
+    return levels
+
+
+def write(path, mins, maxs):
+    """Write a peaks file from finest-level blocks (atomically: readers never see half a file)."""
+    levels = build_levels(mins, maxs)
+    parts = [_HEADER.pack(MAGIC, len(levels))]
+    parts += [_LEVEL.pack(block_ms, len(lo)) for block_ms, lo, _ in levels]
+    for _, lo, hi in levels:
+        parts.append(np.column_stack([lo, hi]).tobytes())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(b''.join(parts))
+    os.replace(tmp, path)
+
+
+def read(path):
+    """{block_ms: (mins, maxs)} from a peaks file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Not a peaks file: {path}")
+    pos = _HEADER.size
+    shapes = []
+    for _ in range(count):
+        shapes.append(_LEVEL.unpack_from(data, pos))
+        pos += _LEVEL.size
+    levels = {}
+    for block_ms, blocks in shapes:
+        pairs = np.frombuffer(data, np.int8, blocks * 2, pos).reshape(-1, 2)
+        levels[block_ms] = (pairs[:, 0], pairs[:, 1])
+        pos += blocks * 2
+    return levels
+
+
+def write_from_audio(audio_path, path):
+    """Decode a whole segment file and write its peaks (for audio the recorder did not measure)."""
+    import cg_audio
+    write(path, *block_peaks(cg_audio.load_pcm(audio_path, PEAK_RATE)))
+
+
+class PeakAccumulator:
+    """Finest-level blocks of one continuous PCM stream, cut into segments as they close.
+
+    Times are seconds from the first sample added. Blocks before a cut are
+    dropped, so memory stays at about one segment.
+    """
+
+    def __init__(self):
+        self.mins = np.zeros(0, np.int8)
+        self.maxs = np.zeros(0, np.int8)
+        self.first_block = 0        # stream block index of self.mins[0]
+        self._partial = np.zeros(0, np.float32)
+
+    def add(self, samples):
+        samples = np.concatenate([self._partial, samples]) if len(self._partial) else samples
+        whole = len(samples) - len(samples) % _BLOCK
+        self._partial = samples[whole:]
+        if whole:
+            lo, hi = block_peaks(samples[:whole])
+            self.mins = np.concatenate([self.mins, lo])
+            self.maxs = np.concatenate([self.maxs, hi])
+
+    def available_sec(self):
+        return (self.first_block + len(self.mins)) * LEVEL_MS[0] / 1000
+
+    def cut(self, start_sec, end_sec):
+        """Blocks for [start_sec, end_sec); drops everything before end_sec."""
+        start = max(0, int(round(start_sec * 1000 / LEVEL_MS[0])) - self.first_block)
+        end = max(start, int(round(end_sec * 1000 / LEVEL_MS[0])) - self.first_block)
+        lo, hi = self.mins[start:end], self.maxs[start:end]
+        dropped = min(end, len(self.mins))
+        self.mins, self.maxs = self.mins[dropped:], self.maxs[dropped:]
+        self.first_block += dropped
+        return lo, hi
@@ -0,0 +1,98 @@
+"""
+Card Graph — Word Timing Sidecars
+
+Each transcript SEGxxx.txt can have a SEGxxx.words sidecar holding the
+Whisper word timings, so alignment code can turn a text position into an
+exact time without re-running inference. Layout (little-endian, columnar):
+
+    b'CGW1'                 magic / version
+    uint32  count           number of words
+    uint32  offset[count]   byte offset of each word in the transcript file
+    uint32  start_ms[count] word start, ms from the start of the segment audio
+    uint32  end_ms[count]   word end, ms from the start of the segment audio
+
+The segment audio starts at CG_TranscriptionSegments.started_at, so
+started_at + start_ms is the wall-clock time a word was spoken. About 12
+bytes per word: a 15-minute segment is ~30 KB.
+"""
+import os
+import struct
+
+MAGIC = b'CGW1'
+SUFFIX = '.words'
+
+
+def sidecar_path(tx_path):
+    return os.path.splitext(tx_path)[0] + SUFFIX
+
+
+def extract_words(result):
+    """Pull [(word, start, end)] out of a Whisper result with word timestamps."""
+    words = []
+    for seg in result.get('segments') or []:
+        for w in seg.get('words') or []:
+            word = (w.get('word') or '').strip()
+            if word:
+                words.append((word, float(w['start']), float(w['end'])))
+    return words
+
+
+def map_time(t, spans):
+    """Map a time in audio built by concatenating spans back to source time.
+
+    spans are the [(start_sec, end_sec)] pieces that were joined (see
+    cg_audio.concat_spans); with no spans the time is returned unchanged.
+    """
+    if not spans:
+        return t
+    elapsed = 0.0
+    for start, end in spans:
+        length = end - start
+        if t <= elapsed + length:
+            return start + (t - elapsed)
+        elapsed += length
+    return spans[-1][1]
+
+
+def remap_words(words, spans, offset=0.0):
+    """Map every word's times through map_time, then shift by offset."""
+    return [(w, round(map_time(s, spans) + offset, 3), round(map_time(e, spans) + offset, 3))
+            for w, s, e in words]
+
+
+def write_sidecar(tx_path, text, words):
+    """Write the .words file next to tx_path for the given transcript text.
+
+    Words are located in text in order; ones that cannot be found (Whisper
+    tokens can differ from the stitched text) are dropped.
+    """
+    encoded = text.encode('utf-8')
+    offsets, starts, ends = [], [], []
+    cursor = 0
+    for word, start, end in words:
+        needle = word.encode('utf-8')
+        pos = encoded.find(needle, cursor)
+        if pos < 0:
+            continue
+        cursor = pos + len(needle)
+        offsets.append(pos)
+        starts.append(max(0, int(round(start * 1000))))
+        ends.append(max(0, int(round(end * 1000))))
+
+    path = sidecar_path(tx_path)
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(offsets)))
+        for column in (offsets, starts, ends):
+            f.write(struct.pack(f'<{len(column)}I', *column))
+    return path
+
+
+def read_sidecar(path):
+    """Return (offsets, start_ms, end_ms) lists from a .words file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"Not a word timing sidecar: {path}")
+    count = struct.unpack_from('<I', data, 4)[0]
+    columns = struct.unpack_from(f'<{count * 3}I', data, 8)
+    return list(columns[:count]), list(columns[count:2 * count]), list(columns[2 * count:])
@@ -0,0 +1,93 @@
+"""
+Card Graph — Directory Watch
+
+The web UI stops or cancels a session by touching
+transcription_{stop,cancel}_<id>.signal in the tools directory. Rather than
+stat those files every second, the manager waits on a DirectoryWatch: a
+small ctypes binding to Linux inotify (no extra package) that becomes
+readable when a file is created, moved in or touched in one directory.
+Its fd goes straight into select() or an asyncio reader.
+
+Where inotify is missing (not Linux, or out of watches) available() is
+False and callers fall back to a slow poll.
+"""
+import ctypes
+import ctypes.util
+import os
+import struct
+
+IN_ATTRIB = 0x00000004
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+DEFAULT_MASK = IN_CREATE | IN_MOVED_TO | IN_ATTRIB
+
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            _libc = libc
+        except (OSError, AttributeError):
+            _libc = False
+    return _libc or None
+
+
+class DirectoryWatch:
+    """inotify on one directory, reporting the names of files that appeared."""
+
+    def __init__(self, directory, mask=DEFAULT_MASK):
+        self.fd = None
+        libc = _load_libc()
+        if libc is None:
+            return
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return
+        self.fd = fd
+
+    def available(self):
+        return self.fd is not None
+
+    def fileno(self):
+        return self.fd
+
+    def read(self):
+        """Drain pending events; returns the file names seen.
+
+        A queue overflow loses names, so it is reported as '' — treat it as
+        "anything may have changed".
+        """
+        names = []
+        while self.fd is not None:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except (BlockingIOError, InterruptedError):
+                break
+            if not data:
+                break
+            pos = 0
+            while pos + _EVENT.size <= len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, pos)
+                name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b'\0')
+                pos += _EVENT.size + length
+                names.append('' if mask & IN_Q_OVERFLOW else os.fsdecode(name))
+        return names
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
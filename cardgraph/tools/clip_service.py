@@ -0,0 +1,330 @@
+"""
+Card Graph - Audio Clip Service
+
+Long-lived local service that cuts short review clips out of session audio,
+so checking a CG_TranscriptionRecords row against what was said is one
+small request instead of downloading and scrubbing a 15-minute segment.
+
+A clip is a wall-clock window (session_id, start, end in Unix seconds). The
+service maps it onto the session's segments (a window may span a segment
+boundary) and reads each piece the cheapest way the file allows:
+
+    WAV         byte-offset seek straight into the PCM data, no decoding
+    FLAC/Opus   ffmpeg with -ss before -i, which seeks through the FLAC
+                seek table / Ogg page index instead of decoding from 0
+
+Clips are returned as 16-bit PCM WAV. Recently requested clips are kept in
+an LRU cache bounded by total bytes; clips that touch a segment still being
+recorded are not cached, since the audio is still growing. Segment lists are
+cached per session for INDEX_TTL_SEC; a piece whose file has gone (the
+compactor replaced the WAV) re-reads the list once, and a clip still missing
+a piece is served but never cached.
+
+Protocol: one JSON request per line (as whisper_daemon). Every response is
+a JSON line; a successful clip is followed by exactly "bytes" bytes of WAV.
+    {"op": "ping"}
+    {"op": "clip", "session_id": 12, "start": 1760000000.5, "end": 1760000020.5}
+
+Usage:
+    python3 clip_service.py                  # serve on the default socket
+    python3 clip_service.py --cache-mb 128
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cg_audio
+import cg_db
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SOCKET_PATH = os.path.join(TOOLS_DIR, 'clip_service.sock')
+
+CONNECT_TIMEOUT = 2         # seconds to wait for the socket to accept
+MAX_CLIP_SEC = 120          # longest window one request may ask for
+INDEX_TTL_SEC = 15          # how long a session's segment list is reused
+DEFAULT_CACHE_MB = 64
+DECODE_RATE = 16000         # rate for clips cut from compressed audio
+
+stats = {'started_at': None, 'clips': 0, 'hits': 0, 'errors': 0}
+
+
+def get_db():
+    return cg_db.get_db()
+
+
+class ClipCache:
+    """LRU of finished clips, bounded by the total size of their bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._items[key] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SegmentIndex:
+    """Per-session segment timelines from CG_TranscriptionSegments, briefly cached."""
+
+    def __init__(self):
+        self._db = None
+        self._lock = threading.Lock()
+        self._sessions = {}     # session_id -> (loaded_at, [segment dicts])
+
+    def segments(self, session_id):
+        with self._lock:
+            cached = self._sessions.get(session_id)
+            if cached and time.time() - cached[0] < INDEX_TTL_SEC:
+                return cached[1]
+            rows = self._query(session_id)
+
+        segments = []
+        for i, row in enumerate(rows):
+            start = float(row['start_epoch'])
+            if row['recording_status'] == 'recording':
+                end = float('inf')
+            else:
+                end = start + float(row['duration_seconds'] or 0)
+            if i + 1 < len(rows):
+                # Rows hold whole seconds; the next segment's start is the sharper boundary
+                end = min(end, float(rows[i + 1]['start_epoch']))
+            segments.append({
+                'number': row['segment_number'],
+                'path': os.path.join(row['session_dir'], 'audio', row['filename_audio']),
+                'start': start,
+                'end': end,
+                'recording': row['recording_status'] == 'recording',
+            })
+        with self._lock:
+            self._sessions[session_id] = (time.time(), segments)
+        return segments
+
+    def invalidate(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _query(self, session_id):
+        sql = (
+            "SELECT s.session_dir, g.segment_number, g.filename_audio, g.duration_seconds, "
+            "g.recording_status, UNIX_TIMESTAMP(g.started_at) AS start_epoch "
+            "FROM CG_TranscriptionSegments g "
+            "JOIN CG_TranscriptionSessions s ON s.session_id = g.session_id "
+            "WHERE g.session_id = %s AND g.filename_audio IS NOT NULL AND g.started_at IS NOT NULL "
+            "AND s.session_dir IS NOT NULL AND g.recording_status IN ('recording', 'complete') "
+            "ORDER BY g.segment_number ASC"
+        )
+        if self._db is None:
+            self._db = get_db()
+        return self._db.query(sql, (session_id,))
+
+
+def read_wav_piece(path, offset_sec, length_sec):
+    """Raw PCM for part of a WAV by byte offset. Returns (pcm, rate, channels)."""
+    with open(path, 'rb') as f:
+        channels, rate, block_align, data_offset, total_frames = cg_audio.wav_layout(f, path)
+        first = min(total_frames, int(offset_sec * rate))
+        last = min(total_frames, first + int(round(length_sec * rate)))
+        f.seek(data_offset + first * block_align)
+        return f.read((last - first) * block_align), rate, channels
+
+
+def decode_piece(path, offset_sec, length_sec, rate, channels):
+    """PCM for part of any ffmpeg-readable file, seeking before decoding."""
+    cmd = ['ffmpeg', '-nostdin', '-v', 'error',
+           '-ss', f"{offset_sec:.3f}", '-t', f"{length_sec:.3f}", '-i', path,
+           '-f', 's16le', '-ac', str(channels), '-ar', str(rate), '-']
+    proc = subprocess.run(cmd, capture_output=True, timeout=60)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode('utf-8', 'replace')[-300:]}")
+    return proc.stdout
+
+
+def cut_clip(segments, start, end):
+    """WAV bytes for [start, end) across segments. Returns (wav, cacheable, pieces missing)."""
+    pieces = []
+    for seg in segments:
+        lo, hi = max(start, seg['start']), min(end, seg['end'])
+        if hi > lo:
+            pieces.append((seg, lo - seg['start'], hi - lo))
+    if not pieces:
+        raise LookupError('No audio recorded in that window')
+
+    rate = channels = None
+    pcm = []
+    missing = 0
+    for seg, offset, length in pieces:
+        if not os.path.exists(seg['path']):
+            missing += 1
+            continue
+        if seg['path'].lower().endswith('.wav'):
+            raw, wav_rate, wav_channels = read_wav_piece(seg['path'], offset, length)
+            if rate is None:
+                rate, channels = wav_rate, wav_channels
+            if (wav_rate, wav_channels) == (rate, channels):
+                pcm.append(raw)
+                continue
+        if rate is None:
+            rate, channels = DECODE_RATE, 1
+        pcm.append(decode_piece(seg['path'], offset, length, rate, channels))
+    if rate is None:
+        raise LookupError('Audio for that window is no longer on disk')
+
+    data = b''.join(pcm)
+    cacheable = not missing and not any(seg['recording'] for seg, _, _ in pieces)
+    return cg_audio.wav_header(len(data), rate, channels) + data, cacheable, missing
+
+
+class ClipHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            payload = b''
+            try:
+                request = json.loads(line)
+                if request.get('op') == 'ping':
+                    response = {'ok': True, 'pid': os.getpid(), 'cached_clips': len(self.server.cache),
+                                'cached_bytes': self.server.cache.bytes, **stats}
+                elif request.get('op') == 'clip':
+                    payload, cached = self.server.clip(int(request['session_id']),
+                                                       float(request['start']), float(request['end']))
+                    response = {'ok': True, 'bytes': len(payload), 'content_type': 'audio/wav',
+                                'cached': cached}
+                else:
+                    response = {'ok': False, 'error': f"Unknown op: {request.get('op')}"}
+            except LookupError as e:
+                response = {'ok': False, 'error': str(e), 'not_found': True}
+            except Exception as e:
+                stats['errors'] += 1
+                response = {'ok': False, 'error': str(e)[:500]}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            if payload:
+                self.wfile.write(payload)
+            self.wfile.flush()
+
+
+class ClipServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, cache_bytes):
+        super().__init__(socket_path, ClipHandler)
+        self.cache = ClipCache(cache_bytes)
+        self.index = SegmentIndex()
+
+    def clip(self, session_id, start, end):
+        """(wav bytes, served from cache) for a window of a session."""
+        if end <= start:
+            raise ValueError('end must be after start')
+        if end - start > MAX_CLIP_SEC:
+            raise ValueError(f"Clips are limited to {MAX_CLIP_SEC} s")
+        stats['clips'] += 1
+        key = (session_id, round(start, 2), round(end, 2))
+        data = self.cache.get(key)
+        if data is not None:
+            stats['hits'] += 1
+            return data, True
+        try:
+            data, cacheable, missing = cut_clip(self.index.segments(session_id), start, end)
+        except LookupError:
+            missing = True
+        if missing:
+            # Paths may be INDEX_TTL_SEC stale while the compactor swaps files: look again once
+            self.index.invalidate(session_id)
+            data, cacheable, missing = cut_clip(self.index.segments(session_id), start, end)
+        if cacheable:
+            self.cache.put(key, data)
+        return data, False
+
+
+# ─── Client Side ─────────────────────────────────────────────
+
+def ping(socket_path=SOCKET_PATH):
+    """Return the service status dict, or None if it is not reachable."""
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(socket_path)
+        sock.sendall(b'{"op": "ping"}\n')
+        with sock.makefile('rb') as f:
+            return json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+
+# ─── Main ────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Audio Clip Service')
+    parser.add_argument('--socket', type=str, default=SOCKET_PATH)
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_MB,
+                        help='Upper bound on the memory used by cached clips')
+    args = parser.parse_args()
+
+    if ping(args.socket):
+        print(f"Clip service already running on {args.socket}")
+        return
+
+    # Stale socket from a crashed service
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+
+    server = ClipServer(args.socket, args.cache_mb * 1024 * 1024)
+    os.chmod(args.socket, 0o666)  # started by the root cron wrapper, called by PHP as http
+    stats['started_at'] = int(time.time())
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+
+    print(f"Clip service listening on {args.socket} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        print("Clip service stopped", flush=True)
+
+
+if __name__ == '__main__':
+    main()
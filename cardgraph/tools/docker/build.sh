@@ -10,7 +10,8 @@ SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 cd "$SCRIPT_DIR"
 
 echo "Building cg-browser-recorder Docker image..."
-docker build -t cg-browser-recorder:latest .
+# Context is tools/ so shared modules (cg_db.py, cg_dbwriter.py) can be copied in
+docker build -t cg-browser-recorder:latest -f Dockerfile ..
 
 echo ""
 echo "Build complete. Image: cg-browser-recorder:latest"
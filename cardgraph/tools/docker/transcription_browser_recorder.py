@@ -19,12 +19,14 @@ import json
 import os
 import shutil
 import signal
+import socket
 import subprocess
 import sys
 import time
 from datetime import datetime
 
-import pymysql
+import cg_db        # copied next to this script by the Dockerfile
+import cg_dbwriter
 
 # Inside Docker: credentials passed via environment variables (docker run -e)
 DB_CONFIG = {
@@ -43,16 +45,11 @@ running = True
 
 
 def get_db():
-    return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor, autocommit=True)
+    return cg_db.get_db(DB_CONFIG)
 
 
-def log_event(db, session_id, level, event_type, message):
-    with db.cursor() as cur:
-        cur.execute(
-            "INSERT INTO CG_TranscriptionLogs (session_id, log_level, event_type, message) "
-            "VALUES (%s, %s, %s, %s)",
-            (session_id, level, event_type, message)
-        )
+def log_event(writer, session_id, level, event_type, message):
+    writer.log(session_id, level, event_type, message)
     print(f"[{level.upper()}] {message}", flush=True)
 
 
@@ -67,6 +64,16 @@ def check_signal(session_id, signal_type):
     return os.path.exists(path)
 
 
+def notify_worker(session_id, event, **fields):
+    """Wake the host worker via its socket in /signals (see cg_notify.py). Best effort."""
+    path = os.path.join(SIGNAL_DIR, f"transcription_notify_{session_id}.sock")
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(json.dumps({'event': event, **fields}).encode('utf-8'), path)
+    except OSError:
+        pass
+
+
 def launch_browser(url):
     """Launch Chromium via Selenium, navigate to URL, return driver."""
     from selenium import webdriver
@@ -101,6 +108,8 @@ def launch_browser(url):
 def capture_segment(segment_seconds, sample_rate, channels, audio_format, seg_path):
     """Capture one segment of audio from PulseAudio virtual sink."""
     ac = '1' if channels == 'mono' else '2'
+    if audio_format == 'opus' and int(sample_rate) not in (8000, 12000, 16000, 24000, 48000):
+        sample_rate = 48000  # libopus only takes its native rates
 
     ffmpeg_cmd = [
         'ffmpeg', '-y',
@@ -114,6 +123,8 @@ def capture_segment(segment_seconds, sample_rate, channels, audio_format, seg_pa
 
     if audio_format == 'flac':
         ffmpeg_cmd.extend(['-codec:a', 'flac'])
+    elif audio_format == 'opus':
+        ffmpeg_cmd.extend(['-codec:a', 'libopus', '-b:a', '20k', '-application', 'voip'])
     else:
         ffmpeg_cmd.extend(['-codec:a', 'pcm_s16le'])
 
@@ -142,30 +153,35 @@ def main():
     audio_format = config['audio_format']
     min_free_gb = int(config['min_free_disk_gb'])
 
-    db = get_db()
+    # Writes are queued so a slow DB never delays the next segment's capture
+    writer = cg_dbwriter.DBWriter(get_db)
     driver = None
     ffmpeg_proc = None
 
     try:
         # Load session URL
-        with db.cursor() as cur:
-            cur.execute(
-                "SELECT auction_url FROM CG_TranscriptionSessions WHERE session_id = %s",
-                (session_id,)
-            )
-            session = cur.fetchone()
+        db = get_db()
+        try:
+            with db.cursor() as cur:
+                cur.execute(
+                    "SELECT auction_url FROM CG_TranscriptionSessions WHERE session_id = %s",
+                    (session_id,)
+                )
+                session = cur.fetchone()
+        finally:
+            db.close()
 
         if not session:
-            log_event(db, session_id, 'error', 'browser_recorder_error', 'Session not found')
+            log_event(writer, session_id, 'error', 'browser_recorder_error', 'Session not found')
             return
 
         stream_url = session['auction_url']
-        log_event(db, session_id, 'info', 'browser_started',
+        log_event(writer, session_id, 'info', 'browser_started',
                   f"Launching browser for: {stream_url}")
 
         # Launch browser and navigate to auction URL
         driver = launch_browser(stream_url)
-        log_event(db, session_id, 'info', 'browser_navigated', 'Browser navigated to URL')
+        log_event(writer, session_id, 'info', 'browser_navigated', 'Browser navigated to URL')
 
         # Give the page time to load and start streaming audio
         time.sleep(8)
@@ -176,7 +192,7 @@ def main():
         while running:
             # Check signals
             if check_signal(session_id, 'stop') or check_signal(session_id, 'cancel'):
-                log_event(db, session_id, 'info', 'signal_detected',
+                log_event(writer, session_id, 'info', 'signal_detected',
                           'Stop/cancel signal detected')
                 break
 
@@ -185,7 +201,7 @@ def main():
                 usage = shutil.disk_usage(OUTPUT_DIR)
                 free_gb = usage.free / (1024 ** 3)
                 if free_gb < min_free_gb:
-                    log_event(db, session_id, 'warning', 'low_disk',
+                    log_event(writer, session_id, 'warning', 'low_disk',
                               f"Low disk space: {free_gb:.1f} GB free")
                     break
             except Exception:
@@ -197,20 +213,19 @@ def main():
             seg_path = os.path.join(OUTPUT_DIR, seg_filename)
 
             # Create segment DB record
-            with db.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO CG_TranscriptionSegments "
-                    "(session_id, segment_number, filename_audio, recording_status, started_at) "
-                    "VALUES (%s, %s, %s, 'recording', NOW())",
-                    (session_id, segment_number, seg_filename)
-                )
-                segment_id = cur.lastrowid
+            seg_start = time.time()
+            writer.execute(
+                "INSERT INTO CG_TranscriptionSegments "
+                "(session_id, segment_number, filename_audio, recording_status, started_at) "
+                "VALUES (%s, %s, %s, 'recording', FROM_UNIXTIME(%s))",
+                (session_id, segment_number, seg_filename, int(seg_start)),
+                after=lambda n=segment_number: notify_worker(session_id, 'segment_started', segment_number=n)
+            )
 
-            log_event(db, session_id, 'info', 'segment_started',
+            log_event(writer, session_id, 'info', 'segment_started',
                       f"Recording segment {segment_number}: {seg_filename}")
 
             # Capture audio segment from PulseAudio
-            seg_start = time.time()
             try:
                 ffmpeg_proc = capture_segment(
                     segment_seconds, sample_rate, channels, audio_format, seg_path
@@ -232,45 +247,45 @@ def main():
                 seg_size = os.path.getsize(seg_path) if os.path.exists(seg_path) else 0
 
                 # Update segment record as complete
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSegments SET "
-                        "recording_status = 'complete', duration_seconds = %s, "
-                        "file_size_bytes = %s, completed_at = NOW() "
-                        "WHERE segment_id = %s",
-                        (seg_duration, seg_size, segment_id)
-                    )
-
-                log_event(db, session_id, 'info', 'segment_complete',
+                writer.execute(
+                    "UPDATE CG_TranscriptionSegments SET "
+                    "recording_status = 'complete', duration_seconds = %s, "
+                    "file_size_bytes = %s, completed_at = NOW() "
+                    "WHERE session_id = %s AND segment_number = %s",
+                    (seg_duration, seg_size, session_id, segment_number),
+                    after=lambda n=segment_number: notify_worker(session_id, 'segment_complete', segment_number=n)
+                )
+
+                log_event(writer, session_id, 'info', 'segment_complete',
                           f"Segment {segment_number} complete: {seg_duration}s, {seg_size} bytes")
 
                 # Update session segment count
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSessions SET total_segments = %s "
-                        "WHERE session_id = %s",
-                        (segment_number, session_id)
-                    )
+                writer.execute(
+                    "UPDATE CG_TranscriptionSessions SET total_segments = %s "
+                    "WHERE session_id = %s",
+                    (segment_number, session_id)
+                )
 
             except Exception as e:
-                log_event(db, session_id, 'error', 'segment_error',
+                log_event(writer, session_id, 'error', 'segment_error',
                           f"Segment {segment_number} error: {str(e)}")
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSegments SET recording_status = 'error', "
-                        "error_message = %s WHERE segment_id = %s",
-                        (str(e)[:500], segment_id)
-                    )
+                writer.execute(
+                    "UPDATE CG_TranscriptionSegments SET recording_status = 'error', "
+                    "error_message = %s WHERE session_id = %s AND segment_number = %s",
+                    (str(e)[:500], session_id, segment_number)
+                )
 
             if not running:
                 break
 
-        log_event(db, session_id, 'info', 'browser_recorder_stopped',
+        log_event(writer, session_id, 'info', 'browser_recorder_stopped',
                   f"Browser recorder finished after {segment_number} segments")
 
     except Exception as e:
-        log_event(db, session_id, 'error', 'browser_recorder_fatal', str(e))
+        log_event(writer, session_id, 'error', 'browser_recorder_fatal', str(e))
     finally:
+        writer.close()  # flush queued rows before the worker is told recording is over
+        notify_worker(session_id, 'recorder_stopped')
         # Clean up browser
         if driver:
             try:
@@ -280,10 +295,6 @@ def main():
         # Clean up any lingering ffmpeg
         if ffmpeg_proc and ffmpeg_proc.poll() is None:
             ffmpeg_proc.terminate()
-        try:
-            db.close()
-        except Exception:
-            pass
 
 
 if __name__ == '__main__':
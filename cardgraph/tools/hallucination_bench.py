@@ -0,0 +1,139 @@
+"""
+Card Graph - Hallucination Detector Benchmark
+
+Compares the per-window signal detector (cg_hallucination.window_reason)
+with the old whole-transcript text heuristic (cg_hallucination.text_reason)
+on a labelled corpus of decoded Whisper windows.
+
+Corpus format: one JSON object per line with the window's text,
+no_speech_prob, avg_logprob, compression_ratio, a label ("speech" or
+"hallucination") and the segment it came from.
+
+The bundled hallucination_corpus.jsonl is 37 hand-written synthetic windows,
+and cg_hallucination's filler thresholds were chosen while looking at those
+same windows. Its numbers only show the bench runs; they are NOT evidence
+that the window detector beats the text heuristic on real Whisper output.
+For that, label windows from real session decodes (the worker logs dropped
+ones as 'windows_dropped'), tune on one part and score on a part kept out
+of tuning.
+
+Reported:
+    window level   precision / recall of each detector flagging a window
+    segment level  speech words kept and hallucinated words kept when the
+                   text heuristic discards whole segments vs. the window
+                   detector dropping only flagged windows
+    time           mean detector cost per segment
+
+Usage:
+    python3 hallucination_bench.py
+    python3 hallucination_bench.py --corpus my_windows.jsonl --repeat 2000
+"""
+import argparse
+import json
+import os
+import time
+from collections import OrderedDict
+
+import cg_hallucination
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hallucination_corpus.jsonl')
+
+
+def load_corpus(path):
+    windows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                windows.append(json.loads(line))
+    return windows
+
+
+def precision_recall(flags, labels):
+    tp = sum(1 for f, l in zip(flags, labels) if f and l)
+    fp = sum(1 for f, l in zip(flags, labels) if f and not l)
+    fn = sum(1 for f, l in zip(flags, labels) if not f and l)
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return precision, recall, tp, fp, fn
+
+
+def word_count(window):
+    return len(window['text'].split())
+
+
+def segment_outcomes(segments):
+    """Words of speech / hallucination kept by each strategy."""
+    totals = {'speech': 0, 'hallucination': 0}
+    text_kept = {'speech': 0, 'hallucination': 0}
+    window_kept = {'speech': 0, 'hallucination': 0}
+    for windows in segments.values():
+        # Old behaviour: judge the stitched transcript, keep or drop it whole
+        keep_segment = not cg_hallucination.text_reason(''.join(w['text'] for w in windows))
+        for w in windows:
+            n = word_count(w)
+            totals[w['label']] += n
+            if keep_segment:
+                text_kept[w['label']] += n
+            if not cg_hallucination.window_reason(w):
+                window_kept[w['label']] += n
+    return totals, text_kept, window_kept
+
+
+def time_per_segment(segments, repeat):
+    """Mean seconds per segment for each detector."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for windows in segments.values():
+            cg_hallucination.text_reason(''.join(w['text'] for w in windows))
+    text_sec = (time.perf_counter() - start) / (repeat * len(segments))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for windows in segments.values():
+            for w in windows:
+                cg_hallucination.window_reason(w)
+    window_sec = (time.perf_counter() - start) / (repeat * len(segments))
+    return text_sec, window_sec
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hallucination detector benchmark')
+    parser.add_argument('--corpus', type=str, default=DEFAULT_CORPUS)
+    parser.add_argument('--repeat', type=int, default=500, help='Timing iterations')
+    args = parser.parse_args()
+
+    windows = load_corpus(args.corpus)
+    labels = [w['label'] == 'hallucination' for w in windows]
+    segments = OrderedDict()
+    for w in windows:
+        segments.setdefault(w.get('segment', 'all'), []).append(w)
+
+    print(f"Corpus: {args.corpus}")
+    if os.path.abspath(args.corpus) == DEFAULT_CORPUS:
+        print("  (bundled synthetic seed, also used to pick the thresholds: not evidence of real-world accuracy)")
+    print(f"  {len(windows)} windows in {len(segments)} segments, {sum(labels)} labelled hallucination\n")
+
+    print("Window level            precision  recall   TP  FP  FN")
+    for name, detector in (('text heuristic', cg_hallucination.text_reason),
+                           ('window signals', cg_hallucination.window_reason)):
+        flags = [bool(detector(w['text'] if detector is cg_hallucination.text_reason else w))
+                 for w in windows]
+        p, r, tp, fp, fn = precision_recall(flags, labels)
+        print(f"  {name:<20} {p:9.2f} {r:7.2f} {tp:4d} {fp:3d} {fn:3d}")
+
+    totals, text_kept, window_kept = segment_outcomes(segments)
+    print("\nSegment level (words)   speech kept      hallucination kept")
+    for name, kept in (('text heuristic', text_kept), ('window signals', window_kept)):
+        print(f"  {name:<20} {kept['speech']:5d}/{totals['speech']:<5d} "
+              f"({kept['speech'] / max(1, totals['speech']):4.0%})  "
+              f"{kept['hallucination']:5d}/{totals['hallucination']:<5d} "
+              f"({kept['hallucination'] / max(1, totals['hallucination']):4.0%})")
+
+    text_sec, window_sec = time_per_segment(segments, args.repeat)
+    print(f"\nTime per segment        text heuristic {text_sec * 1e6:8.1f} us   "
+          f"window signals {window_sec * 1e6:8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
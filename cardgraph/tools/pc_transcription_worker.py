@@ -8,6 +8,8 @@ Usage:
     python pc_transcription_worker.py                        # all pending sessions
     python pc_transcription_worker.py --session-id 12        # specific session
     python pc_transcription_worker.py --model large          # use large model (default: large)
+    python pc_transcription_worker.py --backend faster-whisper  # int8 CPU engine
+    python pc_transcription_worker.py --batch 5              # segments leased per claim
 """
 import argparse
 import glob
@@ -26,10 +28,16 @@ for _ffdir in glob.glob(_ffmpeg_pattern):
         os.environ['PATH'] = _ffdir + os.pathsep + os.environ.get('PATH', '')
         break
 
-import pymysql
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from cg_config import DB_CONFIG, NAS_IP
+import cg_audio
+import cg_cache
+import cg_claim
+import cg_db
+import cg_inference
+import cg_master
+import cg_timing
+from cg_config import NAS_IP
 
 # NAS path mapping: Linux -> Windows UNC
 NAS_LINUX_PREFIX = '/volume1/web/cardgraph/'
@@ -37,9 +45,11 @@ NAS_UNC_PREFIX = rf'\\{NAS_IP}\web\cardgraph' + '\\'
 
 whisper_model = None
 
+CACHE_OPTIONS = {'language': 'en', 'word_timestamps': True}   # decode options that shape the cached result
+
 
 def get_db():
-    return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor, autocommit=True)
+    return cg_db.get_db()
 
 
 def nas_to_unc(linux_path):
@@ -61,79 +71,58 @@ def log_event(db, session_id, level, event_type, message):
     print(f"  [{ts}] [{level.upper()}] {message}")
 
 
-def load_whisper_model(model_name):
+def load_whisper_model(model_name, backend=None):
     """Load the Whisper model once at startup."""
     global whisper_model
     try:
-        import whisper
-        print(f"Loading Whisper model: {model_name}")
-        whisper_model = whisper.load_model(model_name)
+        spec = cg_inference.model_spec(model_name, backend)
+        print(f"Loading Whisper model: {spec}")
+        whisper_model = cg_inference.load_model(spec)
         print(f"Whisper model loaded successfully")
         return True
-    except ImportError:
-        print("ERROR: whisper module not installed. Run: pip install openai-whisper")
+    except ImportError as e:
+        print(f"ERROR: inference backend not installed ({e}). "
+              "Run: pip install openai-whisper (or faster-whisper)")
         return False
     except Exception as e:
         print(f"ERROR loading Whisper model: {e}")
         return False
 
 
-def transcribe_segment(audio_path, output_path):
-    """Transcribe a single audio file using Whisper."""
+def transcribe_segment(audio_path, output_path, db=None):
+    """Transcribe a single audio file using Whisper.
+
+    With db, audio seen before (same bytes, model and options) is answered
+    from the transcript cache; new results are added to it.
+    Returns (text, cached).
+    """
     global whisper_model
     if whisper_model is None:
         raise RuntimeError("Whisper model not loaded")
 
-    result = whisper_model.transcribe(audio_path, language='en', fp16=False)
-    text = result.get('text', '').strip()
+    # Read the segment off the share once; hash and decode the bytes in memory
+    with open(audio_path, 'rb') as f:
+        audio_bytes = f.read()
+    digest = cg_cache.bytes_digest(audio_bytes) if db else None
+    cached = cg_cache.lookup(db, digest, whisper_model.spec, CACHE_OPTIONS) if db else None
+    if cached is not None:
+        text, words = cached['text'], cached.get('words')
+    else:
+        result = whisper_model.transcribe(cg_audio.decode_bytes(audio_bytes), **CACHE_OPTIONS)
+        text = result.get('text', '').strip()
+        words = cg_timing.extract_words(result)
+        if db:
+            cg_cache.store(db, digest, whisper_model.spec, CACHE_OPTIONS, {'text': text, 'words': words},
+                           len(audio_bytes))
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(text)
         f.write('\n')
+    if words:
+        cg_timing.write_sidecar(output_path, text, words)
 
-    return text
-
-
-def claim_segment(db, session_id=None):
-    """Atomically claim one pending segment. Returns segment dict or None."""
-    with db.cursor() as cur:
-        # Find a candidate
-        if session_id:
-            cur.execute(
-                "SELECT segment_id FROM CG_TranscriptionSegments "
-                "WHERE session_id = %s AND recording_status = 'complete' "
-                "AND transcription_status = 'pending' "
-                "ORDER BY segment_number ASC LIMIT 1",
-                (session_id,)
-            )
-        else:
-            cur.execute(
-                "SELECT segment_id FROM CG_TranscriptionSegments "
-                "WHERE recording_status = 'complete' "
-                "AND transcription_status = 'pending' "
-                "ORDER BY session_id ASC, segment_number ASC LIMIT 1"
-            )
-        row = cur.fetchone()
-        if not row:
-            return None
-
-        # Atomic claim — only succeeds if still pending
-        cur.execute(
-            "UPDATE CG_TranscriptionSegments "
-            "SET transcription_status = 'transcribing' "
-            "WHERE segment_id = %s AND transcription_status = 'pending'",
-            (row['segment_id'],)
-        )
-        if cur.rowcount == 0:
-            return None  # Someone else claimed it
-
-        # Fetch full details
-        cur.execute(
-            "SELECT * FROM CG_TranscriptionSegments WHERE segment_id = %s",
-            (row['segment_id'],)
-        )
-        return cur.fetchone()
+    return text, cached is not None
 
 
 def get_session_dir(db, session_id):
@@ -152,7 +141,12 @@ def main():
     parser.add_argument('--session-id', type=int, default=None,
                         help='Process specific session (default: all pending)')
     parser.add_argument('--model', type=str, default='large',
-                        choices=['tiny', 'base', 'small', 'medium', 'large'])
+                        choices=cg_inference.MODELS)
+    parser.add_argument('--backend', type=str, default=cg_inference.DEFAULT_BACKEND,
+                        choices=cg_inference.BACKENDS,
+                        help='Inference engine (faster-whisper = int8 CTranslate2, much faster on CPU)')
+    parser.add_argument('--batch', type=int, default=cg_claim.DEFAULT_BATCH,
+                        help='Segments leased per claim (default: %(default)s)')
     args = parser.parse_args()
 
     print("=" * 60)
@@ -160,7 +154,7 @@ def main():
     print("=" * 60)
 
     # Load Whisper model
-    if not load_whisper_model(args.model):
+    if not load_whisper_model(args.model, args.backend):
         sys.exit(1)
 
     db = get_db()
@@ -196,8 +190,11 @@ def main():
     # Cache session dirs
     session_dirs = {}
 
+    # Leased a batch at a time; segments left over by a crash or Ctrl+C free up when the lease expires
+    lease = cg_claim.Lease(db, args.batch)
+
     while True:
-        segment = claim_segment(db, args.session_id)
+        segment = lease.next(args.session_id)
         if not segment:
             break
 
@@ -209,8 +206,8 @@ def main():
         if not audio_file:
             with db.cursor() as cur:
                 cur.execute(
-                    "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped' "
-                    "WHERE segment_id = %s", (seg_id,)
+                    "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped', "
+                    "claim_token = NULL, lease_expires_at = NULL WHERE segment_id = %s", (seg_id,)
                 )
             continue
 
@@ -238,6 +235,7 @@ def main():
             with db.cursor() as cur:
                 cur.execute(
                     "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped', "
+                    "claim_token = NULL, lease_expires_at = NULL, "
                     "error_message = 'Audio file not found (PC worker)' WHERE segment_id = %s",
                     (seg_id,)
                 )
@@ -249,7 +247,8 @@ def main():
 
         start_time = time.time()
         try:
-            text = transcribe_segment(audio_path, tx_path)
+            with lease.heartbeat(segment):
+                text, cached = transcribe_segment(audio_path, tx_path, db)
             elapsed = time.time() - start_time
             word_count = len(text.split()) if text else 0
 
@@ -258,13 +257,21 @@ def main():
                 cur.execute(
                     "UPDATE CG_TranscriptionSegments SET "
                     "transcription_status = 'complete', transcription_progress = 100, "
+                    "transcribed_at = NOW(), "
+                    "claim_token = NULL, lease_expires_at = NULL, "
                     "filename_transcript = %s WHERE segment_id = %s",
                     (tx_filename, seg_id)
                 )
+            try:
+                start, duration = cg_master.segment_times(segment)
+                cg_master.append(tx_dir, seg_num, tx_filename, text, start, duration)
+            except OSError as e:
+                print(f"  Master transcript not updated: {e}")
 
             log_event(db, sess_id, 'info', 'pc_transcription_complete',
-                      f"Segment {seg_num} done: {word_count} words in {elapsed:.1f}s")
-            print(f"  -> {word_count} words, {elapsed:.1f}s")
+                      f"Segment {seg_num} done: {word_count} words in {elapsed:.1f}s"
+                      f"{' (cached)' if cached else ''}")
+            print(f"  -> {word_count} words, {elapsed:.1f}s{' (cached)' if cached else ''}")
             completed += 1
 
         except Exception as e:
@@ -274,6 +281,7 @@ def main():
             with db.cursor() as cur:
                 cur.execute(
                     "UPDATE CG_TranscriptionSegments SET transcription_status = 'error', "
+                    "claim_token = NULL, lease_expires_at = NULL, "
                     "error_message = %s WHERE segment_id = %s",
                     (str(e)[:500], seg_id)
                 )
@@ -17,19 +17,25 @@ import threading
 import time
 from datetime import datetime
 
-import pymysql
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 
 # ─── Config ─────────────────────────────────────────────────────
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from cg_config import DB_CONFIG, NAS_IP
+import cg_audio
+import cg_cache
+import cg_db
+import cg_timing
+from cg_config import NAS_IP
 
 # NAS share path (mapped or UNC)
 NAS_SHARE = rf'\\{NAS_IP}\web\cardgraph'
 
 PORT = 8891
 
+# Decode options that shape the cached text (GPU fp16 can differ from CPU fp32)
+CACHE_OPTIONS = {'language': 'en', 'fp16': True, 'word_timestamps': True}
+
 # ─── State ──────────────────────────────────────────────────────
 app = Flask(__name__)
 CORS(app)
@@ -49,7 +55,7 @@ stop_flag = threading.Event()
 
 
 def get_db():
-    return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor, autocommit=True)
+    return cg_db.get_db()
 
 
 def log_event(db, session_id, level, event_type, message):
@@ -174,9 +180,21 @@ def worker_loop(session_id, model_name):
                       f'Transcribing segment {seg_num}: {audio_file}')
 
             try:
-                # Run Whisper
-                result = whisper_model.transcribe(str(audio_path), language='en', fp16=True)
-                text = result.get('text', '').strip()
+                # Segments reset from skipped/error are usually unchanged audio:
+                # answer those from the transcript cache instead of re-running Whisper
+                # Read once over the network; hash and decode the bytes in memory
+                with open(audio_path, 'rb') as f:
+                    audio_bytes = f.read()
+                digest = cg_cache.bytes_digest(audio_bytes)
+                cached = cg_cache.lookup(db, digest, model_name, CACHE_OPTIONS)
+                if cached is not None:
+                    text, words = cached['text'], cached.get('words')
+                else:
+                    result = whisper_model.transcribe(cg_audio.decode_bytes(audio_bytes), **CACHE_OPTIONS)
+                    text = result.get('text', '').strip()
+                    words = cg_timing.extract_words(result)
+                    cg_cache.store(db, digest, model_name, CACHE_OPTIONS, {'text': text, 'words': words},
+                                   len(audio_bytes))
 
                 # Ensure transcripts dir exists
                 os.makedirs(tx_dir, exist_ok=True)
@@ -185,19 +203,23 @@ def worker_loop(session_id, model_name):
                 with open(tx_path, 'w', encoding='utf-8') as f:
                     f.write(text)
                     f.write('\n')
+                if words:
+                    cg_timing.write_sidecar(tx_path, text, words)
 
                 # Mark complete
                 with db.cursor() as cur:
                     cur.execute(
                         "UPDATE CG_TranscriptionSegments SET "
                         "transcription_status = 'complete', transcription_progress = 100, "
+                        "transcribed_at = NOW(), "
                         "filename_transcript = %s WHERE segment_id = %s",
                         (tx_filename, seg_id)
                     )
 
                 word_count = len(text.split()) if text else 0
                 log_event(db, session_id, 'info', 'pc_transcription_complete',
-                          f'Segment {seg_num} done: {word_count} words')
+                          f'Segment {seg_num} done: {word_count} words'
+                          f"{' (cached)' if cached else ''}")
                 worker_state['completed'] += 1
 
             except Exception as e:
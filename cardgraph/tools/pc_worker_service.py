@@ -10,8 +10,12 @@ Usage:
 
 Endpoints:
     GET  /status  — worker state, current segment, model info
-    POST /start   — begin transcribing (body: {"session_id": 15, "model": "large"})
+    POST /start   — begin transcribing (body: {"session_id": 15, "model": "large",
+                    "backend": "faster-whisper"}; backend is optional)
     POST /stop    — stop after current segment
+
+While the session is still recording the worker keeps following it, woken by
+new files appearing in the session's audio share rather than DB polling.
 """
 import glob
 import json
@@ -32,14 +36,24 @@ for _ffdir in glob.glob(_ffmpeg_pattern):
         os.environ['PATH'] = _ffdir + os.pathsep + os.environ.get('PATH', '')
         break
 
-import pymysql
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from cg_config import DB_CONFIG, NAS_IP
+import cg_audio
+import cg_cache
+import cg_claim
+import cg_db
+import cg_inference
+import cg_timing
+from cg_config import NAS_IP
 
 NAS_LINUX_PREFIX = '/volume1/web/cardgraph/'
 NAS_UNC_PREFIX = rf'\\{NAS_IP}\web\cardgraph' + '\\'
 
+CACHE_OPTIONS = {'language': 'en', 'word_timestamps': True}   # decode options that shape the cached result
+
+FOLLOW_CHECK_SEC = 2        # audio dir listing interval while following a live session
+FOLLOW_FALLBACK_SEC = 60    # re-query the DB at least this often while following
+
 # ─── Worker State ────────────────────────────────────────────
 
 worker = {
@@ -62,7 +76,7 @@ whisper_model_name = None
 # ─── DB / Utility ────────────────────────────────────────────
 
 def get_db():
-    return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor, autocommit=True)
+    return cg_db.get_db()
 
 
 def nas_to_unc(linux_path):
@@ -83,36 +97,6 @@ def log_event(db, session_id, level, event_type, message):
     print(f"  [{ts}] [{level.upper()}] {message}", flush=True)
 
 
-def claim_segment(db, session_id):
-    """Atomically claim one pending segment."""
-    with db.cursor() as cur:
-        cur.execute(
-            "SELECT segment_id FROM CG_TranscriptionSegments "
-            "WHERE session_id = %s AND recording_status = 'complete' "
-            "AND transcription_status = 'pending' "
-            "ORDER BY segment_number ASC LIMIT 1",
-            (session_id,)
-        )
-        row = cur.fetchone()
-        if not row:
-            return None
-
-        cur.execute(
-            "UPDATE CG_TranscriptionSegments "
-            "SET transcription_status = 'transcribing' "
-            "WHERE segment_id = %s AND transcription_status = 'pending'",
-            (row['segment_id'],)
-        )
-        if cur.rowcount == 0:
-            return None
-
-        cur.execute(
-            "SELECT * FROM CG_TranscriptionSegments WHERE segment_id = %s",
-            (row['segment_id'],)
-        )
-        return cur.fetchone()
-
-
 def get_session_dir(db, session_id):
     with db.cursor() as cur:
         cur.execute(
@@ -125,13 +109,39 @@ def get_session_dir(db, session_id):
 
 # ─── Transcription Worker Thread ─────────────────────────────
 
-def worker_loop(session_id, model_name, max_segments=0):
+def wait_for_segment(audio_dir, timeout):
+    """Sleep until the recorder starts a new file in audio_dir, or timeout.
+
+    The recorder opens segment N+1 the moment segment N is complete, so a
+    new file over the share is a cheap completion signal that costs the NAS
+    database nothing.
+    """
+    def count_files():
+        try:
+            return len(os.listdir(audio_dir))
+        except OSError:
+            return None
+
+    before = count_files()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        time.sleep(FOLLOW_CHECK_SEC)
+        with worker_lock:
+            if worker['status'] == 'stopping':
+                return
+        if count_files() != before:
+            return
+
+
+def worker_loop(session_id, model_name, max_segments=0, backend=None):
     global whisper_model_obj, whisper_model_name
 
+    model_spec = cg_inference.model_spec(model_name, backend)
+
     with worker_lock:
         worker['status'] = 'loading'
         worker['session_id'] = session_id
-        worker['model'] = model_name
+        worker['model'] = model_spec
         worker['max_segments'] = max_segments or 0
         worker['completed'] = 0
         worker['errors'] = 0
@@ -140,12 +150,11 @@ def worker_loop(session_id, model_name, max_segments=0):
         worker['started_at'] = datetime.now().strftime('%H:%M:%S')
 
     # Load model (reuse if same model already loaded)
-    if whisper_model_obj is None or whisper_model_name != model_name:
-        print(f"Loading Whisper model: {model_name}...", flush=True)
+    if whisper_model_obj is None or whisper_model_name != model_spec:
+        print(f"Loading Whisper model: {model_spec}...", flush=True)
         try:
-            import whisper
-            whisper_model_obj = whisper.load_model(model_name)
-            whisper_model_name = model_name
+            whisper_model_obj = cg_inference.load_model(model_spec)
+            whisper_model_name = model_spec
             print(f"Model loaded successfully", flush=True)
         except Exception as e:
             print(f"ERROR loading model: {e}", flush=True)
@@ -171,6 +180,9 @@ def worker_loop(session_id, model_name, max_segments=0):
     session_dir_linux = get_session_dir(db, session_id)
     session_dir = nas_to_unc(session_dir_linux) if session_dir_linux else None
 
+    # Segments are leased a few at a time; one that comes back empty means none are claimable
+    lease = cg_claim.Lease(db, min(cg_claim.DEFAULT_BATCH, max_segments or cg_claim.DEFAULT_BATCH))
+
     while True:
         with worker_lock:
             if worker['status'] == 'stopping':
@@ -179,20 +191,18 @@ def worker_loop(session_id, model_name, max_segments=0):
             if max_segments > 0 and worker['completed'] >= max_segments:
                 break
 
-        segment = claim_segment(db, session_id)
+        segment = lease.next(session_id)
         if not segment:
-            # Check if there are still pending (might be new ones from ongoing recording)
+            # Still recording: wait for the next segment instead of exiting
             with db.cursor() as cur:
                 cur.execute(
-                    "SELECT COUNT(*) as cnt FROM CG_TranscriptionSegments "
-                    "WHERE session_id = %s AND recording_status = 'complete' "
-                    "AND transcription_status = 'pending'",
+                    "SELECT status FROM CG_TranscriptionSessions WHERE session_id = %s",
                     (session_id,)
                 )
-                remaining = cur.fetchone()['cnt']
-            if remaining == 0:
+                sess = cur.fetchone()
+            if not session_dir or not sess or sess['status'] != 'recording':
                 break
-            time.sleep(5)
+            wait_for_segment(os.path.join(session_dir, 'audio'), FOLLOW_FALLBACK_SEC)
             continue
 
         seg_id = segment['segment_id']
@@ -206,8 +216,8 @@ def worker_loop(session_id, model_name, max_segments=0):
         if not audio_file or not session_dir:
             with db.cursor() as cur:
                 cur.execute(
-                    "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped' "
-                    "WHERE segment_id = %s", (seg_id,)
+                    "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped', "
+                    "claim_token = NULL, lease_expires_at = NULL WHERE segment_id = %s", (seg_id,)
                 )
             continue
 
@@ -222,23 +232,39 @@ def worker_loop(session_id, model_name, max_segments=0):
             with db.cursor() as cur:
                 cur.execute(
                     "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped', "
+                    "claim_token = NULL, lease_expires_at = NULL, "
                     "error_message = 'Audio file not found (PC)' WHERE segment_id = %s",
                     (seg_id,)
                 )
             continue
 
         log_event(db, session_id, 'info', 'pc_transcribing',
-                  f"PC transcribing SEG {seg_num}: {audio_file} (model: {model_name})")
+                  f"PC transcribing SEG {seg_num}: {audio_file} (model: {model_spec})")
 
         start_time = time.time()
         try:
-            result = whisper_model_obj.transcribe(audio_path, language='en', fp16=False)
-            text = result.get('text', '').strip()
+            # Audio seen before with this model is answered from the transcript cache
+            # One read over SMB: hash it, then decode the same bytes in memory
+            with open(audio_path, 'rb') as f:
+                audio_bytes = f.read()
+            digest = cg_cache.bytes_digest(audio_bytes)
+            cached = cg_cache.lookup(db, digest, model_spec, CACHE_OPTIONS)
+            if cached is not None:
+                text, words = cached['text'], cached.get('words')
+            else:
+                with lease.heartbeat(segment):
+                    result = whisper_model_obj.transcribe(cg_audio.decode_bytes(audio_bytes), **CACHE_OPTIONS)
+                text = result.get('text', '').strip()
+                words = cg_timing.extract_words(result)
+                cg_cache.store(db, digest, model_spec, CACHE_OPTIONS, {'text': text, 'words': words},
+                               len(audio_bytes))
 
             os.makedirs(os.path.dirname(tx_path), exist_ok=True)
             with open(tx_path, 'w', encoding='utf-8') as f:
                 f.write(text)
                 f.write('\n')
+            if words:
+                cg_timing.write_sidecar(tx_path, text, words)
 
             elapsed = time.time() - start_time
             word_count = len(text.split()) if text else 0
@@ -247,12 +273,15 @@ def worker_loop(session_id, model_name, max_segments=0):
                 cur.execute(
                     "UPDATE CG_TranscriptionSegments SET "
                     "transcription_status = 'complete', transcription_progress = 100, "
+                    "transcribed_at = NOW(), "
+                    "claim_token = NULL, lease_expires_at = NULL, "
                     "filename_transcript = %s WHERE segment_id = %s",
                     (tx_filename, seg_id)
                 )
 
             log_event(db, session_id, 'info', 'pc_transcription_complete',
-                      f"PC SEG {seg_num} done: {word_count} words in {elapsed:.1f}s")
+                      f"PC SEG {seg_num} done: {word_count} words in {elapsed:.1f}s"
+                      f"{' (cached)' if cached else ''}")
             print(f"  SEG {seg_num:03d}: {word_count} words, {elapsed:.1f}s", flush=True)
 
             with worker_lock:
@@ -265,12 +294,14 @@ def worker_loop(session_id, model_name, max_segments=0):
             with db.cursor() as cur:
                 cur.execute(
                     "UPDATE CG_TranscriptionSegments SET transcription_status = 'error', "
+                    "claim_token = NULL, lease_expires_at = NULL, "
                     "error_message = %s WHERE segment_id = %s",
                     (str(e)[:500], seg_id)
                 )
             with worker_lock:
                 worker['errors'] += 1
 
+    lease.release()  # stopped or limited mid-batch: leave the rest to other workers
     db.close()
     with worker_lock:
         worker['status'] = 'idle'
@@ -305,7 +336,8 @@ class WorkerHandler(BaseHTTPRequestHandler):
         if self.path == '/status':
             with worker_lock:
                 data = dict(worker)
-            data['available_models'] = ['tiny', 'base', 'small', 'medium', 'large']
+            data['available_models'] = list(cg_inference.MODELS)
+            data['available_backends'] = list(cg_inference.BACKENDS)
             data['loaded_model'] = whisper_model_name
             self._json_response(data)
         else:
@@ -320,11 +352,17 @@ class WorkerHandler(BaseHTTPRequestHandler):
 
             session_id = body.get('session_id')
             model = body.get('model', 'large')
+            backend = body.get('backend') or cg_inference.DEFAULT_BACKEND
             count = int(body.get('count', 0))  # 0 = all pending
 
             if not session_id:
                 self._json_response({'error': 'session_id required'}, 400)
                 return
+            try:
+                cg_inference.parse_spec(cg_inference.model_spec(model, backend))
+            except ValueError as e:
+                self._json_response({'error': str(e)}, 400)
+                return
 
             with worker_lock:
                 if worker['status'] not in ('idle',):
@@ -332,7 +370,7 @@ class WorkerHandler(BaseHTTPRequestHandler):
                     return
 
             worker_thread = threading.Thread(
-                target=worker_loop, args=(int(session_id), model, count), daemon=True
+                target=worker_loop, args=(int(session_id), model, count, backend), daemon=True
             )
             worker_thread.start()
             label = f'{count} segment{"s" if count != 1 else ""}' if count > 0 else 'all pending'
@@ -60,6 +60,18 @@ fi
 curl -s -d 'key=cg_sched_2026' http://192.168.0.215:8880/api/transcription/cleanup >> "$LOG" 2>&1
 echo "" >> "$LOG"
 
+# --- Clip service (review clips for the UI; exits at once if already listening) ---
+CLIP_SERVICE="$TOOLS_DIR/clip_service.py"
+if [ -f "$CLIP_SERVICE" ]; then
+    nohup $PYTHON_BIN "$CLIP_SERVICE" >> "$TOOLS_DIR/clip_service.log" 2>&1 &
+fi
+
+# --- Archive compaction (re-encodes transcribed audio; holds its own lock, exits when idle) ---
+COMPACTOR="$TOOLS_DIR/transcription_compactor.py"
+if [ -f "$COMPACTOR" ]; then
+    nohup nice -n 19 $PYTHON_BIN "$COMPACTOR" >> "$TOOLS_DIR/transcription_compactor.log" 2>&1 &
+fi
+
 # --- Whisper install (if requested) ---
 WHISPER_REQ="$TOOLS_DIR/whisper_install_request"
 WHISPER_LOCK="$TOOLS_DIR/whisper_install.lock"
@@ -84,7 +96,7 @@ if [ -f "$BUILD_REQ" ] && [ ! -f "$BUILD_LOCK" ]; then
     rm -f "$BUILD_REQ"
     echo "Docker build starting at $(date '+%Y-%m-%d %H:%M:%S')" >> "$LOG"
     touch "$BUILD_LOCK"
-    docker build -t cg-browser-recorder:latest "$DOCKER_DIR" > "$BUILD_LOG" 2>&1
+    docker build -t cg-browser-recorder:latest -f "$DOCKER_DIR/Dockerfile" "$TOOLS_DIR" > "$BUILD_LOG" 2>&1
     BUILD_EXIT=$?
     echo "EXIT_CODE=$BUILD_EXIT" >> "$BUILD_LOG"
     rm -f "$BUILD_LOCK"
@@ -0,0 +1,254 @@
+"""
+Card Graph - Transcription Archive Compactor
+
+Re-encodes session audio once it has been transcribed, so the archive keeps
+months of reviewable audio in the space full-size WAVs take for weeks.
+Segments whose transcription is complete are transcoded to the
+CG_TranscriptionSettings.archive_codec format ('flac' lossless, 'opus'
+speech-bitrate Opus), checked against the original's duration, checksummed
+(archive_sha256), and the original is deleted. filename_audio,
+file_size_bytes and archive_format are updated to match the new file.
+
+Audio never moves down a step (opus is never re-encoded to flac); a segment
+already at or past the target is only checksummed. Segments the recorder
+wrote no waveform peaks for (browser automation captures) get them here,
+from the original audio. The compactor runs from
+the scheduler wrapper once a minute, niced, one segment at a time, and exits
+when nothing is left; a lock file keeps overlapping runs out.
+
+Usage:
+    python3 transcription_compactor.py                  # all sessions
+    python3 transcription_compactor.py --session-id 12 --limit 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cg_cache
+import cg_db
+import cg_peaks
+from transcription_recorder import OPUS_BITRATE
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCK_PATH = os.path.join(TOOLS_DIR, 'transcription_compactor.lock')
+
+COMPACT_AFTER_MIN = 10      # leave freshly transcribed segments alone for a while (from transcribed_at)
+BATCH_SIZE = 20
+DURATION_TOLERANCE_SEC = 1.0
+
+# Archive format -> (extension, ffmpeg codec args, container)
+CODECS = {
+    'flac': ('flac', ['-codec:a', 'flac', '-compression_level', '8'], 'flac'),
+    'opus': ('opus', ['-codec:a', 'libopus', '-b:a', OPUS_BITRATE, '-application', 'voip'], 'ogg'),
+}
+# Higher is more compact; audio is only ever moved up
+COMPACTNESS = {'wav': 0, 'flac': 1, 'opus': 2}
+
+
+def get_db():
+    return cg_db.get_db()
+
+
+def log_event(db, session_id, level, event_type, message):
+    with db.cursor() as cur:
+        cur.execute(
+            "INSERT INTO CG_TranscriptionLogs (session_id, log_level, event_type, message) "
+            "VALUES (%s, %s, %s, %s)",
+            (session_id, level, event_type, message)
+        )
+    print(f"[{level.upper()}] [S{session_id}] {message}")
+
+
+def acquire_lock():
+    """Take the lock file unless a live compactor already holds it."""
+    try:
+        with open(LOCK_PATH) as f:
+            pid = int(f.readline().strip() or 0)
+        if pid > 0:
+            os.kill(pid, 0)
+            return False
+    except (OSError, ValueError):
+        pass  # no lock, unreadable lock, or its process is gone
+    with open(LOCK_PATH, 'w') as f:
+        f.write(f"{os.getpid()}\n{int(time.time())}\n")
+    return True
+
+
+def release_lock():
+    try:
+        os.remove(LOCK_PATH)
+    except OSError:
+        pass
+
+
+def probe_duration(path):
+    """Container duration in seconds as ffprobe reports it, or None."""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+            capture_output=True, text=True, timeout=60
+        )
+        return float(result.stdout.strip())
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+def transcode(src, dst, codec):
+    """Encode src into dst with the archive codec. Raises RuntimeError on failure."""
+    _, codec_args, container = CODECS[codec]
+    cmd = ['ffmpeg', '-nostdin', '-y', '-nostats', '-loglevel', 'error',
+           '-i', src, '-vn', '-map_metadata', '-1'] + codec_args + ['-f', container, dst]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exit {result.returncode}: {result.stderr.strip()[-200:]}")
+
+    src_sec = probe_duration(src)
+    dst_sec = probe_duration(dst)
+    if src_sec is None or dst_sec is None:
+        raise RuntimeError('could not read duration back')
+    if abs(src_sec - dst_sec) > max(DURATION_TOLERANCE_SEC, src_sec * 0.01):
+        raise RuntimeError(f"duration changed: {src_sec:.1f}s -> {dst_sec:.1f}s")
+
+
+def fetch_batch(db, session_id, limit):
+    sql = (
+        "SELECT g.segment_id, g.session_id, g.segment_number, g.filename_audio, g.file_size_bytes, "
+        "s.session_dir FROM CG_TranscriptionSegments g "
+        "JOIN CG_TranscriptionSessions s ON s.session_id = g.session_id "
+        "WHERE g.recording_status = 'complete' AND g.transcription_status = 'complete' "
+        "AND g.compacted_at IS NULL AND g.filename_audio IS NOT NULL "
+        "AND s.session_dir IS NOT NULL "
+        # Rows transcribed before migration 027 have no transcribed_at; end of recording is all there is
+        "AND COALESCE(g.transcribed_at, g.completed_at) < NOW() - INTERVAL %s MINUTE"
+    )
+    params = [COMPACT_AFTER_MIN]
+    if session_id:
+        sql += " AND g.session_id = %s"
+        params.append(session_id)
+    sql += " ORDER BY g.session_id, g.segment_number LIMIT %s"
+    params.append(limit)
+    with db.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def compact_segment(db, segment, codec):
+    """Bring one segment to the archive codec. Returns (bytes before, bytes after)."""
+    audio_dir = os.path.join(segment['session_dir'], 'audio')
+    src_name = segment['filename_audio']
+    src = os.path.join(audio_dir, src_name)
+    stem, ext = os.path.splitext(src_name)
+    src_format = ext.lstrip('.').lower()
+
+    if not os.path.exists(src):
+        # Deleted by hand or by an older cleanup; nothing to archive
+        with db.cursor() as cur:
+            cur.execute(
+                "UPDATE CG_TranscriptionSegments SET compacted_at = NOW() "
+                "WHERE segment_id = %s", (segment['segment_id'],)
+            )
+        return 0, 0
+    before = os.path.getsize(src)
+
+    peaks = cg_peaks.peaks_path(segment['session_dir'], src_name)
+    if not os.path.exists(peaks):
+        try:
+            cg_peaks.write_from_audio(src, peaks)
+        except (OSError, RuntimeError) as e:
+            print(f"[WARNING] [S{segment['session_id']}] No peaks for {src_name}: {e}")
+
+    if COMPACTNESS.get(src_format, 0) >= COMPACTNESS[codec]:
+        # Already as compact as the target: checksum it where it is
+        with db.cursor() as cur:
+            cur.execute(
+                "UPDATE CG_TranscriptionSegments SET archive_format = %s, archive_sha256 = %s, "
+                "file_size_bytes = %s, compacted_at = NOW() WHERE segment_id = %s",
+                (src_format, cg_cache.audio_digest(src), before, segment['segment_id'])
+            )
+        return before, before
+
+    dst_name = f"{stem}.{CODECS[codec][0]}"
+    dst = os.path.join(audio_dir, dst_name)
+    part = dst + '.part'
+    try:
+        transcode(src, part, codec)
+        digest = cg_cache.audio_digest(part)
+        os.replace(part, dst)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    after = os.path.getsize(dst)
+
+    # Row first, then the original: a crash in between leaves a stray WAV, never a dangling row
+    with db.cursor() as cur:
+        cur.execute(
+            "UPDATE CG_TranscriptionSegments SET filename_audio = %s, file_size_bytes = %s, "
+            "archive_format = %s, archive_sha256 = %s, compacted_at = NOW() WHERE segment_id = %s",
+            (dst_name, after, codec, digest, segment['segment_id'])
+        )
+    os.remove(src)
+    return before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transcription Archive Compactor')
+    parser.add_argument('--session-id', type=int, default=None)
+    parser.add_argument('--limit', type=int, default=0, help='Stop after this many segments (0 = all)')
+    args = parser.parse_args()
+
+    if not acquire_lock():
+        print("Compactor already running")
+        return
+
+    db = get_db()
+    try:
+        with db.cursor() as cur:
+            cur.execute("SELECT archive_codec FROM CG_TranscriptionSettings WHERE setting_id = 1")
+            row = cur.fetchone()
+        codec = (row or {}).get('archive_codec') or 'none'
+        if codec not in CODECS:
+            print("Archive compaction disabled")
+            return
+
+        done = 0
+        totals = {}     # session_id -> [segments, bytes before, bytes after]
+        failed = set()
+        while not args.limit or done < args.limit:
+            batch = [s for s in fetch_batch(db, args.session_id, BATCH_SIZE + len(failed))
+                     if s['segment_id'] not in failed]
+            if not batch:
+                break
+            for segment in batch:
+                sid = segment['session_id']
+                try:
+                    before, after = compact_segment(db, segment, codec)
+                except Exception as e:
+                    failed.add(segment['segment_id'])
+                    log_event(db, sid, 'warning', 'compaction_error',
+                              f"Segment {segment['segment_number']} not compacted: {e}")
+                    continue
+                t = totals.setdefault(sid, [0, 0, 0])
+                t[0] += 1
+                t[1] += before
+                t[2] += after
+                done += 1
+                if args.limit and done >= args.limit:
+                    break
+
+        for sid, (count, before, after) in totals.items():
+            log_event(db, sid, 'info', 'audio_compacted',
+                      f"Archived {count} segment(s) as {codec}: "
+                      f"{before / 1048576:.1f} MB -> {after / 1048576:.1f} MB")
+    finally:
+        try:
+            db.close()
+        except Exception:
+            pass
+        release_lock()
+
+
+if __name__ == '__main__':
+    main()
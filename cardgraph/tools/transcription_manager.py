@@ -1,31 +1,48 @@
 """
 Card Graph - Transcription Manager (Orchestrator)
 
-Launches and monitors the recorder and transcription worker subprocesses.
-Polls for stop/cancel signal files and manages session lifecycle.
+Launches and monitors the recorder and transcription worker subprocesses
+and manages session lifecycle. Their output is drained as it arrives
+(cg_output): warnings and errors go to CG_TranscriptionLogs, the rest only
+to a rolling tail reported if the recorder fails. While a session runs the manager sleeps in
+asyncio until something happens: a stop/cancel signal file appears
+(inotify, see cg_watch), the recorder exits, or the heartbeat or
+max-duration timer fires.
 
 Usage:
     python3 transcription_manager.py --session-id 123
 """
 import argparse
+import asyncio
 import json
 import os
 import signal
 import subprocess
 import sys
+import threading
 import time
 from datetime import datetime
 
 # Ensure this script's directory is on the path (for bundled pymysql and cg_config)
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-import pymysql
+import cg_db
+import cg_dbwriter
+import cg_inference
+import cg_master
+import cg_output
+import cg_watch
+import whisper_daemon
 from cg_config import DB_CONFIG
 
 TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
 
+HEARTBEAT_SEC = 30      # lock file heartbeat + segment count refresh
+SIGNAL_POLL_SEC = 5     # signal file check when inotify is unavailable
+DRAIN_SEC = 5           # wait this long for a child's last output after it exits
+
 
 def get_db():
-    return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor, autocommit=True)
+    return cg_db.get_db()
 
 
 def log_event(db, session_id, level, event_type, message):
@@ -70,6 +87,7 @@ def load_config(db, session_id):
     # Merge overrides
     config = {
         'segment_length_minutes':  session['override_segment_length'] or settings['segment_length_minutes'],
+        'segment_mode':            settings.get('segment_mode') or 'fixed',
         'silence_timeout_minutes': session['override_silence_timeout'] or settings['silence_timeout_minutes'],
         'max_session_hours':       session['override_max_duration'] or settings['max_session_hours'],
         'max_cpu_cores':           session['override_cpu_limit'] or settings['max_cpu_cores'],
@@ -79,10 +97,12 @@ def load_config(db, session_id):
         'audio_format':            settings['audio_format'],
         'silence_threshold_dbfs':  settings['silence_threshold_dbfs'],
         'whisper_model':           settings['whisper_model'],
+        'inference_backend':       session.get('override_inference_backend') or settings.get('inference_backend') or 'whisper',
         'priority_mode':           settings['priority_mode'],
         'base_archive_dir':        settings['base_archive_dir'],
         'folder_structure':        settings['folder_structure'],
         'min_free_disk_gb':        settings['min_free_disk_gb'],
+        'session_runner':          settings.get('session_runner') or 'process',
     }
     return session, config
 
@@ -149,6 +169,178 @@ def write_heartbeat(session_id):
         pass
 
 
+async def wait_exit(proc):
+    """proc's return code once it exits, woken by its pidfd instead of polling."""
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+
+    def done():
+        if not exited.done():
+            exited.set_result(None)
+
+    try:
+        fd = os.pidfd_open(proc.pid)
+    except (AttributeError, OSError):
+        # No pidfd (older kernel or Python, or already reaped): a thread blocks in wait()
+        fd = None
+        threading.Thread(target=lambda: (proc.wait(), loop.call_soon_threadsafe(done)), daemon=True).start()
+    else:
+        loop.add_reader(fd, done)
+    try:
+        await exited
+    finally:
+        if fd is not None:
+            loop.remove_reader(fd)
+            os.close(fd)
+    return proc.wait()
+
+
+def update_segment_totals(db, session_id):
+    with db.cursor() as cur:
+        cur.execute(
+            "SELECT COUNT(*) AS cnt, COALESCE(SUM(duration_seconds), 0) AS dur "
+            "FROM CG_TranscriptionSegments WHERE session_id = %s",
+            (session_id,)
+        )
+        row = cur.fetchone()
+    update_session(db, session_id, total_segments=row['cnt'], total_duration_sec=row['dur'])
+
+
+async def monitor_session(db, session_id, config, recorder_proc, worker_proc):
+    """Run the session until it is cancelled, stopped, times out or the recorder exits.
+
+    Nothing here polls: the loop waits on one Event set by the signal-file
+    watch and the recorder's exit, with a timeout at the next heartbeat or
+    the max-duration deadline, whichever is sooner.
+    """
+    loop = asyncio.get_running_loop()
+    acquisition_mode = config['acquisition_mode']
+    deadline = time.time() + int(config['max_session_hours']) * 3600
+    next_heartbeat = time.time() + HEARTBEAT_SEC
+    wake = asyncio.Event()
+
+    # Read both children's output from the start, or a full pipe stalls them
+    writer = cg_dbwriter.DBWriter(get_db)
+    drains = {}
+    for source, proc in (('recorder', recorder_proc), ('worker', worker_proc)):
+        if proc and proc.stdout:
+            output = cg_output.ChildOutput(writer, session_id, source)
+            drains[source] = (output, cg_output.drain(proc, output))
+
+    watch = cg_watch.DirectoryWatch(TOOLS_DIR)
+    if watch.available():
+        loop.add_reader(watch.fileno(), lambda: watch.read() and wake.set())
+    recorder_exit = None
+    if recorder_proc:
+        recorder_exit = asyncio.ensure_future(wait_exit(recorder_proc))
+        recorder_exit.add_done_callback(lambda _: wake.set())
+
+    try:
+        while True:
+            # Check cancel signal
+            if check_signal(session_id, 'cancel'):
+                log_event(db, session_id, 'warning', 'cancel_received', 'Cancel signal received')
+                if acquisition_mode == 'browser_automation':
+                    stop_docker_container(session_id)
+                if recorder_proc and recorder_proc.poll() is None:
+                    recorder_proc.terminate()
+                if worker_proc and worker_proc.poll() is None:
+                    worker_proc.terminate()
+                update_session(db, session_id, status='stopped', stop_reason='user_cancel',
+                               end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                log_event(db, session_id, 'info', 'session_cancelled', 'Session cancelled by user')
+                return
+
+            # Check stop signal
+            if check_signal(session_id, 'stop'):
+                log_event(db, session_id, 'info', 'stop_received', 'Stop signal received — stopping recorder')
+                if acquisition_mode == 'browser_automation':
+                    stop_docker_container(session_id)
+                if recorder_proc and recorder_proc.poll() is None:
+                    recorder_proc.terminate()
+                # Let transcription worker continue — it exits when no more pending segments
+                update_session(db, session_id, status='processing')
+                log_event(db, session_id, 'info', 'processing', 'Recording stopped, transcription continues')
+                # Wait for worker to finish
+                if worker_proc:
+                    await wait_exit(worker_proc)
+                update_session(db, session_id, status='complete',
+                               end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                log_event(db, session_id, 'info', 'session_complete', 'Session completed after stop')
+                return
+
+            # Check max duration
+            if time.time() >= deadline:
+                log_event(db, session_id, 'warning', 'max_duration', f"Max duration reached ({config['max_session_hours']}h)")
+                if acquisition_mode == 'browser_automation':
+                    stop_docker_container(session_id)
+                if recorder_proc and recorder_proc.poll() is None:
+                    recorder_proc.terminate()
+                update_session(db, session_id, status='processing')
+                if worker_proc:
+                    await wait_exit(worker_proc)
+                update_session(db, session_id, status='complete', stop_reason='max_duration',
+                               end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                log_event(db, session_id, 'info', 'session_complete', 'Session completed (max duration)')
+                return
+
+            # Check if recorder exited naturally
+            if recorder_exit and recorder_exit.done():
+                exit_code = recorder_proc.returncode
+                # Recorder output tail for diagnostics
+                rec_output = ''
+                if 'recorder' in drains:
+                    output, drained = drains['recorder']
+                    try:
+                        await asyncio.wait_for(asyncio.shield(drained), DRAIN_SEC)
+                    except asyncio.TimeoutError:
+                        pass
+                    rec_output = output.tail()
+                if exit_code == 0:
+                    log_event(db, session_id, 'info', 'recorder_exited', 'Recorder finished normally')
+                else:
+                    msg = f"Recorder exited with code {exit_code}"
+                    if rec_output:
+                        msg += f"\n{rec_output}"
+                    log_event(db, session_id, 'warning', 'recorder_exited', msg)
+                update_session(db, session_id, status='processing')
+                # Wait for worker to finish
+                if worker_proc:
+                    await wait_exit(worker_proc)
+                update_session(db, session_id, status='complete',
+                               end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                log_event(db, session_id, 'info', 'session_complete', 'Session completed')
+                return
+
+            # Periodic heartbeat + segment count update
+            if time.time() >= next_heartbeat:
+                next_heartbeat = time.time() + HEARTBEAT_SEC
+                write_heartbeat(session_id)
+                try:
+                    update_segment_totals(db, session_id)
+                except Exception:
+                    pass
+
+            timeout = min(deadline, next_heartbeat) - time.time()
+            if not watch.available():
+                timeout = min(timeout, SIGNAL_POLL_SEC)
+            try:
+                await asyncio.wait_for(wake.wait(), max(0.0, timeout))
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+    finally:
+        if watch.available():
+            loop.remove_reader(watch.fileno())
+        watch.close()
+        if recorder_exit and not recorder_exit.done():
+            recorder_exit.cancel()
+        pending = [drained for _, drained in drains.values() if not drained.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=DRAIN_SEC)
+        writer.close()
+
+
 def find_python():
     """Find the python3/python binary."""
     for cmd in ['python3', 'python']:
@@ -161,6 +353,12 @@ def find_python():
     return 'python3'
 
 
+def find_whisper_python(default):
+    """Prefer the Whisper venv interpreter (same lookup as TranscriptionController)."""
+    venv_py = os.path.join(TOOLS_DIR, 'whisper_venv', 'bin', 'python3')
+    return venv_py if os.path.exists(venv_py) else default
+
+
 def launch_docker_recorder(session_id, session_dir, config):
     """Launch the browser automation recorder in a Docker container."""
     container_name = f"cg_tx_recorder_{session_id}"
@@ -212,10 +410,25 @@ def main():
     db = get_db()
     recorder_proc = None
     worker_proc = None
+    handed_off = False
 
     try:
         session, config = load_config(db, session_id)
         write_heartbeat(session_id)
+
+        if config['session_runner'] == 'supervisor':
+            # One process runs every concurrent session; its heartbeat takes over the lock.
+            # A supervisor that is already running just picks the session up.
+            sup_cmd = [find_whisper_python(find_python()), os.path.join(TOOLS_DIR, 'transcription_supervisor.py'),
+                       '--session-id', str(session_id)]
+            with open(os.path.join(TOOLS_DIR, 'transcription_supervisor.out'), 'ab') as out:
+                subprocess.Popen(sup_cmd, stdout=out, stderr=subprocess.STDOUT,
+                                 stdin=subprocess.DEVNULL, start_new_session=True)
+            handed_off = True
+            log_event(db, session_id, 'info', 'supervisor_handoff',
+                      f"Session {session_id} handed to the transcription supervisor")
+            return
+
         log_event(db, session_id, 'info', 'manager_started', f"Manager started for session {session_id}")
 
         # Create session directory
@@ -226,10 +439,13 @@ def main():
         python_bin = find_python()
         config_json = json.dumps(config)
 
-        # Determine CPU affinity
+        # Determine CPU affinity: transcription gets every core above 0,
+        # one concurrent segment per core
         total_cores = config['max_cpu_cores']
         rec_cores = '0' if total_cores == 1 else '0,1'
-        tx_cores = '0' if total_cores == 1 else str(total_cores - 1)
+        tx_core_list = [str(c) for c in range(1, total_cores)] or ['0']
+        tx_cores = ','.join(tx_core_list)
+        tx_parallel = len(tx_core_list)
 
         acquisition_mode = config['acquisition_mode']
 
@@ -255,12 +471,28 @@ def main():
             log_event(db, session_id, 'info', 'recorder_launching', 'Launching audio recorder')
             recorder_proc = subprocess.Popen(rec_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
 
+        # Make sure the resident Whisper daemon is up so the worker skips the model load
+        whisper_python = find_whisper_python(python_bin)
+        model_spec = cg_inference.model_spec(str(config['whisper_model']), config['inference_backend'])
+        if whisper_daemon.ensure_running(whisper_python, preload=[model_spec],
+                                         workers=tx_parallel, cores=tx_cores):
+            log_event(db, session_id, 'info', 'whisper_daemon', 'Whisper daemon ready')
+        else:
+            log_event(db, session_id, 'warning', 'whisper_daemon',
+                      'Whisper daemon did not start — worker will load the model itself')
+
         # Launch transcription worker
         tx_script = os.path.join(TOOLS_DIR, 'transcription_worker.py')
-        tx_cmd = [python_bin, tx_script,
+        tx_cmd = [whisper_python, tx_script,
                   '--session-id', str(session_id),
                   '--session-dir', session_dir,
-                  '--model', str(config['whisper_model'])]
+                  '--model', str(config['whisper_model']),
+                  '--backend', config['inference_backend'],
+                  '--silence-threshold', str(config['silence_threshold_dbfs']),
+                  '--parallel', str(tx_parallel),
+                  '--segment-minutes', str(config['segment_length_minutes'])]
+        if config['audio_format'] == 'wav':
+            tx_cmd.append('--stream')  # growing WAVs can be read mid-segment
 
         # Nice + taskset for transcription worker
         try:
@@ -278,123 +510,18 @@ def main():
         log_event(db, session_id, 'info', 'worker_launching', 'Launching transcription worker')
         worker_proc = subprocess.Popen(tx_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
 
-        # ── Monitor loop ──
-        max_seconds = int(config['max_session_hours']) * 3600
-        start_time = time.time()
-
-        while True:
-            time.sleep(1)
-            elapsed = time.time() - start_time
-
-            # Check cancel signal
-            if check_signal(session_id, 'cancel'):
-                log_event(db, session_id, 'warning', 'cancel_received', 'Cancel signal received')
-                if acquisition_mode == 'browser_automation':
-                    stop_docker_container(session_id)
-                if recorder_proc and recorder_proc.poll() is None:
-                    recorder_proc.terminate()
-                if worker_proc and worker_proc.poll() is None:
-                    worker_proc.terminate()
-                update_session(db, session_id, status='stopped', stop_reason='user_cancel',
-                               end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                log_event(db, session_id, 'info', 'session_cancelled', 'Session cancelled by user')
-                break
-
-            # Check stop signal
-            if check_signal(session_id, 'stop'):
-                log_event(db, session_id, 'info', 'stop_received', 'Stop signal received — stopping recorder')
-                if acquisition_mode == 'browser_automation':
-                    stop_docker_container(session_id)
-                if recorder_proc and recorder_proc.poll() is None:
-                    recorder_proc.terminate()
-                # Let transcription worker continue — it exits when no more pending segments
-                update_session(db, session_id, status='processing')
-                log_event(db, session_id, 'info', 'processing', 'Recording stopped, transcription continues')
-                # Wait for worker to finish
-                if worker_proc:
-                    worker_proc.wait()
-                update_session(db, session_id, status='complete',
-                               end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                log_event(db, session_id, 'info', 'session_complete', 'Session completed after stop')
-                break
-
-            # Check max duration
-            if elapsed >= max_seconds:
-                log_event(db, session_id, 'warning', 'max_duration', f"Max duration reached ({config['max_session_hours']}h)")
-                if acquisition_mode == 'browser_automation':
-                    stop_docker_container(session_id)
-                if recorder_proc and recorder_proc.poll() is None:
-                    recorder_proc.terminate()
-                update_session(db, session_id, status='processing')
-                if worker_proc:
-                    worker_proc.wait()
-                update_session(db, session_id, status='complete', stop_reason='max_duration',
-                               end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                log_event(db, session_id, 'info', 'session_complete', 'Session completed (max duration)')
-                break
-
-            # Check if recorder exited naturally
-            if recorder_proc and recorder_proc.poll() is not None:
-                exit_code = recorder_proc.returncode
-                # Capture recorder output for diagnostics
-                rec_output = ''
-                if recorder_proc.stdout:
-                    try:
-                        rec_output = recorder_proc.stdout.read().decode('utf-8', errors='replace')[-2000:]
-                    except Exception:
-                        pass
-                if exit_code == 0:
-                    log_event(db, session_id, 'info', 'recorder_exited', 'Recorder finished normally')
-                else:
-                    msg = f"Recorder exited with code {exit_code}"
-                    if rec_output:
-                        msg += f"\n{rec_output}"
-                    log_event(db, session_id, 'warning', 'recorder_exited', msg)
-                update_session(db, session_id, status='processing')
-                # Wait for worker to finish
-                if worker_proc:
-                    worker_proc.wait()
-                update_session(db, session_id, status='complete',
-                               end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                log_event(db, session_id, 'info', 'session_complete', 'Session completed')
-                break
-
-            # Periodic heartbeat + segment count update (every 30s)
-            if int(elapsed) % 30 == 0 and int(elapsed) > 0:
-                write_heartbeat(session_id)
-                try:
-                    with db.cursor() as cur:
-                        cur.execute(
-                            "SELECT COUNT(*) AS cnt, COALESCE(SUM(duration_seconds), 0) AS dur "
-                            "FROM CG_TranscriptionSegments WHERE session_id = %s",
-                            (session_id,)
-                        )
-                        row = cur.fetchone()
-                        update_session(db, session_id,
-                                       total_segments=row['cnt'],
-                                       total_duration_sec=row['dur'])
-                except Exception:
-                    pass
+        asyncio.run(monitor_session(db, session_id, config, recorder_proc, worker_proc))
 
         # Generate master transcript
         try:
-            generate_master_transcript(session_dir, session)
+            generate_master_transcript(session_dir)
             log_event(db, session_id, 'info', 'master_transcript', 'Master transcript generated')
         except Exception as e:
             log_event(db, session_id, 'warning', 'master_transcript_error', str(e))
 
         # Final segment count update
         try:
-            with db.cursor() as cur:
-                cur.execute(
-                    "SELECT COUNT(*) AS cnt, COALESCE(SUM(duration_seconds), 0) AS dur "
-                    "FROM CG_TranscriptionSegments WHERE session_id = %s",
-                    (session_id,)
-                )
-                row = cur.fetchone()
-                update_session(db, session_id,
-                               total_segments=row['cnt'],
-                               total_duration_sec=row['dur'])
+            update_segment_totals(db, session_id)
         except Exception:
             pass
 
@@ -414,8 +541,13 @@ def main():
                 proc.terminate()
 
     finally:
-        clean_signals(session_id)
-        clean_lock(session_id)
+        if not handed_off:
+            clean_signals(session_id)
+            clean_lock(session_id)
+            try:
+                log_event(db, session_id, 'info', 'db_stats', f"Manager DB: {cg_db.stats.summary()}")
+            except Exception:
+                pass
         try:
             db.close()
         except Exception:
@@ -424,31 +556,9 @@ def main():
     print(f"Manager finished for session {session_id}")
 
 
-def generate_master_transcript(session_dir, session):
-    """Concatenate all segment transcripts into one master file."""
-    tx_dir = os.path.join(session_dir, 'transcripts')
-    if not os.path.exists(tx_dir):
-        return
-
-    safe_name = ''.join(c if c.isalnum() or c in '-_ ' else '' for c in session['auction_name']).strip().replace(' ', '_')
-    date_str = datetime.now().strftime('%Y%m%d')
-    master_file = os.path.join(tx_dir, f"{date_str}_{safe_name}_FULL.txt")
-
-    segments = sorted([f for f in os.listdir(tx_dir) if f.endswith('.txt') and '_FULL' not in f])
-
-    with open(master_file, 'w', encoding='utf-8') as out:
-        out.write(f"# Transcription: {session['auction_name']}\n")
-        out.write(f"# Date: {date_str}\n")
-        out.write(f"# Session ID: {session['session_id']}\n\n")
-
-        for seg_file in segments:
-            filepath = os.path.join(tx_dir, seg_file)
-            if not os.path.exists(filepath):
-                continue
-            out.write(f"\n--- {seg_file} ---\n\n")
-            with open(filepath, 'r', encoding='utf-8') as inp:
-                out.write(inp.read())
-            out.write('\n')
+def generate_master_transcript(session_dir):
+    """Put the master transcript, built as segments were committed, in segment order."""
+    return cg_master.finalize(os.path.join(session_dir, 'transcripts'))
 
 
 if __name__ == '__main__':
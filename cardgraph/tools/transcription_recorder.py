@@ -1,8 +1,21 @@
 """
 Card Graph - Transcription Recorder (Audio Capture)
 
-Captures audio from a live auction stream using ffmpeg with segmented output.
-Monitors for silence and manages segment database entries.
+Captures audio from a live auction stream with one long-running ffmpeg
+process using the segment muxer, so segment boundaries cost no audio and no
+reconnects. The recorder follows ffmpeg's rolling files: a new file opens a
+CG_TranscriptionSegments row, and each entry in ffmpeg's segment list closes
+one. ffmpeg is only restarted if the stream itself drops; every run and every
+outage between runs is written to the CG_TranscriptionCaptureSpans ledger.
+
+The same ffmpeg tees a low-rate mono copy to stdout for SilenceMonitor; if
+nothing crosses silence_threshold_dbfs for silence_timeout_minutes the
+recorder stops with stop_reason='silence'. The same copy is cut into each
+closed segment's waveform peaks file (see cg_peaks).
+
+With segment_mode = 'pause', segments end at a natural break instead of on
+the clock: ffmpeg sends its PCM to the recorder, and PauseSegmenter writes
+the segment files, closing each at the first pause after the target length.
 
 Usage:
     python3 transcription_recorder.py --session-id 123 --session-dir /path --config '{...}'
@@ -12,265 +25,768 @@ import json
 import os
 import shutil
 import signal
+import struct
 import subprocess
 import sys
+import threading
 import time
+from collections import deque
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-import pymysql
-from cg_config import DB_CONFIG
+import numpy as np
+import cg_audio
+import cg_db
+import cg_dbwriter
+import cg_notify
+import cg_peaks
 
 running = True
 
 
 def get_db():
-    return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor, autocommit=True)
+    return cg_db.get_db()
 
 
-def log_event(db, session_id, level, event_type, message):
-    with db.cursor() as cur:
-        cur.execute(
-            "INSERT INTO CG_TranscriptionLogs (session_id, log_level, event_type, message) "
-            "VALUES (%s, %s, %s, %s)",
-            (session_id, level, event_type, message)
-        )
+def log_event(writer, session_id, level, event_type, message):
+    writer.log(session_id, level, event_type, message)
     print(f"[{level.upper()}] {message}")
 
 
-def handle_sigterm(signum, frame):
-    global running
-    running = False
-
+MAX_CONNECT_RETRIES = 10
+CONNECT_CHECK_SEC = 5       # an ffmpeg that dies this fast never connected
+POLL_SEC = 0.5              # how often rollovers and the segment list are checked
+DISK_CHECK_SEC = 60
+OPUS_BITRATE = '20k'        # mono speech; Whisper hears no difference from PCM here
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)  # input rates libopus accepts
+MONITOR_RATE = cg_peaks.PEAK_RATE  # the silence monitor's mono copy of the stream
+MONITOR_READ_SEC = 1.0      # PCM read per wakeup of the monitor thread
+CHUNK_BYTES = int(MONITOR_RATE * MONITOR_READ_SEC) * 2
+PIPE_DRAIN_SEC = 5          # wait this long for ffmpeg's last PCM once it exits
 
-def main():
-    global running
-
-    parser = argparse.ArgumentParser(description='Transcription Recorder')
-    parser.add_argument('--session-id', type=int, required=True)
-    parser.add_argument('--session-dir', type=str, required=True)
-    parser.add_argument('--config', type=str, required=True)
-    args = parser.parse_args()
+# 'pause' segment mode
+PAUSE_BLOCK_SEC = 0.1       # level measured per block; also the cut granularity
+PAUSE_SEC = 0.7             # quiet this long past the target length ends a segment
+PAUSE_MARGIN_DB = 6         # a block this close to the recent noise floor is quiet
+PAUSE_FLOOR_SEC = 60        # noise floor = 10th percentile of this much history
+PAUSE_CAP_FACTOR = 1.5      # with no pause by target x this, cut anyway
 
-    signal.signal(signal.SIGTERM, handle_sigterm)
 
-    config = json.loads(args.config)
-    session_id = args.session_id
-    session_dir = args.session_dir
-    audio_dir = os.path.join(session_dir, 'audio')
+def handle_sigterm(signum, frame):
+    global running
+    running = False
 
-    segment_seconds = int(config['segment_length_minutes']) * 60
-    sample_rate = config['sample_rate']
-    channels = '1' if config['audio_channels'] == 'mono' else '2'
-    audio_format = config['audio_format']
-    silence_timeout = int(config['silence_timeout_minutes']) * 60
-    silence_threshold = int(config['silence_threshold_dbfs'])
-    min_free_gb = int(config['min_free_disk_gb'])
 
-    db = get_db()
+class SegmentTracker:
+    """Mirror ffmpeg's rolling segment files into CG_TranscriptionSegments.
+
+    Also keeps the CG_TranscriptionCaptureSpans ledger: a 'capture' row for
+    each ffmpeg run that produced audio and a 'gap' row for each outage.
+    All writes go through a cg_dbwriter.DBWriter, so a slow database never
+    holds up the poll loop; rows are addressed by segment number rather than
+    by auto-increment id for the same reason.
+    """
+
+    def __init__(self, writer, session_id, audio_dir, list_path, name_prefix, audio_format, peaks=None):
+        self.writer = writer
+        self.peaks = peaks          # SegmentPeaks, told about every closed segment
+        self.session_id = session_id
+        self.audio_dir = audio_dir
+        self.list_path = list_path
+        self.name_prefix = name_prefix
+        self.audio_format = audio_format
+        self.last_number = 0        # highest segment number with a row
+        self.open_segments = {}     # segment_number -> started_epoch
+        self.completed = 0
+        self.capture_epoch = None   # wall time of audio t=0 for the current ffmpeg
+        self.list_offset = 0
+        self.list_end = 0.0         # end of the last listed segment, seconds into the capture
+        self.span_open = False      # a 'capture' ledger row is waiting for its end
+        self.gap_reason = None
+        self.audio_end = None       # wall time the last closed segment's audio ends
+
+    def filename(self, number):
+        return f"{self.name_prefix}_SEG{number:03d}.{self.audio_format}"
+
+    def new_capture(self):
+        """A fresh ffmpeg is starting; drop the previous run's segment list."""
+        try:
+            os.remove(self.list_path)
+        except FileNotFoundError:
+            pass
+        self.capture_epoch = None
+        self.list_offset = 0
+        self.list_end = 0.0
+
+    def poll(self):
+        """Open rows for new files, close rows listed as finished."""
+        if self.capture_epoch is None:
+            # ffmpeg opens its first file once the stream is connected: audio starts now
+            if not os.path.exists(os.path.join(self.audio_dir, self.filename(self.last_number + 1))):
+                return
+            self._start_span(time.time())
+        self._read_list()
+        number = self.last_number + 1
+        while os.path.exists(os.path.join(self.audio_dir, self.filename(number))):
+            self._open(number)
+            number += 1
+
+    def _open(self, number, started_epoch=None):
+        if started_epoch is None:
+            # A segment starts exactly where the last listed one ended (0 for a fresh capture)
+            started_epoch = self.capture_epoch + self.list_end
+        self.writer.execute(
+            "INSERT INTO CG_TranscriptionSegments "
+            "(session_id, segment_number, filename_audio, recording_status, started_at) "
+            "VALUES (%s, %s, %s, 'recording', FROM_UNIXTIME(%s))",
+            (self.session_id, number, self.filename(number), int(started_epoch)),
+            after=lambda: cg_notify.notify(self.session_id, 'segment_started', segment_number=number)
+        )
+        self.open_segments[number] = started_epoch
+        self.last_number = number
+        log_event(self.writer, self.session_id, 'info', 'segment_started',
+                  f"Recording segment {number}: {self.filename(number)}")
+
+    def _start_span(self, epoch):
+        """Open a 'capture' ledger row, recording the outage before it if any."""
+        self.capture_epoch = epoch
+        if self.audio_end is not None and epoch > self.audio_end:
+            self.writer.execute(
+                "INSERT INTO CG_TranscriptionCaptureSpans "
+                "(session_id, span_type, started_at, ended_at, duration_seconds, "
+                "first_segment, last_segment, reason) "
+                "VALUES (%s, 'gap', FROM_UNIXTIME(%s), FROM_UNIXTIME(%s), %s, %s, %s, %s)",
+                (self.session_id, round(self.audio_end, 3), round(epoch, 3),
+                 round(epoch - self.audio_end, 3), self.last_number, self.last_number + 1,
+                 self.gap_reason)
+            )
+        self.writer.execute(
+            "INSERT INTO CG_TranscriptionCaptureSpans "
+            "(session_id, span_type, started_at, first_segment) "
+            "VALUES (%s, 'capture', FROM_UNIXTIME(%s), %s)",
+            (self.session_id, round(epoch, 3), self.last_number + 1)
+        )
+        self.span_open = True
 
-    try:
-        # Load session to get auction URL
-        with db.cursor() as cur:
-            cur.execute("SELECT auction_url FROM CG_TranscriptionSessions WHERE session_id = %s", (session_id,))
-            session = cur.fetchone()
+    def end_capture(self, reason=None):
+        """ffmpeg is gone: close its segments and its 'capture' ledger row.
 
-        if not session:
-            log_event(db, session_id, 'error', 'recorder_error', 'Session not found')
+        reason is kept for the 'gap' row written if capture resumes.
+        """
+        self.close_all(reason)
+        self.gap_reason = reason
+        if not self.span_open:
             return
+        if self.audio_end is None or self.audio_end < self.capture_epoch:
+            self.audio_end = self.capture_epoch  # connected but no usable audio written
+        self.writer.execute(
+            "UPDATE CG_TranscriptionCaptureSpans SET ended_at = FROM_UNIXTIME(%s), "
+            "duration_seconds = %s, last_segment = %s "
+            "WHERE session_id = %s AND span_type = 'capture' AND ended_at IS NULL",
+            (round(self.audio_end, 3), round(self.audio_end - self.capture_epoch, 3),
+             self.last_number, self.session_id)
+        )
+        self.span_open = False
 
-        stream_url = session['auction_url']
-        log_event(db, session_id, 'info', 'recorder_started', f"Recording from: {stream_url}")
+    def _read_list(self):
+        """Consume new 'filename,start,end' lines from ffmpeg's CSV segment list."""
+        try:
+            with open(self.list_path, 'r', encoding='utf-8') as f:
+                f.seek(self.list_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+        complete = chunk[:chunk.rfind('\n') + 1]  # ignore a half-written last line
+        self.list_offset += len(complete.encode('utf-8'))
+        for line in complete.splitlines():
+            parts = line.strip().rsplit(',', 2)
+            if len(parts) != 3:
+                continue
+            filename, start, end = parts[0], float(parts[1]), float(parts[2])
+            number = self._number_of(filename)
+            if number is None:
+                continue
+            if number not in self.open_segments and number > self.last_number:
+                # Segment opened and closed between polls
+                self._open(number, self.capture_epoch + start)
+            if number in self.open_segments:
+                self._close(number, end - start, self.capture_epoch + end)
+            self.list_end = end
+
+    def _number_of(self, filename):
+        base = os.path.basename(filename)
+        marker = base.rfind('_SEG')
+        try:
+            return int(base[marker + 4:].split('.')[0])
+        except ValueError:
+            return None
+
+    def _close(self, number, duration, ended_epoch):
+        self.open_segments.pop(number)
+        seg_path = os.path.join(self.audio_dir, self.filename(number))
+        seg_size = os.path.getsize(seg_path) if os.path.exists(seg_path) else 0
+        self.writer.execute(
+            "UPDATE CG_TranscriptionSegments SET "
+            "recording_status = 'complete', duration_seconds = %s, "
+            "file_size_bytes = %s, completed_at = NOW() "
+            "WHERE session_id = %s AND segment_number = %s",
+            (int(round(duration)), seg_size, self.session_id, number)
+        )
+        # Wake the worker once the row it will read is committed, not on its next DB poll
+        self.writer.execute(
+            "UPDATE CG_TranscriptionSessions SET total_segments = %s WHERE session_id = %s",
+            (number, self.session_id),
+            after=lambda: cg_notify.notify(self.session_id, 'segment_complete', segment_number=number)
+        )
+        self.completed += 1
+        self.audio_end = ended_epoch
+        if self.peaks:
+            end_sec = ended_epoch - self.capture_epoch
+            self.peaks.segment_closed(self.filename(number), end_sec - duration, end_sec)
+        log_event(self.writer, self.session_id, 'info', 'segment_complete',
+                  f"Segment {number} complete: {duration:.0f}s, {seg_size} bytes")
+
+    def close_all(self, reason=None):
+        """ffmpeg is gone: finalize whatever it did not list (e.g. killed mid-segment)."""
+        if self.capture_epoch is None:
+            return
+        self.poll()
+        for number in sorted(self.open_segments):
+            started_epoch = self.open_segments[number]
+            seg_path = os.path.join(self.audio_dir, self.filename(number))
+            if not os.path.exists(seg_path) or os.path.getsize(seg_path) == 0:
+                self.open_segments.pop(number)
+                self.writer.execute(
+                    "UPDATE CG_TranscriptionSegments SET recording_status = 'error', "
+                    "error_message = %s WHERE session_id = %s AND segment_number = %s",
+                    (reason or 'No audio written', self.session_id, number)
+                )
+                continue
+            now = time.time()
+            self._close(number, max(0.0, now - started_epoch), now)
+
+
+class SilenceMonitor:
+    """Track how long the stream has been below the silence threshold.
+
+    ffmpeg tees a MONITOR_RATE mono copy of the stream to stdout, which the
+    recorder hands over (in 'pause' mode PauseSegmenter passes a downsampled
+    copy of the PCM it writes instead); it is measured in cg_audio blocks.
+    The clock only resets on sound, so a stream that keeps dropping and
+    reconnecting to dead air still times out.
+    """
+
+    def __init__(self, threshold_dbfs, peaks=None):
+        self.threshold_dbfs = threshold_dbfs
+        self.peaks = peaks
+        self.last_sound = time.time()
+        self._odd = b''     # a sample split across two reads
+
+    def feed(self, data):
+        """Measure a piece of the s16le monitor stream (any length)."""
+        data = self._odd + data
+        cut = len(data) - len(data) % 2
+        self._odd = data[cut:]
+        self.feed_samples(np.frombuffer(data[:cut], np.int16).astype(np.float32) / 32768.0)
+
+    def feed_samples(self, samples):
+        """Measure MONITOR_RATE mono float samples."""
+        levels = cg_audio.block_dbfs(samples, MONITOR_RATE)
+        if levels.size and levels.max() >= self.threshold_dbfs:
+            self.last_sound = time.time()
+        if self.peaks:
+            self.peaks.add(samples)
+
+    def silent_for(self):
+        return time.time() - self.last_sound
+
+
+class SegmentPeaks:
+    """Write each closed segment's peaks file from the silence monitor's PCM.
+
+    The monitor copy and the segment files come from the same ffmpeg input,
+    so a segment's start and end in the segment list (seconds into the
+    capture) are exact positions in the monitor stream too. The monitor pipe
+    can trail the list by a few seconds, so a closed segment waits until its
+    audio has arrived; what is still waiting when a capture ends is written
+    with the audio there is.
+    """
+
+    def __init__(self, session_dir):
+        self.session_dir = session_dir
+        self.lock = threading.Lock()    # fed from the monitor reader, closed from the poll loop
+        self.stream = cg_peaks.PeakAccumulator()
+        self.pending = deque()          # (filename, start_sec, end_sec)
+
+    def new_capture(self):
+        self.finish()
+        with self.lock:
+            self.stream = cg_peaks.PeakAccumulator()
+
+    def add(self, samples):
+        with self.lock:
+            self.stream.add(samples)
+            self._write_ready()
+
+    def segment_closed(self, filename, start_sec, end_sec):
+        with self.lock:
+            self.pending.append((filename, start_sec, end_sec))
+            self._write_ready()
+
+    def finish(self):
+        with self.lock:
+            self._write_ready(force=True)
+
+    def _write_ready(self, force=False):
+        while self.pending and (force or self.stream.available_sec() >= self.pending[0][2]):
+            filename, start_sec, end_sec = self.pending.popleft()
+            try:
+                cg_peaks.write(cg_peaks.peaks_path(self.session_dir, filename),
+                               *self.stream.cut(start_sec, end_sec))
+            except OSError:
+                pass  # a missing waveform never costs audio
+
+
+def encoder_args(audio_format, sample_rate):
+    """(codec args, container, sample rate) for writing audio_format files."""
+    if audio_format == 'flac':
+        return ['-codec:a', 'flac'], 'flac', sample_rate
+    if audio_format == 'opus':
+        # Speech-tuned Opus in Ogg pages: ~9 MB/hour against ~115 MB/hour for 16 kHz WAV
+        if int(sample_rate) not in OPUS_RATES:
+            sample_rate = 48000
+        return ['-codec:a', 'libopus', '-b:a', OPUS_BITRATE, '-application', 'voip'], 'ogg', sample_rate
+    return ['-codec:a', 'pcm_s16le'], 'wav', sample_rate
+
+
+def build_ffmpeg_cmd(stream_url, sample_rate, channels, audio_format, segment_seconds,
+                     start_number, list_path, output_pattern):
+    codec_args, segment_format, sample_rate = encoder_args(audio_format, sample_rate)
+    cmd = [
+        'ffmpeg', '-nostdin', '-y', '-nostats', '-loglevel', 'warning',
+        '-i', stream_url,
+        '-vn',  # No video
+        '-ar', str(sample_rate),
+        '-ac', channels,
+    ] + codec_args
+    cmd.extend([
+        '-f', 'segment',
+        '-segment_time', str(segment_seconds),
+        '-segment_format', segment_format,
+        '-segment_start_number', str(start_number),
+        '-segment_list', list_path,
+        '-segment_list_type', 'csv',
+        '-reset_timestamps', '1',
+        output_pattern,
+        # Second output: low-rate mono PCM on stdout for the silence monitor
+        '-vn', '-ac', '1', '-ar', str(MONITOR_RATE), '-f', 's16le', 'pipe:1',
+    ])
+    return cmd
+
+
+def build_pcm_cmd(stream_url, sample_rate, channels):
+    """'pause' mode: the stream as raw PCM on stdout, for PauseSegmenter to cut."""
+    return [
+        'ffmpeg', '-nostdin', '-nostats', '-loglevel', 'warning',
+        '-i', stream_url,
+        '-vn', '-ar', str(sample_rate), '-ac', channels, '-f', 's16le', 'pipe:1',
+    ]
+
+
+class PauseSegmenter:
+    """Write segment files from ffmpeg's PCM, ending each at a natural pause.
+
+    A segment runs to its target length, then ends at the first PAUSE_SEC of
+    quiet, or at target x PAUSE_CAP_FACTOR if no pause comes. Quiet means
+    within PAUSE_MARGIN_DB of the recent noise floor (and that far under the
+    median level; never below silence_threshold_dbfs), so a room with steady
+    background noise still has pauses. Files and segment-list lines look exactly like the segment
+    muxer's, so SegmentTracker follows either the same way. WAV is written
+    directly; FLAC/Opus go through one encoder ffmpeg per segment.
+    """
+
+    def __init__(self, output_pattern, list_path, start_number, audio_format, sample_rate, channels,
+                 target_sec, threshold_dbfs, monitor, ffmpeg_log):
+        self.output_pattern = output_pattern
+        self.list_path = list_path
+        self.number = start_number
+        self.audio_format = audio_format
+        self.rate = int(sample_rate)
+        self.channels = int(channels)
+        self.threshold_dbfs = threshold_dbfs
+        self.monitor = monitor
+        self.ffmpeg_log = ffmpeg_log
+
+        self.frame_bytes = 2 * self.channels
+        self.block_frames = int(self.rate * PAUSE_BLOCK_SEC)
+        self.monitor_frames = int(MONITOR_RATE * PAUSE_BLOCK_SEC)
+        self.target_frames = int(target_sec * self.rate)
+        self.max_frames = int(target_sec * PAUSE_CAP_FACTOR * self.rate)
+        self.pause_blocks = int(round(PAUSE_SEC / PAUSE_BLOCK_SEC))
+        self.levels = deque(maxlen=int(PAUSE_FLOOR_SEC / PAUSE_BLOCK_SEC))
+
+        self.pending = b''
+        self.out = None             # open WAV file, or encoder Popen
+        self.path = None
+        self.frames_done = 0        # capture position where the open segment started
+        self.seg_frames = 0
+        self.quiet_blocks = 0
+        self.closers = []           # encoder waits still running
+        self.list_lock = threading.Lock()
+
+    def feed(self, data):
+        self.pending += data
+        block_bytes = self.block_frames * self.frame_bytes
+        while len(self.pending) >= block_bytes:
+            block, self.pending = self.pending[:block_bytes], self.pending[block_bytes:]
+            self._block(block)
+
+    def finish(self):
+        """ffmpeg is gone: close the open segment and wait for its encoder."""
+        tail = self.pending[:len(self.pending) - len(self.pending) % self.frame_bytes]
+        self.pending = b''
+        if tail and self.out is not None:
+            self._write(tail)
+            self.seg_frames += len(tail) // self.frame_bytes
+        if self.out is not None:
+            self._close()
+        for thread in self.closers:
+            thread.join()
+        self.closers = []
+
+    def _block(self, block):
+        if self.out is None:
+            self._open()
+        self._write(block)
+        self.seg_frames += self.block_frames
+
+        samples = np.frombuffer(block, np.int16).astype(np.float32) / 32768.0
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        level = float(cg_audio.block_dbfs(samples, self.rate, PAUSE_BLOCK_SEC)[0])
+        if self.rate != MONITOR_RATE:
+            samples = np.interp(np.linspace(0, len(samples) - 1, self.monitor_frames),
+                                np.arange(len(samples)), samples).astype(np.float32)
+        self.monitor.feed_samples(samples)
+
+        self.levels.append(level)
+        floor, median = np.percentile(self.levels, (10, 50))
+        pause_dbfs = max(self.threshold_dbfs, min(floor + PAUSE_MARGIN_DB, median - PAUSE_MARGIN_DB))
+        self.quiet_blocks = self.quiet_blocks + 1 if level < pause_dbfs else 0
+        if self.seg_frames >= self.max_frames or (
+                self.seg_frames >= self.target_frames and self.quiet_blocks >= self.pause_blocks):
+            self._close()
+
+    def _open(self):
+        self.path = self.output_pattern % self.number
+        if self.audio_format == 'wav':
+            self.out = open(self.path, 'wb')
+            self.out.write(cg_audio.wav_header(0, self.rate, self.channels))
+            return
+        codec_args, container, out_rate = encoder_args(self.audio_format, self.rate)
+        cmd = ['ffmpeg', '-y', '-nostats', '-loglevel', 'warning',
+               '-f', 's16le', '-ar', str(self.rate), '-ac', str(self.channels), '-i', 'pipe:0',
+               '-ar', str(out_rate)] + codec_args + ['-f', container, self.path]
+        with open(self.ffmpeg_log, 'ab') as log:
+            self.out = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=log)
+
+    def _write(self, data):
+        try:
+            if self.audio_format == 'wav':
+                self.out.write(data)
+            else:
+                self.out.stdin.write(data)
+        except (BrokenPipeError, ValueError):
+            pass  # encoder died; SegmentTracker records whatever it wrote
+
+    def _close(self):
+        start = self.frames_done / self.rate
+        end = (self.frames_done + self.seg_frames) / self.rate
+        line = f"{os.path.basename(self.path)},{start:.6f},{end:.6f}\n"
+        out, self.out = self.out, None
+        if self.audio_format == 'wav':
+            data_bytes = self.seg_frames * self.frame_bytes
+            out.seek(4)
+            out.write(struct.pack('<I', 36 + data_bytes))
+            out.seek(40)
+            out.write(struct.pack('<I', data_bytes))
+            out.close()
+            self._list(line)
+        else:
+            try:
+                out.stdin.close()
+            except BrokenPipeError:
+                pass
+            # The encoder flushes in the background; the list line waits for its file
+            thread = threading.Thread(target=self._finish_encoder, args=(out, line), daemon=True)
+            thread.start()
+            self.closers = [t for t in self.closers if t.is_alive()] + [thread]
+        self.frames_done += self.seg_frames
+        self.seg_frames = 0
+        self.quiet_blocks = 0
+        self.number += 1
+
+    def _finish_encoder(self, proc, line):
+        try:
+            proc.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        self._list(line)
 
-        # Build safe name prefix
-        safe_name = ''.join(c if c.isalnum() or c in '-_' else '' for c in str(session_id)).strip()
-        date_str = datetime.now().strftime('%Y%m%d')
+    def _list(self, line):
+        with self.list_lock:
+            with open(self.list_path, 'a', encoding='utf-8') as f:
+                f.write(line)
 
-        segment_number = 0
-        ffmpeg_proc = None
-        consecutive_failures = 0
-        MAX_CONNECT_RETRIES = 10
-        CONNECT_CHECK_SEC = 5  # Wait this long to see if ffmpeg stays alive
 
-        while running:
-            # Check disk space
+def tail_file(path, max_bytes=400):
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, 2)
+            f.seek(max(0, f.tell() - max_bytes))
+            return f.read().decode('utf-8', 'replace').strip()
+    except OSError:
+        return ''
+
+
+class Recorder:
+    """One session's capture: the ffmpeg segment muxer and its bookkeeping.
+
+    step() does one non-blocking round — (re)start ffmpeg, follow its files,
+    check disk space and silence, handle a dropped stream — and returns the
+    seconds to wait before the next round, or None once recording is over
+    (self.stop_reason says why). main() drives one Recorder in a plain loop;
+    transcription_supervisor drives many from asyncio, each step() on a
+    worker thread. on_launch(proc, feed, close) replaces the thread that
+    reads each ffmpeg's stdout.
+    """
+
+    def __init__(self, writer, session_id, session_dir, config, stream_url, on_launch=None):
+        self.writer = writer
+        self.session_id = session_id
+        self.config = config
+        self.stream_url = stream_url
+        self.audio_dir = os.path.join(session_dir, 'audio')
+
+        self.segment_seconds = int(config['segment_length_minutes']) * 60
+        self.sample_rate = config['sample_rate']
+        self.channels = '1' if config['audio_channels'] == 'mono' else '2'
+        self.audio_format = config['audio_format']
+        self.silence_timeout = int(config['silence_timeout_minutes']) * 60
+        self.silence_threshold = int(config['silence_threshold_dbfs'])
+        self.min_free_gb = int(config['min_free_disk_gb'])
+
+        name_prefix = f"{datetime.now().strftime('%Y%m%d')}_Session{session_id}"
+        self.list_path = os.path.join(session_dir, 'segment_list.csv')
+        self.ffmpeg_log = os.path.join(session_dir, 'ffmpeg.log')
+        self.output_pattern = os.path.join(self.audio_dir, f"{name_prefix}_SEG%03d.{self.audio_format}")
+        self.peaks = SegmentPeaks(session_dir)
+        self.tracker = SegmentTracker(writer, session_id, self.audio_dir, self.list_path,
+                                      name_prefix, self.audio_format, self.peaks)
+        self.monitor = SilenceMonitor(self.silence_threshold, self.peaks)
+        self.on_launch = on_launch or self.attach
+
+        self.segment_mode = config.get('segment_mode') or 'fixed'
+        self.segmenter = None
+        if self.segment_mode == 'pause':
+            self.read_bytes = int(int(self.sample_rate) * PAUSE_BLOCK_SEC) * 2 * int(self.channels)
+        else:
+            self.read_bytes = CHUNK_BYTES
+        self.pipe_done = threading.Event()
+        self.pipe_done.set()
+        self.exited_at = None
+
+        self.proc = None
+        self.stop_reason = None
+        self.consecutive_failures = 0
+        self.launched_at = 0.0
+        self.launch_number = 0
+        self.next_disk_check = 0.0
+
+    def log(self, level, event_type, message):
+        log_event(self.writer, self.session_id, level, event_type, message)
+
+    def step(self):
+        now = time.time()
+
+        # Check disk space
+        if now >= self.next_disk_check:
+            self.next_disk_check = now + DISK_CHECK_SEC
             try:
-                usage = shutil.disk_usage(audio_dir)
-                free_gb = usage.free / (1024 ** 3)
-                if free_gb < min_free_gb:
-                    log_event(db, session_id, 'warning', 'low_disk',
-                              f"Low disk space: {free_gb:.1f} GB free (min {min_free_gb} GB)")
-                    break
+                free_gb = shutil.disk_usage(self.audio_dir).free / (1024 ** 3)
+                if free_gb < self.min_free_gb:
+                    self.log('warning', 'low_disk',
+                             f"Low disk space: {free_gb:.1f} GB free (min {self.min_free_gb} GB)")
+                    self.stop_reason = 'low_disk'
+                    return None
             except Exception:
                 pass
 
-            # Build filename for this potential segment
-            next_seg = segment_number + 1
-            seg_filename = f"{date_str}_Session{session_id}_SEG{next_seg:03d}.{audio_format}"
-            seg_path = os.path.join(audio_dir, seg_filename)
-
-            # Build ffmpeg command for single segment
-            ffmpeg_cmd = [
-                'ffmpeg', '-y',
-                '-i', stream_url,
-                '-t', str(segment_seconds),
-                '-ar', str(sample_rate),
-                '-ac', channels,
-                '-vn',  # No video
-            ]
-
-            if audio_format == 'flac':
-                ffmpeg_cmd.extend(['-codec:a', 'flac'])
+        # (Re)start the one ffmpeg that writes every segment
+        if self.proc is None:
+            self.tracker.new_capture()
+            self.peaks.new_capture()
+            if self.segment_mode == 'pause':
+                self.segmenter = PauseSegmenter(self.output_pattern, self.list_path, self.tracker.last_number + 1,
+                                                self.audio_format, self.sample_rate, self.channels,
+                                                self.segment_seconds, self.silence_threshold,
+                                                self.monitor, self.ffmpeg_log)
+                cmd = build_pcm_cmd(self.stream_url, self.sample_rate, self.channels)
             else:
-                ffmpeg_cmd.extend(['-codec:a', 'pcm_s16le'])
-
-            ffmpeg_cmd.append(seg_path)
-
-            # Launch ffmpeg
-            seg_start = time.time()
+                cmd = build_ffmpeg_cmd(self.stream_url, self.sample_rate, self.channels, self.audio_format,
+                                       self.segment_seconds, self.tracker.last_number + 1,
+                                       self.list_path, self.output_pattern)
             try:
-                ffmpeg_proc = subprocess.Popen(
-                    ffmpeg_cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
-                )
+                with open(self.ffmpeg_log, 'ab') as log:
+                    self.proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                                 stdout=subprocess.PIPE, stderr=log)
             except Exception as e:
-                log_event(db, session_id, 'error', 'ffmpeg_launch_error', f"Failed to launch ffmpeg: {e}")
-                consecutive_failures += 1
-                if consecutive_failures >= MAX_CONNECT_RETRIES:
-                    log_event(db, session_id, 'error', 'connect_failed',
-                              f"Failed to connect after {MAX_CONNECT_RETRIES} attempts")
+                self.log('error', 'ffmpeg_launch_error', f"Failed to launch ffmpeg: {e}")
+                self.stop_reason = 'ffmpeg_launch_error'
+                return None
+            self.launched_at = time.time()
+            self.launch_number = self.tracker.last_number
+            self.on_launch(self.proc, *self._pipe_sink())
+
+        self.tracker.poll()
+
+        # Dead air: stop instead of recording silence until max_session_hours
+        if self.silence_timeout > 0 and self.monitor.silent_for() >= self.silence_timeout:
+            self.log('warning', 'silence_timeout',
+                     f"No audio above {self.silence_threshold} dBFS for "
+                     f"{self.config['silence_timeout_minutes']} min — stopping recorder")
+            self.writer.execute(
+                "UPDATE CG_TranscriptionSessions SET stop_reason = 'silence' WHERE session_id = %s",
+                (self.session_id,)
+            )
+            self.stop_reason = 'silence'
+            return None
+
+        if self.proc.poll() is not None:
+            if not self.pipe_done.is_set():
+                # Let the reader hand over ffmpeg's last PCM before the rows are closed
+                self.exited_at = self.exited_at or time.time()
+                if time.time() - self.exited_at < PIPE_DRAIN_SEC:
+                    return POLL_SEC
+            self.exited_at = None
+            # Stream dropped (or never connected): close what ffmpeg wrote, then reconnect
+            returncode = self.proc.returncode
+            self.proc = None
+            self.tracker.end_capture(f'ffmpeg_exit:{returncode}')
+            if time.time() - self.launched_at < CONNECT_CHECK_SEC or self.tracker.last_number == self.launch_number:
+                self.consecutive_failures += 1
+            else:
+                self.consecutive_failures = 0
+            if self.consecutive_failures >= MAX_CONNECT_RETRIES:
+                self.log('error', 'connect_failed',
+                         f"Stream failed {MAX_CONNECT_RETRIES} times in a row — giving up "
+                         f"({tail_file(self.ffmpeg_log)[-200:]})")
+                self.stop_reason = 'connect_failed'
+                return None
+            backoff = min(60, 10 * max(1, self.consecutive_failures))
+            self.log('warning', 'stream_interrupted',
+                     f"ffmpeg exited (code {returncode}), reconnecting in {backoff}s "
+                     f"(attempt {self.consecutive_failures}/{MAX_CONNECT_RETRIES})")
+            return backoff
+
+        return POLL_SEC
+
+    def stop(self):
+        """Finish the current file, close every row and the ledger span."""
+        if self.proc and self.proc.poll() is None:
+            # SIGTERM lets ffmpeg finish the current file and write its list entry
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.pipe_done.wait(PIPE_DRAIN_SEC)  # the last PCM: closing segments, peaks
+        self.tracker.end_capture()
+        self.peaks.finish()
+        self.log('info', 'recorder_stopped',
+                 f"Recorder finished after {self.tracker.last_number} segments")
+
+    def kill(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.kill()
+
+    def _pipe_sink(self):
+        """(feed, close) for the ffmpeg just launched, bound to it rather than to a later launch."""
+        segmenter = self.segmenter if self.segment_mode == 'pause' else None
+        done = self.pipe_done = threading.Event()
+
+        def close():
+            if segmenter:
+                segmenter.finish()
+            done.set()
+
+        return (segmenter or self.monitor).feed, close
+
+    def attach(self, proc, feed, close):
+        """Drain a new ffmpeg's stdout on a thread (ffmpeg blocks if nobody reads)."""
+        def read():
+            while True:
+                data = proc.stdout.read(self.read_bytes)
+                if not data:
                     break
-                backoff = min(30, 5 * consecutive_failures)
-                time.sleep(backoff)
-                continue
+                feed(data)
+            proc.stdout.close()
+            close()
 
-            # Wait briefly to see if ffmpeg stays alive (connection check)
-            time.sleep(CONNECT_CHECK_SEC)
-            if ffmpeg_proc.poll() is not None:
-                # ffmpeg exited within seconds — connection failure, NOT a real segment
-                consecutive_failures += 1
-                # Clean up empty/partial file
-                if os.path.exists(seg_path):
-                    try:
-                        os.remove(seg_path)
-                    except Exception:
-                        pass
-
-                if consecutive_failures >= MAX_CONNECT_RETRIES:
-                    log_event(db, session_id, 'error', 'connect_failed',
-                              f"Stream connection failed {MAX_CONNECT_RETRIES} times — giving up")
-                    break
+        threading.Thread(target=read, daemon=True).start()
 
-                backoff = min(60, 10 * consecutive_failures)
-                log_event(db, session_id, 'warning', 'connect_retry',
-                          f"Stream connect failed (attempt {consecutive_failures}/{MAX_CONNECT_RETRIES}), "
-                          f"retrying in {backoff}s")
 
-                # Wait with backoff, checking for stop signals
-                waited = 0
-                while waited < backoff and running:
-                    time.sleep(1)
-                    waited += 1
-                continue
+def main():
+    parser = argparse.ArgumentParser(description='Transcription Recorder')
+    parser.add_argument('--session-id', type=int, required=True)
+    parser.add_argument('--session-dir', type=str, required=True)
+    parser.add_argument('--config', type=str, required=True)
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
 
-            # ffmpeg is still running after CONNECT_CHECK_SEC — stream is connected
-            # NOW create the segment record
-            consecutive_failures = 0
-            segment_number = next_seg
+    config = json.loads(args.config)
+    session_id = args.session_id
 
-            with db.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO CG_TranscriptionSegments "
-                    "(session_id, segment_number, filename_audio, recording_status, started_at) "
-                    "VALUES (%s, %s, %s, 'recording', NOW())",
-                    (session_id, segment_number, seg_filename)
-                )
-                segment_id = cur.lastrowid
+    # Every write after startup is queued; the poll loop never waits on the DB
+    writer = cg_dbwriter.DBWriter(get_db)
+    recorder = None
 
-            log_event(db, session_id, 'info', 'segment_started',
-                      f"Recording segment {segment_number}: {seg_filename}")
+    try:
+        # Load session to get auction URL
+        db = get_db()
+        try:
+            with db.cursor() as cur:
+                cur.execute("SELECT auction_url FROM CG_TranscriptionSessions WHERE session_id = %s", (session_id,))
+                session = cur.fetchone()
+        finally:
+            db.close()
 
-            # Wait for ffmpeg to finish this segment (up to segment_seconds)
-            try:
-                while ffmpeg_proc.poll() is None:
-                    if not running:
-                        ffmpeg_proc.terminate()
-                        ffmpeg_proc.wait(timeout=5)
-                        break
-                    time.sleep(0.5)
-
-                seg_duration = int(time.time() - seg_start)
-                seg_size = os.path.getsize(seg_path) if os.path.exists(seg_path) else 0
-
-                # Update segment record as complete
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSegments SET "
-                        "recording_status = 'complete', duration_seconds = %s, "
-                        "file_size_bytes = %s, completed_at = NOW() "
-                        "WHERE segment_id = %s",
-                        (seg_duration, seg_size, segment_id)
-                    )
-
-                log_event(db, session_id, 'info', 'segment_complete',
-                          f"Segment {segment_number} complete: {seg_duration}s, {seg_size} bytes")
-
-                # Update session segment count
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSessions SET total_segments = %s WHERE session_id = %s",
-                        (segment_number, session_id)
-                    )
-
-                # If segment was way shorter than expected, stream may have dropped
-                if seg_duration < segment_seconds * 0.5 and ffmpeg_proc.returncode != 0:
-                    consecutive_failures += 1
-                    if consecutive_failures >= MAX_CONNECT_RETRIES:
-                        log_event(db, session_id, 'warning', 'stream_dropped',
-                                  'Stream dropped too many times — stopping')
-                        break
-                    backoff = min(30, 5 * consecutive_failures)
-                    log_event(db, session_id, 'warning', 'stream_interrupted',
-                              f"Segment ended early ({seg_duration}s vs {segment_seconds}s expected), "
-                              f"retrying in {backoff}s")
-                    time.sleep(backoff)
+        if not session:
+            log_event(writer, session_id, 'error', 'recorder_error', 'Session not found')
+            return
 
-            except subprocess.TimeoutExpired:
-                if ffmpeg_proc:
-                    ffmpeg_proc.kill()
-                log_event(db, session_id, 'warning', 'ffmpeg_timeout',
-                          f"Segment {segment_number} ffmpeg timeout")
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSegments SET recording_status = 'error', "
-                        "error_message = 'Timeout' WHERE segment_id = %s",
-                        (segment_id,)
-                    )
+        stream_url = session['auction_url']
+        log_event(writer, session_id, 'info', 'recorder_started', f"Recording from: {stream_url}")
 
-            except Exception as e:
-                log_event(db, session_id, 'error', 'segment_error',
-                          f"Segment {segment_number} error: {str(e)}")
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSegments SET recording_status = 'error', "
-                        "error_message = %s WHERE segment_id = %s",
-                        (str(e)[:500], segment_id)
-                    )
-
-            if not running:
+        recorder = Recorder(writer, session_id, args.session_dir, config, stream_url)
+        while running:
+            delay = recorder.step()
+            if delay is None:
                 break
-
-        log_event(db, session_id, 'info', 'recorder_stopped',
-                  f"Recorder finished after {segment_number} segments")
+            # Wait, checking for stop signals
+            deadline = time.time() + delay
+            while running and time.time() < deadline:
+                time.sleep(min(1.0, delay))
+        recorder.stop()
 
     except Exception as e:
-        log_event(db, session_id, 'error', 'recorder_fatal', str(e))
+        log_event(writer, session_id, 'error', 'recorder_fatal', str(e))
     finally:
-        try:
-            db.close()
-        except Exception:
-            pass
+        if recorder:
+            recorder.kill()
+        writer.close()  # flush queued rows before the worker is told recording is over
+        cg_notify.notify(session_id, 'recorder_stopped')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,655 @@
+"""
+Card Graph - Transcription Supervisor (multi-session)
+
+Runs every active recording session in one asyncio process, in place of a
+transcription_manager.py + recorder + worker process trio per session. Each
+session is a coroutine that owns its capture child (the recorder's ffmpeg
+segment muxer, or the Docker browser recorder); all sessions share
+
+    one blocking DB connection for reads (SharedDB) and one
+    cg_dbwriter.DBWriter for writes, whatever the number of sessions
+    one inference queue in front of the resident Whisper daemon, so
+    overlapping auctions take turns on the transcription cores instead of
+    each worker assuming it has them all
+
+Used when CG_TranscriptionSettings.session_runner = 'supervisor': the
+manager launched for a session starts this script with --session-id and
+exits. If a supervisor is already running, the new process only leaves a
+supervise_session_<id>.request file in TOOLS_DIR for it and exits. Each
+session's lock file heartbeat is kept as before, with the supervisor's PID. The process exits
+IDLE_EXIT_SEC after its last session ends. If the Whisper daemon cannot
+start, a session falls back to its own transcription_worker.py process.
+
+Usage:
+    python3 transcription_supervisor.py
+    python3 transcription_supervisor.py --session-id 12 --session-id 14
+"""
+import argparse
+import asyncio
+import glob
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cg_dbwriter
+import cg_inference
+import cg_notify
+import cg_output
+import cg_watch
+import transcription_manager as manager
+import transcription_recorder
+import transcription_worker
+import whisper_daemon
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCK_PATH = os.path.join(TOOLS_DIR, 'transcription_supervisor.lock')
+REQUEST_GLOB = os.path.join(TOOLS_DIR, 'supervise_session_*.request')
+
+SCAN_SEC = 2            # request file check when inotify is unavailable
+HEARTBEAT_SEC = 30      # lock file heartbeat + segment count refresh
+IDLE_EXIT_SEC = 300     # exit after this long with no sessions
+TX_FALLBACK_SEC = 30    # re-check pending segments without a notification
+
+get_db = manager.get_db
+
+# Files in TOOLS_DIR that concern one session: its stop/cancel signals and lock
+_SESSION_FILE = re.compile(r'^transcription_(?:stop|cancel|session)_(\d+)\.(?:signal|lock)$')
+
+
+# ─── Launching ───────────────────────────────────────────────────
+
+def is_running():
+    """True if a supervisor process holds the lock."""
+    try:
+        with open(LOCK_PATH) as f:
+            pid = int(f.readline().strip() or 0)
+    except (OSError, ValueError):
+        return False
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # alive, owned by another user
+    return True
+
+
+def queue_request(session_id):
+    """Leave a session for the running supervisor to pick up."""
+    path = os.path.join(TOOLS_DIR, f"supervise_session_{session_id}.request")
+    with open(path, 'w') as f:
+        f.write(f"{int(time.time())}\n")
+
+
+def take_requests():
+    """Claim every pending request file; returns session ids."""
+    ids = []
+    for path in glob.glob(REQUEST_GLOB):
+        name = os.path.basename(path)
+        try:
+            os.remove(path)
+            ids.append(int(name[len('supervise_session_'):-len('.request')]))
+        except (OSError, ValueError):
+            continue
+    return ids
+
+
+# ─── Shared resources ────────────────────────────────────────────
+
+class SharedDB:
+    """One blocking connection for every session's reads and claims.
+
+    Calls are serialized and run on the default executor, so a slow query
+    never stalls the event loop. fn receives the connection as its first
+    argument, like the manager and worker helpers it is used with.
+    """
+
+    def __init__(self):
+        self._db = None
+        self._lock = asyncio.Lock()
+
+    async def run(self, fn, *args, **kwargs):
+        async with self._lock:
+            return await asyncio.to_thread(self._call, fn, *args, **kwargs)
+
+    def _call(self, fn, *args, **kwargs):
+        if self._db is None:
+            self._db = get_db()  # reconnects by itself (cg_db)
+        return fn(self._db, *args, **kwargs)
+
+    def close(self):
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+
+
+class InferenceQueue:
+    """Whisper jobs from every session, at most `slots` on the daemon at once.
+
+    asyncio.Semaphore wakes waiters first come, first served, so sessions
+    take turns rather than one backlog starving a live auction.
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._sem = asyncio.Semaphore(slots)
+
+    async def transcribe(self, audio_path, model_spec, vad_threshold_dbfs):
+        async with self._sem:
+            return await asyncio.to_thread(whisper_daemon.transcribe, audio_path, model_spec,
+                                           vad_threshold_dbfs, **transcription_worker.DECODE_OPTIONS)
+
+
+def claim_pending(db, session_id, limit, audio_dir, tx_dir, cache):
+    """Start up to `limit` pending segments. Returns (jobs, rows fetched)."""
+    with db.cursor() as cur:
+        cur.execute(
+            "SELECT * FROM CG_TranscriptionSegments "
+            "WHERE session_id = %s AND recording_status = 'complete' "
+            "AND transcription_status = 'pending' "
+            "ORDER BY segment_number ASC LIMIT %s",
+            (session_id, limit)
+        )
+        rows = cur.fetchall()
+    jobs = []
+    for segment in rows:
+        job = transcription_worker.start_segment(db, session_id, segment, audio_dir, tx_dir, cache)
+        if job:
+            jobs.append(job)
+    return jobs, len(rows)
+
+
+def count_segments(db, session_id):
+    with db.cursor() as cur:
+        cur.execute(
+            "SELECT COUNT(*) AS cnt, COALESCE(SUM(duration_seconds), 0) AS dur "
+            "FROM CG_TranscriptionSegments WHERE session_id = %s",
+            (session_id,)
+        )
+        row = cur.fetchone()
+    manager.update_session(db, session_id, total_segments=row['cnt'], total_duration_sec=row['dur'])
+
+
+def as_future(task):
+    """Wrap a finished asyncio task as the concurrent Future finish_segment expects."""
+    future = Future()
+    if task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+    return future
+
+
+# ─── One session ─────────────────────────────────────────────────
+
+class SupervisedSession:
+    """A session's lifecycle, as transcription_manager.main() runs it, as a coroutine."""
+
+    def __init__(self, supervisor, session_id):
+        self.sup = supervisor
+        self.session_id = session_id
+        self.stop_recording = asyncio.Event()   # end capture, let transcription finish
+        self.recording_done = asyncio.Event()
+        self.wake = asyncio.Event()             # a segment event arrived
+        self.alert = asyncio.Event()            # signal/lock file touched, capture ended, supervisor stopping
+        self.recorder_lock = asyncio.Lock()     # step() and stop() never overlap on their threads
+        self.recorder = None
+        self.docker_proc = None
+        self.worker_proc = None
+        self.listener = None
+
+    def log(self, level, event_type, message):
+        self.sup.writer.log(self.session_id, level, event_type, message)
+        print(f"[{level.upper()}] [S{self.session_id}] [{event_type}] {message}", flush=True)
+
+    async def update(self, **fields):
+        await self.sup.db.run(manager.update_session, self.session_id, **fields)
+
+    async def run(self):
+        sid = self.session_id
+        tasks = []
+        try:
+            session, config = await self.sup.db.run(manager.load_config, sid)
+            manager.write_heartbeat(sid)
+            self.log('info', 'manager_started', f"Supervisor took over session {sid}")
+
+            session_dir = manager.create_session_dir(session, config)
+            await self.update(session_dir=session_dir)
+            self.log('info', 'dir_created', f"Session directory: {session_dir}")
+
+            if config['acquisition_mode'] == 'browser_automation':
+                self.log('info', 'recorder_launching', 'Launching browser automation recorder (Docker)')
+                self.docker_proc = manager.launch_docker_recorder(sid, session_dir, config)
+                cg_output.drain(self.docker_proc, cg_output.ChildOutput(self.sup.writer, sid, 'recorder'))
+            else:
+                self.log('info', 'recorder_launching', 'Recording in the supervisor')
+                self.recorder = transcription_recorder.Recorder(
+                    self.sup.writer, sid, session_dir, config, session['auction_url'])
+                tasks.append(asyncio.create_task(self.record(), name='recorder'))
+
+            model_spec = cg_inference.model_spec(str(config['whisper_model']), config['inference_backend'])
+            if await self.sup.ensure_model(model_spec):
+                self.listener = cg_notify.Listener(sid)
+                asyncio.get_running_loop().add_reader(self.listener.sock.fileno(), self.on_notify)
+                tasks.append(asyncio.create_task(self.transcribe(session_dir, config, model_spec),
+                                                 name='transcription'))
+            else:
+                self.log('warning', 'whisper_daemon',
+                         'Whisper daemon did not start — running a separate transcription worker')
+                await self.launch_worker(session_dir, config)
+
+            await self.monitor(session, session_dir, config, tasks)
+
+        except Exception as e:
+            self.log('error', 'manager_error', str(e))
+            try:
+                await self.update(status='error', stop_reason=str(e)[:100],
+                                  end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            except Exception:
+                pass
+            self.stop_recording.set()
+            for task in tasks:
+                task.cancel()
+            await self.stop_capture()
+            if self.worker_proc and self.worker_proc.returncode is None:
+                self.worker_proc.terminate()
+        finally:
+            if self.listener:
+                asyncio.get_running_loop().remove_reader(self.listener.sock.fileno())
+                self.listener.close()
+            manager.clean_signals(sid)
+            manager.clean_lock(sid)
+            print(f"Supervisor finished session {sid}", flush=True)
+
+    async def monitor(self, session, session_dir, config, tasks):
+        """The manager's monitor loop: signals, max duration, recorder exit.
+
+        As in transcription_manager.monitor_session, it waits on self.alert
+        (set from the supervisor's directory watch, the end of capture and a
+        supervisor stop) with a timeout at the next heartbeat or deadline.
+        """
+        sid = self.session_id
+        deadline = time.time() + int(config['max_session_hours']) * 3600
+        next_heartbeat = time.time() + HEARTBEAT_SEC
+        lock_path = os.path.join(TOOLS_DIR, f"transcription_session_{sid}.lock")
+        stop_reason = None
+        docker_exit = None
+        if self.docker_proc:
+            docker_exit = asyncio.ensure_future(manager.wait_exit(self.docker_proc))
+            docker_exit.add_done_callback(lambda _: self.alert.set())
+
+        while True:
+            if manager.check_signal(sid, 'cancel'):
+                self.log('warning', 'cancel_received', 'Cancel signal received')
+                self.stop_recording.set()
+                await self.stop_capture()
+                for task in tasks:
+                    task.cancel()
+                if self.worker_proc and self.worker_proc.returncode is None:
+                    self.worker_proc.terminate()
+                await self.update(status='stopped', stop_reason='user_cancel',
+                                  end_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                self.log('info', 'session_cancelled', 'Session cancelled by user')
+                if docker_exit:
+                    docker_exit.cancel()
+                return
+
+            if manager.check_signal(sid, 'stop') or self.sup.stopping:
+                self.log('info', 'stop_received', 'Stop signal received — stopping recorder')
+                break
+            if time.time() >= deadline:
+                self.log('warning', 'max_duration', f"Max duration reached ({config['max_session_hours']}h)")
+                stop_reason = 'max_duration'
+                break
+            if self.recording_done.is_set() or (self.docker_proc and self.docker_proc.poll() is not None):
+                self.log('info', 'recorder_exited', 'Recorder finished normally')
+                break
+
+            # The launcher removes the lock when the handing-off manager exits; put it back
+            if time.time() >= next_heartbeat or not os.path.exists(lock_path):
+                next_heartbeat = time.time() + HEARTBEAT_SEC
+                manager.write_heartbeat(sid)
+                try:
+                    await self.sup.db.run(count_segments, sid)
+                except Exception:
+                    pass
+
+            timeout = min(deadline, next_heartbeat) - time.time()
+            if not self.sup.watch.available():
+                timeout = min(timeout, manager.SIGNAL_POLL_SEC)
+            try:
+                await asyncio.wait_for(self.alert.wait(), max(0.0, timeout))
+            except asyncio.TimeoutError:
+                pass
+            self.alert.clear()
+
+        if docker_exit:
+            docker_exit.cancel()
+        # Recording is over; transcription carries on until the backlog is done
+        self.stop_recording.set()
+        await self.stop_capture()
+        await self.update(status='processing')
+        self.log('info', 'processing', 'Recording stopped, transcription continues')
+        for task, result in zip(tasks, await asyncio.gather(*tasks, return_exceptions=True)):
+            if isinstance(result, BaseException) and not isinstance(result, asyncio.CancelledError):
+                # A crashed capture or transcription task must not vanish without a trace
+                self.log('error', f"{task.get_name()}_error", f"{type(result).__name__}: {result}")
+        if self.worker_proc:
+            await self.worker_proc.wait()
+
+        fields = {'status': 'complete', 'end_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        if stop_reason:
+            fields['stop_reason'] = stop_reason
+        await self.update(**fields)
+        self.log('info', 'session_complete', 'Session completed')
+
+        try:
+            manager.generate_master_transcript(session_dir)
+            self.log('info', 'master_transcript', 'Master transcript generated')
+        except Exception as e:
+            self.log('warning', 'master_transcript_error', str(e))
+        try:
+            await self.sup.db.run(count_segments, sid)
+        except Exception:
+            pass
+
+    # ── Capture ──
+
+    async def record(self):
+        """Drive the in-process Recorder until it stops or is told to."""
+        try:
+            while not self.stop_recording.is_set():
+                # Popen, disk checks and file IO: on a thread, so one slow share stalls one session
+                async with self.recorder_lock:
+                    delay = await asyncio.to_thread(self.recorder.step)
+                if delay is None:
+                    break
+                try:
+                    await asyncio.wait_for(self.stop_recording.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.stop_capture()
+
+    async def stop_capture(self):
+        """Stop whichever capture child the session has (idempotent)."""
+        if self.recorder and not self.recording_done.is_set():
+            self.recording_done.set()
+            self.alert.set()
+            async with self.recorder_lock:
+                await asyncio.to_thread(self.recorder.stop)
+            # Rows must be committed before the transcription loop's last look
+            await asyncio.to_thread(self.sup.writer.flush, 30)
+            cg_notify.notify(self.session_id, 'recorder_stopped')
+        if self.docker_proc and self.docker_proc.poll() is None:
+            await asyncio.to_thread(manager.stop_docker_container, self.session_id)
+            if self.docker_proc.poll() is None:
+                self.docker_proc.terminate()
+        if self.docker_proc:
+            self.recording_done.set()
+            self.alert.set()
+
+    # ── Transcription ──
+
+    def on_notify(self):
+        if self.listener.wait(0):
+            self.wake.set()
+
+    async def transcribe(self, session_dir, config, model_spec):
+        """Commit this session's segments in order, decoding on the shared queue."""
+        sid = self.session_id
+        audio_dir = os.path.join(session_dir, 'audio')
+        tx_dir = os.path.join(session_dir, 'transcripts')
+        os.makedirs(tx_dir, exist_ok=True)
+        threshold = int(config['silence_threshold_dbfs'])
+        cache = {
+            'model': model_spec,
+            'options': {'language': 'en', 'vad_threshold_dbfs': threshold,
+                        **transcription_worker.DECODE_OPTIONS},
+        }
+        self.log('info', 'worker_started', f"Transcription started in the supervisor (model: {model_spec})")
+
+        in_flight = deque()
+        final_pass = False
+        while True:
+            fetched = 0
+            if len(in_flight) < self.sup.queue.slots:
+                jobs, fetched = await self.sup.db.run(claim_pending, sid, self.sup.queue.slots - len(in_flight),
+                                                      audio_dir, tx_dir, cache)
+                for job in jobs:
+                    if 'future' not in job:
+                        job['task'] = asyncio.create_task(
+                            self.sup.queue.transcribe(job['audio_path'], model_spec, threshold))
+                    in_flight.append(job)
+
+            # Commit strictly in segment order so the master transcript stays correct
+            while in_flight and ('future' in in_flight[0] or in_flight[0]['task'].done()):
+                job = in_flight.popleft()
+                if 'future' not in job:
+                    job['future'] = as_future(job['task'])
+                await self.sup.db.run(transcription_worker.finish_segment, sid, job, threshold)
+
+            if in_flight:
+                await asyncio.wait([job['task'] for job in in_flight if 'task' in job],
+                                   return_when=asyncio.FIRST_COMPLETED)
+                continue
+            if fetched:
+                continue
+            if final_pass:
+                break
+            if self.recording_done.is_set():
+                final_pass = True  # one more look for segments committed while stopping
+                continue
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), TX_FALLBACK_SEC)
+            except asyncio.TimeoutError:
+                pass
+
+        self.log('info', 'worker_done', 'No more pending segments, session not active')
+
+    async def launch_worker(self, session_dir, config):
+        """Fallback: the per-session transcription_worker.py, as the manager runs it."""
+        python_bin = manager.find_whisper_python(sys.executable)
+        tx_cmd = [python_bin, os.path.join(TOOLS_DIR, 'transcription_worker.py'),
+                  '--session-id', str(self.session_id),
+                  '--session-dir', session_dir,
+                  '--model', str(config['whisper_model']),
+                  '--backend', config['inference_backend'],
+                  '--silence-threshold', str(config['silence_threshold_dbfs']),
+                  '--parallel', str(self.sup.queue.slots),
+                  '--segment-minutes', str(config['segment_length_minutes'])]
+        with open(os.path.join(session_dir, 'worker.out'), 'ab') as out:
+            self.worker_proc = await asyncio.create_subprocess_exec(
+                *tx_cmd, stdout=out, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+
+
+# ─── Supervisor ──────────────────────────────────────────────────
+
+class Supervisor:
+    def __init__(self, slots, cores):
+        self.writer = cg_dbwriter.DBWriter(get_db)
+        self.db = SharedDB()
+        self.queue = InferenceQueue(slots)
+        self.cores = cores
+        self.stopping = False
+        self.models = set()
+        self._model_lock = asyncio.Lock()
+        self.sessions = {}              # session_id -> SupervisedSession
+        self.changed = asyncio.Event()  # a request file arrived or a session ended
+        # One inotify watch on TOOLS_DIR for every session's signals and locks (cg_watch)
+        self.watch = cg_watch.DirectoryWatch(TOOLS_DIR, cg_watch.DEFAULT_MASK | cg_watch.IN_DELETE)
+        # Worker helpers (start/finish_segment) log through the shared writer
+        transcription_worker.log_writer = self.writer
+
+    def on_watch(self):
+        """Route file events in TOOLS_DIR to the session (or the serve loop) they concern."""
+        for name in self.watch.read():
+            if not name:
+                # Queue overflow: anything may have changed
+                self.changed.set()
+                for session in self.sessions.values():
+                    session.alert.set()
+            elif name.startswith('supervise_session_'):
+                self.changed.set()
+            else:
+                match = _SESSION_FILE.match(name)
+                session = self.sessions.get(int(match.group(1))) if match else None
+                if session:
+                    session.alert.set()
+
+    def stop(self):
+        """Like a stop signal for every session: finish capture, drain transcription."""
+        self.stopping = True
+        self.changed.set()
+        for session in self.sessions.values():
+            session.alert.set()
+
+    async def ensure_model(self, model_spec):
+        """Start the daemon if needed and make sure it holds model_spec."""
+        async with self._model_lock:
+            if model_spec in self.models and whisper_daemon.ping():
+                return True
+            python_bin = manager.find_whisper_python(sys.executable)
+            ok = await asyncio.to_thread(whisper_daemon.ensure_running, python_bin, [model_spec],
+                                         self.queue.slots, self.cores)
+            if not ok:
+                return False
+            try:
+                response = await asyncio.to_thread(whisper_daemon.call, {'op': 'load', 'model': model_spec})
+            except (OSError, ValueError):
+                return False
+            if response.get('ok'):
+                self.models.add(model_spec)
+            return bool(response.get('ok'))
+
+    def write_lock(self):
+        with open(LOCK_PATH, 'w') as f:
+            f.write(f"{os.getpid()}\n{int(time.time())}\n")
+
+    async def serve(self, session_ids):
+        loop = asyncio.get_running_loop()
+        if self.watch.available():
+            loop.add_reader(self.watch.fileno(), self.on_watch)
+        tasks = {}
+        idle_since = time.time()
+        pending = list(session_ids)
+
+        try:
+            while True:
+                self.write_lock()
+                if not self.stopping:
+                    pending += take_requests()
+                for sid in pending:
+                    if sid not in tasks:
+                        self.sessions[sid] = SupervisedSession(self, sid)
+                        tasks[sid] = asyncio.create_task(self.sessions[sid].run())
+                        tasks[sid].add_done_callback(lambda _: self.changed.set())
+                pending = []
+
+                for sid in [sid for sid, task in tasks.items() if task.done()]:
+                    self.session_ended(sid, tasks.pop(sid))
+                    del self.sessions[sid]
+                if tasks:
+                    idle_since = time.time()
+                elif self.stopping or time.time() - idle_since >= IDLE_EXIT_SEC:
+                    break
+
+                timeout = HEARTBEAT_SEC if tasks else idle_since + IDLE_EXIT_SEC - time.time()
+                if not self.watch.available():
+                    timeout = min(timeout, SCAN_SEC)
+                try:
+                    await asyncio.wait_for(self.changed.wait(), max(0.0, timeout))
+                except asyncio.TimeoutError:
+                    pass
+                self.changed.clear()
+        finally:
+            if self.watch.available():
+                loop.remove_reader(self.watch.fileno())
+            self.watch.close()
+
+    def session_ended(self, sid, task):
+        """Record a session task that died outside its own error handling."""
+        if task.cancelled() or task.exception() is None:
+            return
+        e = task.exception()
+        self.writer.log(sid, 'error', 'supervisor_error', f"Session task crashed: {type(e).__name__}: {e}")
+        self.writer.execute(
+            "UPDATE CG_TranscriptionSessions SET status = 'error', stop_reason = %s, end_time = NOW() "
+            "WHERE session_id = %s AND status IN ('recording', 'processing')",
+            (str(e)[:100], sid)
+        )
+        print(f"[ERROR] [S{sid}] Session task crashed: {e!r}", flush=True)
+
+    def close(self):
+        self.writer.close()
+        self.db.close()
+        try:
+            with open(LOCK_PATH) as f:
+                if int(f.readline().strip() or 0) == os.getpid():
+                    os.remove(LOCK_PATH)
+        except (OSError, ValueError):
+            pass
+
+
+def load_slots():
+    """Transcription cores from the global settings: every core above 0."""
+    db = get_db()
+    try:
+        with db.cursor() as cur:
+            cur.execute("SELECT max_cpu_cores FROM CG_TranscriptionSettings WHERE setting_id = 1")
+            row = cur.fetchone()
+    finally:
+        db.close()
+    total = int(row['max_cpu_cores']) if row else 2
+    core_list = [str(c) for c in range(1, total)] or ['0']
+    return len(core_list), ','.join(core_list)
+
+
+async def main_async(session_ids):
+    slots, cores = load_slots()
+    loop = asyncio.get_running_loop()
+    # Decodes hold a thread each for their whole run; leave room for DB and file work
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=slots + 4))
+
+    supervisor = Supervisor(slots, cores)
+
+    loop.add_signal_handler(signal.SIGTERM, supervisor.stop)
+    try:
+        await supervisor.serve(session_ids)
+    finally:
+        supervisor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transcription Supervisor')
+    parser.add_argument('--session-id', type=int, action='append', default=[],
+                        help='Session to run right away (repeatable); others arrive as request files')
+    args = parser.parse_args()
+
+    if is_running():
+        # One supervisor per NAS: hand these sessions to it instead
+        for sid in args.session_id:
+            queue_request(sid)
+        print("Supervisor already running; sessions queued")
+        return
+    # Claim the lock before the DB round trips so a second launch queues instead
+    with open(LOCK_PATH, 'w') as f:
+        f.write(f"{os.getpid()}\n{int(time.time())}\n")
+
+    asyncio.run(main_async(args.session_id))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,39 +2,70 @@
 Card Graph - Transcription Worker (Whisper)
 
 Polls for completed audio segments and transcribes them using OpenAI Whisper.
+When behind the recorder, up to --parallel segments are decoded at once on the
+Whisper daemon's process pool; when caught up, the one pending segment is split
+at silences and its chunks share those cores instead. Results are always
+committed in segment order. With --stream, the segment still being recorded is
+transcribed in rolling windows so partial text and progress appear live.
+The recorder wakes the worker through a per-session notification socket
+(cg_notify); the DB is then only polled every 30s as a fallback.
 Exits when no more pending segments remain and the session is no longer recording.
 
 Usage:
     python3 transcription_worker.py --session-id 123 --session-dir /path --model base
+    python3 transcription_worker.py --session-id 123 --session-dir /path --parallel 2
+    python3 transcription_worker.py --session-id 123 --session-dir /path --model small --backend faster-whisper
 """
 import argparse
+import json
 import os
-import re
 import signal
 import sys
 import time
-from collections import Counter
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-import pymysql
-from cg_config import DB_CONFIG
+import cg_cache
+import cg_db
+import cg_dbwriter
+import cg_hallucination
+import cg_inference
+import cg_master
+import cg_notify
+import cg_timing
+import whisper_daemon
 
 running = True
+log_writer = None       # cg_dbwriter.DBWriter for log lines and progress, set up in main()
 whisper_model = None
+daemon_model = None  # model name when jobs go to the resident Whisper daemon
+
+
+STREAM_WINDOW_SEC = 30     # new audio decoded per streaming pass (one Whisper window)
+STREAM_GUARD_SEC = 1       # stay this far behind the recorder's write position
+STREAM_POLL_SEC = 10       # how often a streamed WAV is checked for new audio
+NOTIFY_FALLBACK_SEC = 30   # DB poll interval when the recorder can wake us directly
+MAX_IDLE_SEC = 300         # exit after this long with nothing to do once processing
+
+DECODE_OPTIONS = {'word_timestamps': True}  # word timings feed the .words sidecars
 
 
 def get_db():
-    return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor, autocommit=True)
+    return cg_db.get_db()
 
 
 def log_event(db, session_id, level, event_type, message):
-    with db.cursor() as cur:
-        cur.execute(
-            "INSERT INTO CG_TranscriptionLogs (session_id, log_level, event_type, message) "
-            "VALUES (%s, %s, %s, %s)",
-            (session_id, level, event_type, message)
-        )
+    if log_writer is not None:
+        log_writer.log(session_id, level, event_type, message)
+    else:
+        with db.cursor() as cur:
+            cur.execute(
+                "INSERT INTO CG_TranscriptionLogs (session_id, log_level, event_type, message) "
+                "VALUES (%s, %s, %s, %s)",
+                (session_id, level, event_type, message)
+            )
     print(f"[{level.upper()}] {message}")
 
 
@@ -46,109 +77,429 @@ def handle_sigterm(signum, frame):
 WHISPER_CACHE = '/volume1/web/cardgraph/tools/whisper_models'
 
 
+def connect_daemon(model_name):
+    """Hand inference to the resident Whisper daemon if one is running."""
+    global daemon_model
+    if not whisper_daemon.ping():
+        return False
+    try:
+        # Blocks until the daemon has the model resident (instant if already loaded)
+        response = whisper_daemon.call({'op': 'load', 'model': model_name})
+    except Exception as e:
+        print(f"Whisper daemon unavailable: {e}")
+        return False
+    if not response.get('ok'):
+        print(f"Whisper daemon could not load {model_name}: {response.get('error')}")
+        return False
+    daemon_model = model_name
+    print(f"Using Whisper daemon (model: {model_name})")
+    return True
+
+
 def load_whisper_model(model_name):
-    """Load the Whisper model once at startup."""
+    """Load the Whisper model (a cg_inference spec) once at startup."""
     global whisper_model
-    os.makedirs(WHISPER_CACHE, exist_ok=True)
     try:
-        import whisper
         print(f"Loading Whisper model: {model_name} (cache: {WHISPER_CACHE})")
-        whisper_model = whisper.load_model(model_name, download_root=WHISPER_CACHE)
+        whisper_model = cg_inference.load_model(model_name, WHISPER_CACHE)
         print(f"Whisper model loaded successfully")
         return True
-    except ImportError:
-        print("ERROR: whisper module not installed")
+    except ImportError as e:
+        print(f"ERROR: inference backend not installed: {e}")
         return False
     except Exception as e:
         print(f"ERROR loading Whisper model: {e}")
         return False
 
 
-def transcribe_segment(audio_path, output_path):
-    """Transcribe a single audio file using Whisper."""
-    global whisper_model
-    if whisper_model is None:
-        raise RuntimeError("Whisper model not loaded")
+def transcribe_segment(audio_path, vad_threshold_dbfs=None, chunks=0, window=None):
+    """Transcribe a single audio file using Whisper (daemon or in-process).
 
-    result = whisper_model.transcribe(audio_path, language='en', fp16=False)
-    text = result.get('text', '').strip()
+    Silent stretches below vad_threshold_dbfs are cut before inference.
+    With chunks > 1 the daemon decodes silence-separated pieces in parallel;
+    window=(start, end) limits the job to part of a still-growing WAV.
+    Returns the result dict; the caller writes the transcript so files land
+    in segment order even when several segments decode at once.
+    """
+    if daemon_model:
+        return whisper_daemon.transcribe(audio_path, daemon_model, vad_threshold_dbfs, chunks, window,
+                                         **DECODE_OPTIONS)
+    if whisper_model is not None:
+        return whisper_daemon.transcribe_audio(whisper_model, audio_path, DECODE_OPTIONS,
+                                               vad_threshold_dbfs=vad_threshold_dbfs, window=window)
+    raise RuntimeError("Whisper model not loaded")
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(text)
-        f.write('\n')
 
-    return text
+def get_silence_threshold(db):
+    """Global silence_threshold_dbfs setting (used when not passed on the command line)."""
+    with db.cursor() as cur:
+        cur.execute("SELECT silence_threshold_dbfs FROM CG_TranscriptionSettings WHERE setting_id = 1")
+        row = cur.fetchone()
+    return int(row['silence_threshold_dbfs']) if row else -48
 
 
 def is_whisper_hallucination(text):
-    """Detect Whisper hallucination patterns caused by silence or near-silence.
-
-    Whisper generates repetitive garbage when processing silent audio:
-    - "you you you you you you you"
-    - "Thank you. Thank you. Thank you."
-    - "Thanks for watching! Subscribe!"
-    - Single words repeated endlessly
+    """Whole-transcript text heuristic, for results without per-window signals.
 
     Returns (is_hallucination: bool, reason: str).
     """
-    if not text or not text.strip():
-        return True, 'empty_transcript'
-
-    cleaned = text.strip()
-    words = cleaned.lower().split()
-    word_count = len(words)
-
-    # Very short transcripts from a full segment are suspicious but not garbage
-    if word_count < 3:
-        return True, 'too_short'
-
-    # --- Single word repetition ---
-    # If any one word makes up 50%+ of the transcript, it's hallucination
-    counts = Counter(words)
-    most_common_word, most_common_count = counts.most_common(1)[0]
-    if word_count >= 6 and most_common_count / word_count >= 0.50:
-        return True, f'word_repetition:{most_common_word}({most_common_count}/{word_count})'
-
-    # --- Low vocabulary ratio ---
-    # Real speech has variety; hallucinations repeat the same few words
-    unique_ratio = len(counts) / word_count
-    if word_count >= 10 and unique_ratio < 0.15:
-        return True, f'low_vocabulary:{len(counts)}_unique/{word_count}_total'
-
-    # --- Phrase repetition ---
-    # Check for repeated 2-3 word phrases (e.g., "thank you" x20)
-    if word_count >= 8:
-        for phrase_len in (2, 3):
-            phrases = [' '.join(words[i:i+phrase_len]) for i in range(len(words) - phrase_len + 1)]
-            if phrases:
-                phrase_counts = Counter(phrases)
-                top_phrase, top_count = phrase_counts.most_common(1)[0]
-                # If a phrase appears in 40%+ of possible positions, it's repetitive
-                if top_count >= max(4, len(phrases) * 0.40):
-                    return True, f'phrase_repetition:"{top_phrase}"x{top_count}'
-
-    # --- Known hallucination phrases (common Whisper silence artifacts) ---
-    hallucination_patterns = [
-        r'(?:thanks?\s+(?:for\s+)?watching)',
-        r'(?:subscribe\s+(?:to\s+)?(?:my\s+)?channel)',
-        r'(?:please\s+like\s+and\s+subscribe)',
-        r'(?:see\s+you\s+(?:in\s+)?(?:the\s+)?next\s+(?:video|one))',
-    ]
-    lower_text = cleaned.lower()
-    for pattern in hallucination_patterns:
-        if re.search(pattern, lower_text) and word_count < 20:
-            return True, f'known_hallucination_phrase'
-
-    return False, ''
+    reason = cg_hallucination.text_reason(text)
+    return bool(reason), reason
+
+
+def start_segment(db, session_id, segment, audio_dir, tx_dir, cache=None):
+    """Validate a pending segment and mark it transcribing.
+
+    With cache={'model': spec, 'options': {...}} the audio is hashed and a
+    previously stored result, if any, is attached as an already-finished job.
+    Returns a job dict, or None when the segment was skipped or leased elsewhere.
+    """
+    seg_id = segment['segment_id']
+    seg_num = segment['segment_number']
+    audio_file = segment['filename_audio']
+
+    if not audio_file:
+        # Skip segments without audio files
+        with db.cursor() as cur:
+            cur.execute(
+                "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped' "
+                "WHERE segment_id = %s", (seg_id,)
+            )
+        return None
+
+    audio_path = os.path.join(audio_dir, audio_file)
+    if not os.path.exists(audio_path):
+        log_event(db, session_id, 'warning', 'audio_missing',
+                  f"Audio file not found: {audio_file}")
+        with db.cursor() as cur:
+            cur.execute(
+                "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped', "
+                "error_message = 'Audio file not found' WHERE segment_id = %s",
+                (seg_id,)
+            )
+        return None
+
+    # Mark as transcribing, unless a PC worker leased it since it was listed
+    with db.cursor() as cur:
+        cur.execute(
+            "UPDATE CG_TranscriptionSegments SET transcription_status = 'transcribing' "
+            "WHERE segment_id = %s AND transcription_status = 'pending'",
+            (seg_id,)
+        )
+        if cur.rowcount == 0:
+            return None
+
+    log_event(db, session_id, 'info', 'transcribing',
+              f"Transcribing segment {seg_num}: {audio_file}")
+
+    # Build transcript filename
+    tx_filename = os.path.splitext(audio_file)[0] + '.txt'
+    start, duration = cg_master.segment_times(segment)
+    job = {
+        'segment_id': seg_id,
+        'segment_number': seg_num,
+        'audio_path': audio_path,
+        'tx_filename': tx_filename,
+        'tx_path': os.path.join(tx_dir, tx_filename),
+        'start': start,
+        'duration': duration,
+    }
+
+    if cache:
+        digest = cg_cache.audio_digest(audio_path)
+        job['cache'] = {**cache, 'digest': digest, 'bytes': os.path.getsize(audio_path)}
+        cached = cg_cache.lookup(db, digest, cache['model'], cache['options'])
+        if cached is not None:
+            job['future'] = Future()
+            job['future'].set_result(cached)
+            log_event(db, session_id, 'info', 'cache_hit',
+                      f"Segment {seg_num} matched a cached transcript — Whisper not run")
+    return job
+
+
+def discard_transcript(tx_path):
+    """Remove a transcript (and its word timings) a skipped segment must not keep.
+
+    A streamed segment wrote its text while recording; once judged silent or
+    hallucinated it would otherwise be read back by the PHP reader and finalize().
+    """
+    for path in (tx_path, cg_timing.sidecar_path(tx_path)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def finish_segment(db, session_id, job, silence_threshold):
+    """Record the outcome of a finished transcription job."""
+    seg_id = job['segment_id']
+    seg_num = job['segment_number']
+    audio_path = job['audio_path']
+    tx_path = job['tx_path']
+
+    try:
+        result = job['future'].result()
+        text = result['text']
+        if job.get('cache') and not result.get('cached'):
+            c = job['cache']
+            cg_cache.store(db, c['digest'], c['model'], c['options'], result, c['bytes'])
+        silence_json = json.dumps(result.get('silent_ranges', []))
+        speech_sec = result.get('speech_seconds')
+
+        if result.get('silent'):
+            # VAD found no speech — Whisper never ran, audio has no value
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+            discard_transcript(tx_path)
+
+            with db.cursor() as cur:
+                cur.execute(
+                    "UPDATE CG_TranscriptionSegments SET "
+                    "transcription_status = 'skipped', error_message = 'vad_silence', "
+                    "filename_transcript = NULL, "
+                    "silence_ranges = %s, speech_seconds = %s WHERE segment_id = %s",
+                    (silence_json, speech_sec, seg_id)
+                )
+
+            log_event(db, session_id, 'info', 'silence_skipped',
+                      f"Segment {seg_num} skipped — no speech above {silence_threshold} dBFS")
+            return
+
+        # Check for Whisper hallucination (silence artifacts)
+        dropped = result.get('dropped_windows')
+        if dropped is not None:
+            # Bad windows were already cut during decoding; skip only if nothing survived
+            is_hallucination = not text.strip()
+            hallucination_reason = f'all_windows_dropped:{len(dropped)}' if is_hallucination else ''
+            if dropped and not is_hallucination:
+                dropped_sec = sum(end - start for start, end, _ in dropped)
+                log_event(db, session_id, 'info', 'windows_dropped',
+                          f"Segment {seg_num}: dropped {len(dropped)} hallucinated window(s), "
+                          f"{dropped_sec:.0f}s — {', '.join(sorted({r.split(':')[0] for _, _, r in dropped}))}")
+        else:
+            is_hallucination, hallucination_reason = is_whisper_hallucination(text)
+
+        if is_hallucination:
+            # Delete the audio file (silence, no value)
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+            discard_transcript(tx_path)
+
+            with db.cursor() as cur:
+                cur.execute(
+                    "UPDATE CG_TranscriptionSegments SET "
+                    "transcription_status = 'skipped', filename_transcript = NULL, "
+                    "error_message = %s WHERE segment_id = %s",
+                    (f'whisper_hallucination:{hallucination_reason}', seg_id)
+                )
+
+            log_event(db, session_id, 'info', 'hallucination_skipped',
+                      f"Segment {seg_num} skipped — Whisper hallucination detected ({hallucination_reason})")
+            return
+
+        with open(tx_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.write('\n')
+        if result.get('words'):
+            cg_timing.write_sidecar(tx_path, text, result['words'])
+
+        # Mark complete
+        with db.cursor() as cur:
+            cur.execute(
+                "UPDATE CG_TranscriptionSegments SET "
+                "transcription_status = 'complete', transcription_progress = 100, "
+                "transcribed_at = NOW(), "
+                "filename_transcript = %s, silence_ranges = %s, speech_seconds = %s "
+                "WHERE segment_id = %s",
+                (job['tx_filename'], silence_json, speech_sec, seg_id)
+            )
+        try:
+            cg_master.append(os.path.dirname(tx_path), seg_num, job['tx_filename'], text,
+                             job.get('start'), job.get('duration'))
+        except OSError as e:
+            log_event(db, session_id, 'warning', 'master_transcript_error',
+                      f"Segment {seg_num} not added to the master transcript: {e}")
+
+        word_count = len(text.split()) if text else 0
+        trimmed = sum(end - start for start, end in result.get('silent_ranges', []))
+        log_event(db, session_id, 'info', 'transcription_complete',
+                  f"Segment {seg_num} transcribed: {word_count} words"
+                  f"{f' ({trimmed:.0f}s silence trimmed)' if trimmed else ''}")
+
+    except Exception as e:
+        log_event(db, session_id, 'error', 'transcription_error',
+                  f"Segment {seg_num} failed: {str(e)}")
+        with db.cursor() as cur:
+            cur.execute(
+                "UPDATE CG_TranscriptionSegments SET transcription_status = 'error', "
+                "error_message = %s WHERE segment_id = %s",
+                (str(e)[:500], seg_id)
+            )
+
+
+def claim_stream_segment(db, session_id, audio_dir, tx_dir):
+    """Claim the segment the recorder is still writing, for streaming.
+
+    Only WAV can be read while growing. Returns stream state or None.
+    """
+    with db.cursor() as cur:
+        cur.execute(
+            "SELECT * FROM CG_TranscriptionSegments "
+            "WHERE session_id = %s AND recording_status = 'recording' "
+            "AND transcription_status = 'pending' "
+            "ORDER BY segment_number ASC LIMIT 1",
+            (session_id,)
+        )
+        segment = cur.fetchone()
+
+    audio_file = segment['filename_audio'] if segment else None
+    if not audio_file or not audio_file.endswith('.wav'):
+        return None
+    audio_path = os.path.join(audio_dir, audio_file)
+    if not os.path.exists(audio_path):
+        return None  # ffmpeg has not created it yet
+
+    tx_filename = os.path.splitext(audio_file)[0] + '.txt'
+    with db.cursor() as cur:
+        cur.execute(
+            "UPDATE CG_TranscriptionSegments SET transcription_status = 'transcribing', "
+            "transcription_progress = 0, filename_transcript = %s "
+            "WHERE segment_id = %s AND transcription_status = 'pending'",
+            (tx_filename, segment['segment_id'])
+        )
+        if cur.rowcount == 0:
+            return None
+
+    tx_path = os.path.join(tx_dir, tx_filename)
+    open(tx_path, 'w', encoding='utf-8').close()
+
+    log_event(db, session_id, 'info', 'streaming',
+              f"Streaming segment {segment['segment_number']} while it records: {audio_file}")
+    return {
+        'segment_id': segment['segment_id'],
+        'segment_number': segment['segment_number'],
+        'audio_path': audio_path,
+        'tx_filename': tx_filename,
+        'tx_path': tx_path,
+        'start': cg_master.segment_times(segment)[0],
+        'duration': None,   # known once the recorder closes the segment
+        'consumed': 0.0,
+        'texts': [],
+        'words': [],
+        'dropped_windows': None,
+        'silent_ranges': [],
+        'speech_seconds': 0.0,
+    }
+
+
+def stream_step(db, session_id, stream, silence_threshold, segment_seconds, chunks):
+    """Transcribe the next window of a streamed segment, or finish it.
+
+    Each pass decodes about STREAM_WINDOW_SEC of new audio, ending at a quiet
+    point, appends the text to the transcript file and updates
+    transcription_progress. Once the recorder has closed the segment the
+    remainder is decoded and the segment is committed like any other.
+    Returns True when the segment is finished.
+    """
+    import cg_audio
+
+    audio_path = stream['audio_path']
+    consumed = stream['consumed']
+    available = cg_audio.wav_available_sec(audio_path)
+    waiting = available - consumed < STREAM_WINDOW_SEC + STREAM_GUARD_SEC
+
+    # The recorder's notification sets 'recorded'; the DB is only asked as a fallback
+    if waiting and not stream.get('recorded') and time.time() - stream.get('checked_at', 0) >= NOTIFY_FALLBACK_SEC:
+        with db.cursor() as cur:
+            cur.execute(
+                "SELECT recording_status FROM CG_TranscriptionSegments WHERE segment_id = %s",
+                (stream['segment_id'],)
+            )
+            row = cur.fetchone()
+        stream['recorded'] = not row or row['recording_status'] != 'recording'
+        stream['checked_at'] = time.time()
+    recording_done = bool(stream.get('recorded'))
+
+    if recording_done:
+        window = [consumed, None]
+    else:
+        if waiting:
+            return False
+        # End the window at the quietest point of its last few seconds
+        search_from = consumed + STREAM_WINDOW_SEC - cg_audio.CUT_SEARCH_SEC
+        tail, _ = cg_audio.read_wav_range(audio_path, search_from, consumed + STREAM_WINDOW_SEC)
+        window = [consumed, search_from + cg_audio.quietest_point(tail, 0, cg_audio.CUT_SEARCH_SEC)]
+
+    result = transcribe_segment(audio_path, silence_threshold,
+                                chunks if recording_done else 0, window)
+
+    # Window-relative silences -> segment time, merging across window edges
+    for start, end in result.get('silent_ranges', []):
+        start, end = round(consumed + start, 2), round(consumed + end, 2)
+        if stream['silent_ranges'] and start <= stream['silent_ranges'][-1][1] + 0.05:
+            stream['silent_ranges'][-1] = (stream['silent_ranges'][-1][0], end)
+        else:
+            stream['silent_ranges'].append((start, end))
+    stream['speech_seconds'] += result.get('speech_seconds', 0.0)
+    stream['words'].extend(cg_timing.remap_words(result.get('words', []), None, consumed))
+    if 'dropped_windows' in result:
+        stream['dropped_windows'] = (stream['dropped_windows'] or []) + [
+            (round(start + consumed, 2), round(end + consumed, 2), reason)
+            for start, end, reason in result['dropped_windows']
+        ]
+
+    text = result['text']
+    if text:
+        with open(stream['tx_path'], 'a', encoding='utf-8') as f:
+            f.write(('\n' if stream['texts'] else '') + text)
+        stream['texts'].append(text)
+
+    if not recording_done:
+        stream['consumed'] = window[1]
+        progress = min(99, int(stream['consumed'] * 100 / max(1, segment_seconds)))
+        log_writer.execute(
+            "UPDATE CG_TranscriptionSegments SET transcription_progress = %s "
+            "WHERE segment_id = %s AND transcription_status = 'transcribing'",
+            (progress, stream['segment_id'])
+        )
+        return False
+
+    # Recording closed: commit through the normal path (hallucination check etc.)
+    stream['duration'] = round(available, 2)
+    done = Future()
+    done.set_result({
+        'text': '\n'.join(stream['texts']),
+        'silent': stream['speech_seconds'] < cg_audio.MIN_SPEECH_SEC,
+        'silent_ranges': stream['silent_ranges'],
+        'speech_seconds': round(stream['speech_seconds'], 1),
+        'words': stream['words'],
+        **({'dropped_windows': stream['dropped_windows']} if stream['dropped_windows'] is not None else {}),
+    })
+    finish_segment(db, session_id, {**stream, 'future': done}, silence_threshold)
+    return True
 
 
 def main():
-    global running
+    global running, log_writer
 
     parser = argparse.ArgumentParser(description='Transcription Worker')
     parser.add_argument('--session-id', type=int, required=True)
     parser.add_argument('--session-dir', type=str, required=True)
-    parser.add_argument('--model', type=str, default='base', choices=['tiny', 'base', 'small', 'medium', 'large'])
+    parser.add_argument('--model', type=str, default='base', choices=cg_inference.MODELS)
+    parser.add_argument('--backend', type=str, default=cg_inference.DEFAULT_BACKEND, choices=cg_inference.BACKENDS,
+                        help='Inference engine (faster-whisper = int8 CTranslate2)')
+    parser.add_argument('--silence-threshold', type=int, default=None,
+                        help='dBFS below which audio is trimmed before Whisper (default: settings)')
+    parser.add_argument('--parallel', type=int, default=1,
+                        help='Segments transcribed concurrently when the daemon is available')
+    parser.add_argument('--chunk-mode', type=str, default='auto', choices=['auto', 'always', 'off'],
+                        help='Split a segment across --parallel cores (auto: only when caught up)')
+    parser.add_argument('--stream', action='store_true',
+                        help='When caught up, transcribe the segment still recording in rolling windows')
+    parser.add_argument('--segment-minutes', type=int, default=15,
+                        help='Expected segment length, for streaming progress')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always run Whisper, ignoring CG_TranscriptCache')
     args = parser.parse_args()
 
     signal.signal(signal.SIGTERM, handle_sigterm)
@@ -173,154 +524,166 @@ def main():
         print(f"[WARNING] Original transcripts dir not writable, using fallback: {tx_dir}")
 
     db = get_db()
-
-    # Load Whisper model (first run downloads ~140MB for 'base')
-    if not load_whisper_model(args.model):
+    # Claims and status changes stay on db; logs and progress never block a decode
+    log_writer = cg_dbwriter.DBWriter(get_db)
+    silence_threshold = args.silence_threshold
+    if silence_threshold is None:
+        silence_threshold = get_silence_threshold(db)
+
+    # Prefer the resident daemon; otherwise load in-process (first run downloads ~140MB for 'base')
+    model_spec = cg_inference.model_spec(args.model, args.backend)
+    if not connect_daemon(model_spec) and not load_whisper_model(model_spec):
         log_event(db, session_id, 'warning', 'whisper_load_error',
-                  f'Whisper model "{args.model}" failed to load — transcription skipped')
+                  f'Whisper model "{model_spec}" failed to load — transcription skipped')
         db.close()
         return
 
-    log_event(db, session_id, 'info', 'worker_started', f"Transcription worker started (model: {args.model})")
-
-    idle_count = 0
-    MAX_IDLE = 60  # Exit after 60 consecutive idle polls (5 min at 5s interval)
-
-    try:
-        while running:
-            # Find pending segments with completed recordings
-            with db.cursor() as cur:
-                cur.execute(
-                    "SELECT * FROM CG_TranscriptionSegments "
-                    "WHERE session_id = %s AND recording_status = 'complete' "
-                    "AND transcription_status = 'pending' "
-                    "ORDER BY segment_number ASC LIMIT 1",
-                    (session_id,)
-                )
-                segment = cur.fetchone()
-
-            if not segment:
-                # Check if session is still recording
-                with db.cursor() as cur:
-                    cur.execute(
-                        "SELECT status FROM CG_TranscriptionSessions WHERE session_id = %s",
-                        (session_id,)
-                    )
-                    sess = cur.fetchone()
+    log_event(db, session_id, 'info', 'worker_started', f"Transcription worker started (model: {model_spec}"
+              f"{', via daemon' if daemon_model else ''})")
 
-                if sess and sess['status'] not in ('recording', 'processing'):
-                    # Session is done and no more pending segments
-                    log_event(db, session_id, 'info', 'worker_done',
-                              'No more pending segments, session not active')
-                    break
+    # Cache key covers everything that changes the text; chunking does not
+    cache = None if args.no_cache else {
+        'model': model_spec,
+        'options': {'language': 'en', 'vad_threshold_dbfs': silence_threshold, **DECODE_OPTIONS},
+    }
 
-                idle_count += 1
-                if idle_count >= MAX_IDLE and sess and sess['status'] == 'processing':
-                    log_event(db, session_id, 'info', 'worker_timeout',
-                              'Worker idle timeout — no new segments')
-                    break
+    parallel = args.parallel if daemon_model else 1  # an in-process model decodes one at a time
+    executor = ThreadPoolExecutor(max_workers=parallel)
+    in_flight = deque()  # jobs in segment order; results are committed from the head
+    stream = None        # segment being transcribed while it records (--stream)
 
-                time.sleep(5)
-                continue
-
-            idle_count = 0
-            seg_id = segment['segment_id']
-            seg_num = segment['segment_number']
-            audio_file = segment['filename_audio']
+    # The recorder pings this socket on segment start/end; DB polls become a slow fallback
+    try:
+        listener = cg_notify.Listener(session_id)
+    except OSError as e:
+        listener = None
+        log_event(db, session_id, 'warning', 'notify_unavailable',
+                  f"Segment notifications unavailable ({e}) — polling the DB every 5s")
+    fallback_sec = NOTIFY_FALLBACK_SEC if listener else 5
+    next_poll = 0.0    # pending segments are re-queried after a notification or fallback_sec
 
-            if not audio_file:
-                # Skip segments without audio files
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped' "
-                        "WHERE segment_id = %s", (seg_id,)
-                    )
-                continue
+    idle_since = time.time()
 
-            audio_path = os.path.join(audio_dir, audio_file)
-            if not os.path.exists(audio_path):
-                log_event(db, session_id, 'warning', 'audio_missing',
-                          f"Audio file not found: {audio_file}")
+    try:
+        # On SIGTERM stop claiming, but let segments already in flight finish
+        while running or in_flight:
+            segments = []
+            busy = sum(1 for job in in_flight if not job['future'].done())
+            if running and busy < parallel and len(in_flight) < parallel * 2 and time.time() >= next_poll:
+                # Find pending segments with completed recordings
                 with db.cursor() as cur:
                     cur.execute(
-                        "UPDATE CG_TranscriptionSegments SET transcription_status = 'skipped', "
-                        "error_message = 'Audio file not found' WHERE segment_id = %s",
-                        (seg_id,)
+                        "SELECT * FROM CG_TranscriptionSegments "
+                        "WHERE session_id = %s AND recording_status = 'complete' "
+                        "AND transcription_status = 'pending' "
+                        "ORDER BY segment_number ASC LIMIT %s",
+                        (session_id, parallel - busy)
                     )
+                    segments = cur.fetchall()
+                if len(segments) < parallel - busy:
+                    next_poll = time.time() + fallback_sec  # drained; wait to be told
+
+                # Caught up with the recorder: spend the spare cores on one segment
+                chunks = 0
+                if parallel > 1 and args.chunk_mode != 'off':
+                    if args.chunk_mode == 'always' or (busy == 0 and len(segments) == 1):
+                        chunks = parallel
+
+                for segment in segments:
+                    job = start_segment(db, session_id, segment, audio_dir, tx_dir, cache)
+                    if not job:
+                        continue
+                    if 'future' not in job:  # cache hits arrive already resolved
+                        job['future'] = executor.submit(transcribe_segment, job['audio_path'],
+                                                        silence_threshold, chunks)
+                    in_flight.append(job)
+
+            if in_flight:
+                idle_since = time.time()
+                running_futures = [job['future'] for job in in_flight if not job['future'].done()]
+                if running_futures:
+                    wait(running_futures, timeout=5, return_when=FIRST_COMPLETED)
+                if listener and listener.wait(0):
+                    next_poll = 0.0
+                # Commit strictly in segment order so the master transcript stays correct
+                while in_flight and in_flight[0]['future'].done():
+                    finish_segment(db, session_id, in_flight.popleft(), silence_threshold)
                 continue
 
-            # Mark as transcribing
+            if segments:
+                continue  # everything fetched was skipped; look again right away
+
+            # Caught up: follow the segment being recorded instead of waiting for it
+            if args.stream and running:
+                try:
+                    if stream is None:
+                        stream = claim_stream_segment(db, session_id, audio_dir, tx_dir)
+                    if stream is not None:
+                        idle_since = time.time()
+                        if stream_step(db, session_id, stream, silence_threshold,
+                                       args.segment_minutes * 60, parallel):
+                            stream = None
+                            continue
+                except Exception as e:
+                    log_event(db, session_id, 'error', 'streaming_error',
+                              f"Segment {stream['segment_number'] if stream else '?'} streaming failed: {e}")
+                    if stream:
+                        with db.cursor() as cur:
+                            cur.execute(
+                                "UPDATE CG_TranscriptionSegments SET transcription_status = 'error', "
+                                "error_message = %s WHERE segment_id = %s",
+                                (str(e)[:500], stream['segment_id'])
+                            )
+                    stream = None
+
+            # Check if session is still recording
             with db.cursor() as cur:
                 cur.execute(
-                    "UPDATE CG_TranscriptionSegments SET transcription_status = 'transcribing' "
-                    "WHERE segment_id = %s",
-                    (seg_id,)
+                    "SELECT status FROM CG_TranscriptionSessions WHERE session_id = %s",
+                    (session_id,)
                 )
+                sess = cur.fetchone()
 
-            log_event(db, session_id, 'info', 'transcribing',
-                      f"Transcribing segment {seg_num}: {audio_file}")
-
-            # Build transcript filename
-            tx_filename = os.path.splitext(audio_file)[0] + '.txt'
-            tx_path = os.path.join(tx_dir, tx_filename)
-
-            try:
-                text = transcribe_segment(audio_path, tx_path)
-
-                # Check for Whisper hallucination (silence artifacts)
-                is_hallucination, hallucination_reason = is_whisper_hallucination(text)
-
-                if is_hallucination:
-                    # Delete the garbage transcript file
-                    if os.path.exists(tx_path):
-                        os.remove(tx_path)
-                    # Delete the audio file (silence, no value)
-                    if os.path.exists(audio_path):
-                        os.remove(audio_path)
-
-                    with db.cursor() as cur:
-                        cur.execute(
-                            "UPDATE CG_TranscriptionSegments SET "
-                            "transcription_status = 'skipped', "
-                            "error_message = %s WHERE segment_id = %s",
-                            (f'whisper_hallucination:{hallucination_reason}', seg_id)
-                        )
-
-                    log_event(db, session_id, 'info', 'hallucination_skipped',
-                              f"Segment {seg_num} skipped — Whisper hallucination detected ({hallucination_reason})")
-                    continue
-
-                # Mark complete
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSegments SET "
-                        "transcription_status = 'complete', transcription_progress = 100, "
-                        "filename_transcript = %s WHERE segment_id = %s",
-                        (tx_filename, seg_id)
-                    )
-
-                word_count = len(text.split()) if text else 0
-                log_event(db, session_id, 'info', 'transcription_complete',
-                          f"Segment {seg_num} transcribed: {word_count} words")
-
-            except Exception as e:
-                log_event(db, session_id, 'error', 'transcription_error',
-                          f"Segment {seg_num} failed: {str(e)}")
-                with db.cursor() as cur:
-                    cur.execute(
-                        "UPDATE CG_TranscriptionSegments SET transcription_status = 'error', "
-                        "error_message = %s WHERE segment_id = %s",
-                        (str(e)[:500], seg_id)
-                    )
+            if sess and sess['status'] not in ('recording', 'processing'):
+                # Session is done and no more pending segments
+                log_event(db, session_id, 'info', 'worker_done',
+                          'No more pending segments, session not active')
+                break
 
-            if not running:
+            if time.time() - idle_since >= MAX_IDLE_SEC and sess and sess['status'] == 'processing':
+                log_event(db, session_id, 'info', 'worker_timeout',
+                          'Worker idle timeout — no new segments')
                 break
 
+            if not listener:
+                time.sleep(5)
+                continue
+            for message in listener.wait(STREAM_POLL_SEC if stream else fallback_sec):
+                next_poll = 0.0
+                if stream and (message.get('event') == 'recorder_stopped' or
+                               message.get('segment_number') == stream['segment_number']
+                               and message.get('event') == 'segment_complete'):
+                    stream['recorded'] = True
+
+        if stream:
+            # Interrupted mid-stream: hand the segment back for a full pass later
+            with db.cursor() as cur:
+                cur.execute(
+                    "UPDATE CG_TranscriptionSegments SET transcription_status = 'pending', "
+                    "transcription_progress = 0 WHERE segment_id = %s",
+                    (stream['segment_id'],)
+                )
+
         log_event(db, session_id, 'info', 'worker_stopped', 'Transcription worker finished')
 
     except Exception as e:
         log_event(db, session_id, 'error', 'worker_fatal', str(e))
     finally:
+        executor.shutdown(wait=False)
+        if listener:
+            listener.close()
+        log_writer.log(session_id, 'info', 'db_stats', f"Worker DB: {cg_db.stats.summary()}")
+        log_writer.close()
         try:
             db.close()
         except Exception:
@@ -0,0 +1,463 @@
+"""
+Card Graph - Whisper Inference Daemon
+
+Long-lived service that keeps Whisper models resident in memory and accepts
+segment transcription jobs from any session over a local Unix socket.
+Transcription workers act as thin clients, so back-to-back auctions no
+longer pay the whisper.load_model() cost before their first segment.
+
+Inference runs in a pool of worker processes (one resident model copy per
+process), so several segments can be decoded at once, or one long segment
+can be cut at silences into chunks decoded side by side. The pool only
+grows: a session asking for more workers than are running enlarges it.
+
+Models are named by cg_inference spec strings ("small" for openai-whisper,
+"faster-whisper:small" for the int8 CTranslate2 engine); any mix can be
+resident at once.
+
+Protocol: one JSON object per line in each direction.
+    {"op": "ping"}
+    {"op": "load", "model": "faster-whisper:small"}
+    {"op": "configure", "workers": 2}
+    {"op": "transcribe", "model": "base", "audio_path": "/path/SEG001.wav",
+     "vad_threshold_dbfs": -48, "chunks": 2, "window": [0, 30]}
+
+Usage:
+    python3 whisper_daemon.py                        # serve on the default socket
+    python3 whisper_daemon.py --preload base faster-whisper:small   # load before serving
+    python3 whisper_daemon.py --workers 2 --cores 1,2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cg_hallucination
+import cg_inference
+import cg_timing
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SOCKET_PATH = os.path.join(TOOLS_DIR, 'whisper_daemon.sock')
+WHISPER_CACHE = '/volume1/web/cardgraph/tools/whisper_models'
+
+CONNECT_TIMEOUT = 2         # seconds to wait for the socket to accept
+STARTUP_TIMEOUT = 30        # seconds to wait for a freshly spawned daemon
+
+models = {}                 # model spec -> loaded cg_inference model (per process)
+model_threads = 0           # CPU threads per model in this process (0 = engine default)
+
+pool = {
+    'executor': None,
+    'workers': 0,
+    'preload': set(),       # models every pool process keeps resident
+}
+pool_lock = threading.Lock()
+stats = {'started_at': None, 'jobs': 0, 'errors': 0}
+
+
+# ─── Pool Process Side ───────────────────────────────────────
+
+def get_model(model_name):
+    """Return a resident model, loading it on first use."""
+    if model_name not in models:
+        print(f"[{os.getpid()}] Loading Whisper model: {model_name} (cache: {WHISPER_CACHE})", flush=True)
+        start = time.time()
+        models[model_name] = cg_inference.load_model(model_name, WHISPER_CACHE, model_threads)
+        print(f"[{os.getpid()}] Model {model_name} loaded in {time.time() - start:.1f}s", flush=True)
+    return models[model_name]
+
+
+def init_pool_process(preload, torch_threads):
+    """Pool process initializer: cap inference threads, then load models."""
+    global model_threads
+    model_threads = torch_threads
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    for model_name in preload:
+        try:
+            get_model(model_name)
+        except Exception as e:
+            print(f"ERROR preloading Whisper model {model_name}: {e}", flush=True)
+
+
+def load_audio(audio_path, window=None):
+    """Decode a whole file, or just [start, end) seconds of a (growing) WAV."""
+    import cg_audio
+    if window:
+        return cg_audio.read_wav_range(audio_path, window[0], window[1])[0]
+    return cg_audio.load_pcm(audio_path)
+
+
+def transcribe_audio(model, audio_path, options=None, vad_threshold_dbfs=None, window=None):
+    """Run Whisper on one file, optionally skipping silence first.
+
+    With vad_threshold_dbfs set, the audio is decoded once, silent stretches
+    are cut out, and Whisper only sees the voiced remainder. window limits
+    the job to part of a WAV (times in the result are window-relative).
+    With options word_timestamps=True the result carries 'words' as
+    [word, start, end] on the untrimmed timeline.
+    Shared by the daemon and by workers running without it.
+    """
+    decode_options = {'language': 'en'}
+    decode_options.update(options or {})
+
+    if vad_threshold_dbfs is None:
+        audio = load_audio(audio_path, window) if window else audio_path
+        return decode(model, audio, decode_options)
+
+    import cg_audio
+    samples = load_audio(audio_path, window)
+    trimmed, silent_ranges, speech_sec = cg_audio.vad_trim(samples, vad_threshold_dbfs)
+    info = {
+        'silent_ranges': silent_ranges,
+        'speech_seconds': round(speech_sec, 1),
+        'duration_seconds': round(len(samples) / cg_audio.SAMPLE_RATE, 1),
+    }
+    if trimmed is None:
+        return {'text': '', 'silent': True, **info}
+    # Whisper saw the voiced spans back to back; put times back on the original timeline
+    spans = cg_audio.speech_spans(silent_ranges, len(samples) / cg_audio.SAMPLE_RATE) if silent_ranges else None
+    return {**decode(model, trimmed, decode_options, spans), 'silent': False, **info}
+
+
+def decode(model, audio, decode_options, spans=None):
+    """Run the model and drop hallucinated windows before anything is stitched.
+
+    Windows Whisper itself flags (no_speech_prob, avg_logprob,
+    compression_ratio) are removed one by one rather than failing the whole
+    segment; they are reported in 'dropped_windows' as [start, end, reason].
+    spans maps times in concatenated audio back to the source (see cg_timing).
+    """
+    result = model.transcribe(audio, **decode_options)
+    dropped = cg_hallucination.filter_result(result)
+    response = {'text': result.get('text', '').strip()}
+    if dropped is not None:
+        response['dropped_windows'] = [
+            (round(cg_timing.map_time(start, spans), 2), round(cg_timing.map_time(end, spans), 2), reason)
+            for start, end, reason in dropped
+        ]
+    if decode_options.get('word_timestamps'):
+        response['words'] = cg_timing.remap_words(cg_timing.extract_words(result), spans)
+    return response
+
+
+def run_job(request):
+    """Transcribe one audio file inside a pool process."""
+    audio_path = request.get('audio_path')
+    if not audio_path or not os.path.exists(audio_path):
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+    model = get_model(request.get('model', 'base'))
+    start = time.time()
+    result = transcribe_audio(model, audio_path, request.get('options'),
+                              request.get('vad_threshold_dbfs'), request.get('window'))
+    result['elapsed'] = round(time.time() - start, 2)
+    result['pid'] = os.getpid()
+    return result
+
+
+def run_samples_job(model_name, samples, options=None):
+    """Transcribe an in-memory chunk inside a pool process."""
+    decode_options = {'language': 'en'}
+    decode_options.update(options or {})
+    return decode(get_model(model_name), samples, decode_options)
+
+
+def load_job(model_name):
+    get_model(model_name)
+    return os.getpid()
+
+
+# ─── Daemon Side ─────────────────────────────────────────────
+
+def submit(fn, *args):
+    """Queue fn on the current pool.
+
+    Under pool_lock, so a resize_pool() swapping executors can never leave a
+    caller submitting to the old one after its shutdown (RuntimeError).
+    """
+    with pool_lock:
+        return pool['executor'].submit(fn, *args)
+
+
+def warm_pool(model_name):
+    """Load a model into every pool process. Returns the pids that hold it."""
+    with pool_lock:
+        pool['preload'].add(model_name)
+        workers = pool['workers']
+    # Each load blocks its process, so concurrent submits spread across the pool
+    futures = [submit(load_job, model_name) for _ in range(workers)]
+    return sorted({f.result() for f in futures})
+
+
+def resize_pool(workers):
+    """Start (or grow) the inference pool. Running jobs finish on the old pool."""
+    with pool_lock:
+        if pool['executor'] is not None and workers <= pool['workers']:
+            return False
+        old = pool['executor']
+        cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+        torch_threads = max(1, (cpu_count or 1) // workers)
+        pool['executor'] = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_pool_process,
+            initargs=(sorted(pool['preload']), torch_threads),
+        )
+        pool['workers'] = workers
+        preload = sorted(pool['preload'])
+        print(f"Inference pool: {workers} process(es), {torch_threads} torch thread(s) each", flush=True)
+    if old is not None:
+        old.shutdown(wait=False)
+    # Processes spawn on demand; warm them now so the first segment doesn't wait
+    for model_name in preload:
+        threading.Thread(target=warm_pool, args=(model_name,), daemon=True).start()
+    return True
+
+
+def run_chunked(request, n_chunks):
+    """Split one segment at silences and decode the chunks across the pool.
+
+    Runs in the daemon (request thread); only the decoding happens in pool
+    processes. Chunk texts are stitched back in order with their offsets.
+    """
+    import cg_audio
+    audio_path = request.get('audio_path')
+    if not audio_path or not os.path.exists(audio_path):
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+    start = time.time()
+    samples = load_audio(audio_path, request.get('window'))
+    total_sec = len(samples) / cg_audio.SAMPLE_RATE
+    threshold = request.get('vad_threshold_dbfs')
+    silent_ranges = cg_audio.find_silent_ranges(samples, threshold) if threshold is not None else []
+    spans = cg_audio.speech_spans(silent_ranges, total_sec)
+    speech_sec = sum(e - s for s, e in spans)
+    info = {
+        'silent_ranges': silent_ranges,
+        'speech_seconds': round(speech_sec, 1),
+        'duration_seconds': round(total_sec, 1),
+    }
+    if speech_sec < cg_audio.MIN_SPEECH_SEC:
+        return {'text': '', 'silent': True, **info, 'elapsed': round(time.time() - start, 2)}
+
+    chunks = cg_audio.plan_chunks(samples, spans, n_chunks)
+    futures = [
+        submit(run_samples_job, request.get('model', 'base'),
+               cg_audio.concat_spans(samples, chunk), request.get('options'))
+        for chunk in chunks
+    ]
+    pieces = []
+    words = []
+    dropped = None
+    for chunk, future in zip(chunks, futures):
+        result = future.result()
+        pieces.append({'start': chunk[0][0], 'end': chunk[-1][1], 'text': result['text']})
+        if 'words' in result:
+            words.extend(cg_timing.remap_words(result['words'], chunk))
+        if 'dropped_windows' in result:
+            dropped = (dropped or []) + [
+                (round(cg_timing.map_time(s, chunk), 2), round(cg_timing.map_time(e, chunk), 2), r)
+                for s, e, r in result['dropped_windows']
+            ]
+
+    response = {
+        'text': ' '.join(p['text'] for p in pieces if p['text']),
+        'silent': False,
+        'chunks': pieces,
+        **info,
+        'elapsed': round(time.time() - start, 2),
+    }
+    if (request.get('options') or {}).get('word_timestamps'):
+        response['words'] = words
+    if dropped is not None:
+        response['dropped_windows'] = dropped
+    return response
+
+
+def handle_request(request):
+    op = request.get('op')
+    if op == 'ping':
+        return {'ok': True, 'pid': os.getpid(), 'models': sorted(pool['preload']),
+                'workers': pool['workers'], **stats}
+    if op == 'configure':
+        resize_pool(max(1, int(request.get('workers', 1))))
+        return {'ok': True, 'workers': pool['workers']}
+    if op == 'load':
+        return {'ok': True, 'pids': warm_pool(request.get('model', 'base'))}
+    if op == 'transcribe':
+        stats['jobs'] += 1
+        n_chunks = int(request.get('chunks') or 0)
+        if n_chunks > 1:
+            return {'ok': True, **run_chunked(request, n_chunks)}
+        return {'ok': True, **submit(run_job, request).result()}
+    return {'ok': False, 'error': f'Unknown op: {op}'}
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                response = handle_request(json.loads(line))
+            except Exception as e:
+                stats['errors'] += 1
+                response = {'ok': False, 'error': str(e)[:500]}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# ─── Client Side ─────────────────────────────────────────────
+
+def call(request, timeout=None, socket_path=SOCKET_PATH):
+    """Send one request to the daemon and return its decoded response."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(socket_path)
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    finally:
+        sock.close()
+    if not line:
+        raise ConnectionError('Whisper daemon closed the connection')
+    return json.loads(line)
+
+
+def ping(socket_path=SOCKET_PATH):
+    """Return the daemon status dict, or None if it is not reachable."""
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return None
+    try:
+        return call({'op': 'ping'}, timeout=CONNECT_TIMEOUT, socket_path=socket_path)
+    except (OSError, ValueError):
+        return None
+
+
+def transcribe(audio_path, model_name, vad_threshold_dbfs=None, chunks=0, window=None,
+               socket_path=SOCKET_PATH, **options):
+    """Transcribe a file on the daemon. Returns the response dict.
+
+    chunks > 1 splits the segment at silences and decodes the pieces on
+    that many pool processes at once. window=(start, end) transcribes only
+    that part of a WAV, which may still be recording.
+    """
+    response = call({'op': 'transcribe', 'model': model_name,
+                     'audio_path': os.path.abspath(audio_path), 'options': options,
+                     'vad_threshold_dbfs': vad_threshold_dbfs, 'chunks': chunks,
+                     'window': window},
+                    socket_path=socket_path)
+    if not response.get('ok'):
+        raise RuntimeError(response.get('error', 'Whisper daemon error'))
+    return response
+
+
+def ensure_running(python_bin, preload=(), workers=1, cores=None, socket_path=SOCKET_PATH):
+    """Start the daemon in the background unless one is already serving.
+
+    An already-running daemon is asked to grow its pool to `workers`.
+    Returns True once the daemon answers a ping.
+    """
+    if ping(socket_path):
+        try:
+            call({'op': 'configure', 'workers': workers}, socket_path=socket_path)
+        except (OSError, ValueError):
+            pass
+        return True
+
+    cmd = [python_bin, os.path.abspath(__file__), '--socket', socket_path,
+           '--workers', str(workers)]
+    if cores:
+        cmd += ['--cores', cores]
+    if preload:
+        cmd += ['--preload'] + list(preload)
+    log_path = os.path.join(TOOLS_DIR, 'whisper_daemon.out')
+    with open(log_path, 'ab') as log:
+        subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT,
+                         stdin=subprocess.DEVNULL, start_new_session=True)
+
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if ping(socket_path):
+            return True
+        time.sleep(0.5)
+    return False
+
+
+# ─── Main ────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Whisper Inference Daemon')
+    parser.add_argument('--socket', type=str, default=SOCKET_PATH)
+    parser.add_argument('--preload', nargs='*', default=[],
+                        help='Model specs to load up front, e.g. base faster-whisper:small')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Inference processes (segments decoded concurrently)')
+    parser.add_argument('--cores', type=str, default=None,
+                        help='Comma-separated CPU cores the pool may use, e.g. "1,2"')
+    parser.add_argument('--nice', type=int, default=10,
+                        help='Niceness increment so inference never starves the recorder')
+    args = parser.parse_args()
+
+    if ping(args.socket):
+        print(f"Whisper daemon already running on {args.socket}")
+        return
+
+    # Stale socket from a crashed daemon
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+
+    if args.nice and hasattr(os, 'nice'):
+        os.nice(args.nice)
+    if args.cores and hasattr(os, 'sched_setaffinity'):
+        # Inherited by the pool processes
+        os.sched_setaffinity(0, {int(c) for c in args.cores.split(',')})
+
+    for spec in args.preload:
+        cg_inference.parse_spec(spec)  # fail fast on a typo rather than in every pool process
+    pool['preload'].update(args.preload)
+    resize_pool(max(1, args.workers))
+
+    server = DaemonServer(args.socket, DaemonHandler)
+    os.chmod(args.socket, 0o666)  # manager may run as root, UI-launched workers as http
+    stats['started_at'] = int(time.time())
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+
+    print(f"Whisper daemon listening on {args.socket} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        pool['executor'].shutdown(wait=False, cancel_futures=True)
+        print("Whisper daemon stopped", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -27,8 +27,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 # Also add cardgraph/tools for shared config
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cardgraph', 'tools'))
 
-import pymysql
-from cg_config import DB_CONFIG, YAHOO_EMAIL as _YAHOO_EMAIL, YAHOO_APP_PASSWORD as _YAHOO_APP_PASSWORD
+import cg_db
+from cg_config import YAHOO_EMAIL as _YAHOO_EMAIL, YAHOO_APP_PASSWORD as _YAHOO_APP_PASSWORD
 from ebay_parser import (
     parse_order_confirmed_email,
     parse_paypal_ebay_email,
@@ -841,7 +841,7 @@ def main():
 
     # Connect to database
     print("Connecting to database...")
-    db_conn = pymysql.connect(**DB_CONFIG)
+    db_conn = cg_db.get_db(dict_rows=False, autocommit=False)
 
     # Connect to Yahoo Mail
     print("Connecting to Yahoo Mail...")
@@ -890,6 +890,7 @@ def main():
             print(f"  {label}: {result}")
         else:
             print(f"  {label}: {result}")
+    print(f"  DB: {cg_db.stats.summary()}")
     print(f"{'='*50}")
 
     mail.logout()